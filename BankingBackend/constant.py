@@ -62,7 +62,31 @@ TRANSACTION_METHOD = (
     (CASH, "CASH"),
 )
 
+PENDING = "PE"
+RUNNING = "RU"
+DONE = "DN"
+FAILED = "FL"
+
+JOB_STATUS_CHOICES = (
+    (PENDING, "Pending"),
+    (RUNNING, "Running"),
+    (DONE, "Done"),
+    (FAILED, "Failed"),
+)
+
 TRANSACTION_TYPE = (
     (DEBIT, "Debit"),
     (CREDIT, "Credit"),
 )
+
+TRANSACTION_EMAIL = "transaction_email"
+
+OUTBOX_TOPICS = ((TRANSACTION_EMAIL, "Transaction Email"),)
+
+CUSTOMER_BOOK = "CA"
+BANK_BOOK = "BK"
+
+LEDGER_BOOKS = (
+    (CUSTOMER_BOOK, "Customer Account"),
+    (BANK_BOOK, "Bank Settlement"),
+)
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from celery.schedules import crontab
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -45,6 +48,7 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    'banking.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -92,18 +96,168 @@ CELERY_TIMEZONE = 'Africa/Nairobi'
 WSGI_APPLICATION = 'BankingBackend.wsgi.application'
 AUTH_USER_MODEL = "accounts.User"
 
+# ID ALLOCATION
+# Account numbers and transaction IDs are issued without touching the database.
+# Every process needs its own worker id (0-1023): BANKING_WORKER_ID through the
+# environment, or one leased in the cache for BANKING_WORKER_LEASE_TIMEOUT
+# seconds. Leases only see processes sharing the cache, run several processes
+# with CACHE_BACKEND=redis or a distinct BANKING_WORKER_ID each.
+BANKING_ID_ALLOCATOR = "banking.ids.SnowflakeAllocator"
+BANKING_WORKER_LEASE_TIMEOUT = 10 * 60
+
 CELERY_TIMEZONE = "Australia/Tasmania"
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
+CELERYBEAT_SCHEDULE = {
+    'relay-outbox': {'task': 'relay_outbox', 'schedule': 5.0},
+    'purge-idempotency-keys': {'task': 'purge_idempotency_keys', 'schedule': 3600.0},
+    'snapshot-balances': {
+        'task': 'snapshot_balances',
+        'schedule': crontab(hour=0, minute=15),
+    },
+    'reconcile-balances': {'task': 'reconcile_balances', 'schedule': 3600.0},
+    'compact-balance-shards': {'task': 'compact_balance_shards', 'schedule': 60.0},
+    'create-transaction-partitions': {
+        'task': 'create_transaction_partitions',
+        'schedule': crontab(hour=0, minute=30),
+    },
+    'archive-transactions': {
+        'task': 'archive_transactions',
+        'schedule': crontab(day_of_month=1, hour=1, minute=0),
+    },
+}
+
+# Notification outbox, OUTBOX_DELIVERY is 'celery' or 'mail'
+OUTBOX_DELIVERY = os.environ.get('OUTBOX_DELIVERY', 'celery')
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 10
+# Seconds a relay holds claimed messages while delivering them, after which
+# another relay may claim them again
+OUTBOX_CLAIM_TIMEOUT = 300
+
+# Notification emails, EMAIL_RATE_LIMITS maps an email backend to the
+# messages per second it may send
+NOTIFICATION_COALESCE_WINDOW = 2
+EMAIL_BATCH_SIZE = 100
+# Retries of an emailed outbox batch that failed, EMAIL_RETRY_DELAY seconds
+# doubled on every retry
+EMAIL_MAX_RETRIES = 5
+EMAIL_RETRY_DELAY = 60
+EMAIL_RATE_LIMITS = {}
+
+# Retries of a transfer that lost a lock conflict
+TRANSFER_MAX_RETRIES = 3
+
+# Seconds the first response to an Idempotency-Key is replayed for
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
+# Balance reconciliation, accounts per aggregate query and seconds an
+# incremental run reaches back before the start of the previous one
+RECONCILE_CHUNK_SIZE = 1000
+RECONCILE_WATERMARK_LAG = 5 * 60
+
+# Server-Timing headers and /metrics histograms of every request. /metrics
+# answers only requests with an "Authorization: Bearer <METRICS_TOKEN>"
+# header and is closed while METRICS_TOKEN is empty
+INSTRUMENTATION_ENABLED = True
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Resolved auth tokens, cached per process in an LRU of AUTH_TOKEN_CACHE_SIZE
+# tokens for AUTH_TOKEN_LOCAL_TIMEOUT seconds and, with AUTH_TOKEN_SHARED_CACHE,
+# in the Django cache for AUTH_TOKEN_CACHE_TIMEOUT seconds. The shared tier is
+# only on with the Redis cache: other processes would not see a revoked token
+# in a per process local memory cache
+AUTH_TOKEN_CACHE_ENABLED = True
+AUTH_TOKEN_SHARED_CACHE = os.environ.get('CACHE_BACKEND') == 'redis'
+AUTH_TOKEN_CACHE_SIZE = 10000
+AUTH_TOKEN_LOCAL_TIMEOUT = 5
+AUTH_TOKEN_CACHE_TIMEOUT = 300
+
+# Credits to sharded accounts land on a shard picked by hash of the
+# transaction ID ('hash') or in turn per process ('round-robin')
+BALANCE_SHARD_STRATEGY = os.environ.get('BALANCE_SHARD_STRATEGY', 'round-robin')
+
+# Threads per process running the queries of the async views under ASGI, at
+# most this many database connections per process
+ASYNC_DB_THREADS = int(os.environ.get('ASYNC_DB_THREADS', 16))
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_BACKEND=postgres connects to the POSTGRES_* server, SQLite otherwise.
+# DB_POOL_MODE 'persistent' keeps every connection open for DB_CONN_MAX_AGE
+# seconds and checks it before reuse, 'pgbouncer' also points POSTGRES_HOST
+# and POSTGRES_PORT at PgBouncer in transaction pooling mode, which can not
+# keep server side cursors open, 'none' connects on every request.
+DB_POOL_MODE = os.environ.get('DB_POOL_MODE', 'persistent')
+if DB_POOL_MODE == 'none':
+    DB_CONN_MAX_AGE = 0
+else:
+    DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+
+if os.environ.get('DB_BACKEND') == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'banking.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'banking'),
+            'USER': os.environ.get('POSTGRES_USER', 'banking'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_MAX_AGE != 0,
+            'DISABLE_SERVER_SIDE_CURSORS': DB_POOL_MODE == 'pgbouncer',
+            'OPTIONS': {
+                'connect_timeout': int(os.environ.get('POSTGRES_CONNECT_TIMEOUT', 5)),
+                'application_name': 'banking',
+            },
+        }
+    }
+else:
+    # WAL lets readers run next to the writer, IMMEDIATE transactions wait
+    # up to timeout seconds for the write lock instead of failing.
+    DATABASES = {
+        'default': {
+            'ENGINE': 'banking.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_MAX_AGE != 0,
+            'OPTIONS': {
+                'timeout': 20,
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL',
+            },
+        }
+    }
+
+# CACHE
+# Local memory for development and tests, set CACHE_BACKEND=redis to share
+# the cache through the Redis used by Celery.
+if os.environ.get('CACHE_BACKEND') == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/1'),
+            'OPTIONS': {'CLIENT_CLASS': 'django_redis.client.DefaultClient'},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'banking',
+        }
     }
-}
+
+# Customer enquiries, cached per account and invalidated by bumping the
+# account version on every posting. Only on with the Redis cache: with a per
+# process local memory cache other processes would serve stale balances
+ENQUIRY_CACHE_ENABLED = os.environ.get('CACHE_BACKEND') == 'redis'
+ENQUIRY_CACHE_TIMEOUT = 300
+
+# Branch reports, cached per branch, range and top for
+# BRANCH_REPORT_CACHE_TIMEOUT seconds. Ranges ending today include postings
+# made after the report was cached until it expires.
+BRANCH_REPORT_CACHE_TIMEOUT = int(os.environ.get('BRANCH_REPORT_CACHE_TIMEOUT', 300))
 
 
 REST_FRAMEWORK = {
@@ -114,7 +268,7 @@ REST_FRAMEWORK = {
     # or allow read-only access for unauthenticated users.
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.BasicAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'banking.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
 }
@@ -158,6 +312,22 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+# Files written by the background transaction history exports, a pending or
+# running export older than EXPORT_JOB_TIMEOUT seconds is given up on and
+# an identical request starts a new one
+EXPORT_ROOT = BASE_DIR / 'exports'
+EXPORT_JOB_TIMEOUT = 30 * 60
+
+# Transactions are partitioned by month on Postgres with
+# TRANSACTION_PARTITIONS_AHEAD empty months kept ready, months older than
+# TRANSACTION_ARCHIVE_MONTHS are archived to gzip files in
+# TRANSACTION_ARCHIVE_ROOT
+TRANSACTION_PARTITIONS_AHEAD = 3
+TRANSACTION_ARCHIVE_MONTHS = int(os.environ.get('TRANSACTION_ARCHIVE_MONTHS', 24))
+TRANSACTION_ARCHIVE_ROOT = os.environ.get(
+    'TRANSACTION_ARCHIVE_ROOT', str(BASE_DIR / 'archive')
+)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -1,9 +1,9 @@
 import os
-from django.core.mail import send_mail
 from celery.decorators import task
 from celery import Celery
 from django.conf import settings
-from datetime import datetime 
+
+from banking.notifications import deliver
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'BankingBackend.settings')
 
@@ -17,16 +17,39 @@ app.autodiscover_tasks(lambda: settings.INSTALLED_APPS)
 
 @task(name="send_email_deposit")
 def schedule_send_email(email,transaction_type, account_number, amount):
-    if transaction_type == "Credit":
-        email_subject = "Amount Credited"
-    elif transaction_type == "Debit":
-        email_subject = "Amount Debited"
-    email_message = f'''Your account XXXXXX{ str(account_number)[-4:] } has been 
-                 { email_subject[-8:]} with amount {amount} on {datetime.now()}'''
-    send_mail(
-                email_subject,
-                email_message,
-                settings.EMAIL_FROM,
-                email,
-                fail_silently=False,
-            )
+    payload = {
+        "email": email,
+        "transaction_type": transaction_type,
+        "account_number": account_number,
+        "amount": amount,
+    }
+    _, errors = deliver([payload])
+    for error in errors.values():
+        raise error
+
+
+@task(bind=True, name="send_email_batch", max_retries=None)
+def send_email_batch(self, payloads):
+    """
+    Send the emails of a relayed outbox batch over one mail connection.
+
+    The outbox marks a batch sent once it is published, so failures are
+    retried here: the whole batch when the mail connection fails, only the
+    failed payloads otherwise. The task fails once ``EMAIL_MAX_RETRIES`` are
+    used up.
+    """
+    try:
+        sent, errors = deliver(payloads)
+    except Exception as e:
+        failed, error = payloads, e
+    else:
+        if not errors:
+            return {"sent": sent, "failed": 0}
+        failed = [payloads[index] for index in sorted(errors)]
+        error = next(iter(errors.values()))
+    raise self.retry(
+        args=(failed,),
+        exc=error,
+        countdown=settings.EMAIL_RETRY_DELAY * 2 ** self.request.retries,
+        max_retries=settings.EMAIL_MAX_RETRIES,
+    )
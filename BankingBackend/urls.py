@@ -1,9 +1,12 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from banking.views import metrics
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('banking/', include('banking.urls')),
     path('api-auth/', include('rest_framework.urls')),
+    path('metrics', metrics, name='metrics'),
 ]
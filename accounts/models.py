@@ -23,7 +23,7 @@ class User(AbstractUser):
 
     def get_full_name(self):
         full_name = f"{self.first_name} {self.last_name}"
-        return full_name
+        return full_name.strip()
 
     def send_email(self, subject, message, from_email=None, **kwargs):
         send_mail(subject, message, from_email, [self.email], **kwargs)
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class BankingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'banking'
+
+    def ready(self):
+        # Connect the enquiry cache invalidation receivers.
+        import banking.cache  # noqa: F401
+        # And the token cache invalidation receivers.
+        import banking.authentication  # noqa: F401
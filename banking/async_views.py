@@ -0,0 +1,155 @@
+"""
+Async versions of the customer enquiry, posting and transfer endpoints.
+
+Under gunicorn sync workers a slow client holds a worker for as long as it
+takes to send its request and read the response. Under ASGI the server does
+that socket work on the event loop, but Django 3.2 runs every synchronous
+view of a process in one shared thread, so the DRF views queue behind each
+other and every request hops threads once per view and middleware.
+
+These views authenticate the token, from the token LRU of the process
+without leaving the event loop when it hits, and run the database work in
+``ASYNC_DB_THREADS`` threads of their own, so one process keeps thousands of
+connections open on its event loop while that many requests at most use the
+database. Django 3.2 has no async ORM, the work is the synchronous DRF view
+run for the already authenticated user: validation, idempotency and the
+outbox are shared with the synchronous endpoints. Notification emails are
+outbox rows written in the posting transaction, no request waits on the
+broker or the mail server.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.http import HttpResponse, JsonResponse
+from rest_framework import HTTP_HEADER_ENCODING, status
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from banking.authentication import CachedTokenAuthentication
+from banking.instrumentation import current_timings
+from banking.views import CreditAmount, CustomerEnquiry, DebitAmount, TransferAPI
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    """
+    The thread pool of the database work of async views.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.ASYNC_DB_THREADS,
+                    thread_name_prefix="banking-db",
+                )
+    return _executor
+
+
+def _in_database_thread(func, args):
+    # Connections belong to the pool threads, close them the way the request
+    # signals do: per call, or once CONN_MAX_AGE has passed.
+    close_old_connections()
+    try:
+        timings = current_timings()
+        if timings is None:
+            return func(*args)
+        with connection.execute_wrapper(timings.execute):
+            return func(*args)
+    finally:
+        close_old_connections()
+
+
+async def database(func, *args):
+    """
+    Run ``func(*args)`` in a database thread without blocking the event loop.
+    """
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        executor(),
+        functools.partial(context.run, _in_database_thread, func, args),
+    )
+
+
+async def authenticate(request):
+    """
+    ``(user, token)`` of the ``Authorization: Token <key>`` header.
+
+    Raises ``AuthenticationFailed`` with the messages of
+    ``TokenAuthentication``. Only a miss of the token LRU waits for a
+    database thread.
+    """
+    header = request.META.get("HTTP_AUTHORIZATION", "").encode(HTTP_HEADER_ENCODING)
+    auth = header.split()
+    if not auth or auth[0].lower() != b"token":
+        raise AuthenticationFailed("Authentication credentials were not provided.")
+    if len(auth) != 2:
+        raise AuthenticationFailed("Invalid token header.")
+    try:
+        key = auth[1].decode()
+    except UnicodeError:
+        raise AuthenticationFailed("Invalid token header.")
+    authentication = CachedTokenAuthentication()
+    return authentication.authenticate_local(key) or await database(
+        authentication.authenticate_credentials, key
+    )
+
+
+class AsyncAuthenticated(BaseAuthentication):
+    """
+    The user the async view authenticated before handing the request over.
+    """
+
+    def authenticate(self, request):
+        return getattr(request._request, "async_auth", None)
+
+
+def _respond(view, request, args, kwargs):
+    response = view(request, *args, **kwargs)
+    if response.streaming:
+        return response
+    # Render here, Django would hand a DRF response back to the shared
+    # thread to render it.
+    response.render()
+    plain = HttpResponse(response.content, status=response.status_code)
+    for header, value in response.items():
+        plain[header] = value
+    return plain
+
+
+def async_view(view_class):
+    """
+    Async view of the DRF ``view_class`` for token authenticated users.
+    """
+    view = view_class.as_view(authentication_classes=[AsyncAuthenticated])
+
+    async def handle(request, *args, **kwargs):
+        try:
+            request.async_auth = await authenticate(request)
+        except AuthenticationFailed as e:
+            response = JsonResponse(
+                {"detail": e.detail}, status=status.HTTP_401_UNAUTHORIZED
+            )
+            response["WWW-Authenticate"] = CachedTokenAuthentication.keyword
+            return response
+        return await database(_respond, view, request, args, kwargs)
+
+    handle.__name__ = handle.__qualname__ = f"Async{view_class.__name__}"
+    handle.__doc__ = view_class.__doc__
+    # Token authenticated like the DRF view, csrf_exempt can not wrap a
+    # coroutine function in Django 3.2.
+    handle.csrf_exempt = True
+    return handle
+
+
+AsyncCustomerEnquiry = async_view(CustomerEnquiry)
+AsyncCreditAmount = async_view(CreditAmount)
+AsyncDebitAmount = async_view(DebitAmount)
+AsyncTransferAPI = async_view(TransferAPI)
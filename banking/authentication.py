@@ -0,0 +1,199 @@
+"""
+Token authentication with resolved tokens cached.
+
+``TokenAuthentication`` joins ``Token`` and ``User`` on every request before
+the view runs, while the permissions only read ``user_type``.
+``CachedTokenAuthentication`` keeps ``key -> (user id, user_type,
+is_active)`` in a bounded LRU of the process for
+``AUTH_TOKEN_LOCAL_TIMEOUT`` seconds, backed by the Django cache for
+``AUTH_TOKEN_CACHE_TIMEOUT`` seconds, and only queries when both miss. The
+user it returns has just those fields loaded, any other field is read from
+the database when first used. The Django cache tier is only used with
+``AUTH_TOKEN_SHARED_CACHE``, on by default with the Redis cache: a local
+memory cache is per process and would keep a revoked token valid in every
+other process for ``AUTH_TOKEN_CACHE_TIMEOUT`` seconds.
+
+Deleting a token, or saving its user with another type or active flag,
+drops the entry from the shared cache and the LRU of this process, and once
+more when the transaction commits so a racing read can not put it back.
+Other processes keep their copy for at most ``AUTH_TOKEN_LOCAL_TIMEOUT``
+seconds. ``QuerySet.update`` sends no signals and is not seen.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from accounts.models import User
+
+# Fields of the user resolved from a token, in the order they are cached.
+CACHED_FIELDS = ("id", "user_type", "is_active")
+
+
+def shared_key(key):
+    # The token is a credential, keep it out of the shared cache.
+    return f"auth:token:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+class TokenCache:
+    """
+    Bounded LRU of resolved tokens with a time to live.
+
+    Every delete bumps ``generation``; a value read from the shared tier or
+    the database before a delete is not stored.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.entries = OrderedDict()
+            self.generation = 0
+
+    def get(self, key):
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, generation):
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.entries[key] = (
+                time.monotonic() + settings.AUTH_TOKEN_LOCAL_TIMEOUT,
+                value,
+            )
+            self.entries.move_to_end(key)
+            while len(self.entries) > settings.AUTH_TOKEN_CACHE_SIZE:
+                self.entries.popitem(last=False)
+
+    def delete(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+            self.generation += 1
+
+
+tokens = TokenCache()
+
+
+def resolve(key):
+    """
+    ``(user id, user_type, is_active)`` of the token ``key``, ``None`` when
+    there is no such token.
+    """
+    generation = tokens.generation
+    value = tokens.get(key)
+    if value is not None:
+        return value
+    shared = settings.AUTH_TOKEN_SHARED_CACHE
+    value = cache.get(shared_key(key)) if shared else None
+    if value is None:
+        value = (
+            Token.objects.filter(key=key)
+            .values_list(*(f"user__{field}" for field in CACHED_FIELDS))
+            .first()
+        )
+        if value is None:
+            return None
+        if shared:
+            cache.set(shared_key(key), value, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+    value = tuple(value)
+    tokens.set(key, value, generation)
+    return value
+
+
+def cached_user(value):
+    """
+    A ``User`` with only the cached fields loaded.
+    """
+    values = dict(zip(CACHED_FIELDS, value))
+    names = [
+        field.attname
+        for field in User._meta.concrete_fields
+        if field.attname in values
+    ]
+    return User.from_db(
+        router.db_for_read(User), names, [values[name] for name in names]
+    )
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    ``TokenAuthentication`` reading resolved tokens from the token caches.
+    """
+
+    def authenticate_credentials(self, key):
+        if not settings.AUTH_TOKEN_CACHE_ENABLED:
+            return super().authenticate_credentials(key)
+        return self.authenticated(key, resolve(key))
+
+    def authenticate_local(self, key):
+        """
+        ``(user, token)`` from the LRU of this process, ``None`` on a miss.
+        Never touches the network.
+        """
+        if not settings.AUTH_TOKEN_CACHE_ENABLED:
+            return None
+        value = tokens.get(key)
+        if value is None:
+            return None
+        return self.authenticated(key, value)
+
+    def authenticated(self, key, value):
+        if value is None:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+        user = cached_user(value)
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+        return user, Token(key=key, user=user)
+
+
+def forget(keys):
+    """
+    Drop ``keys`` from both caches, now and after the current transaction.
+    """
+    if not keys:
+        return
+
+    def drop():
+        tokens.delete(keys)
+        cache.delete_many([shared_key(key) for key in keys])
+
+    drop()
+    transaction.on_commit(drop)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    forget([instance.key])
+
+
+@receiver(post_save, sender=User)
+def invalidate_user(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is not None and not set(update_fields) & set(CACHED_FIELDS):
+        return
+    forget(
+        list(Token.objects.filter(user_id=instance.pk).values_list("key", flat=True))
+    )
@@ -0,0 +1,45 @@
+"""
+Persistent connection health checks for the database backends.
+
+A backport of the ``CONN_HEALTH_CHECKS`` database setting of Django 4.1:
+a connection kept open across requests by ``CONN_MAX_AGE`` is checked with
+``is_usable`` the first time a request uses it, and silently replaced when
+the server closed it, instead of failing that request.
+"""
+
+
+class HealthCheckMixin:
+    """
+    Check a reused connection once per request before its first query.
+    """
+
+    health_check_done = False
+
+    @property
+    def health_check_enabled(self):
+        return self.settings_dict.get("CONN_HEALTH_CHECKS", False)
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        # Runs at the start and end of every request.
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def close_if_health_check_failed(self):
+        if (
+            self.connection is None
+            or not self.health_check_enabled
+            or self.health_check_done
+            or self.in_atomic_block
+        ):
+            return
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
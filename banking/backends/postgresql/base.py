@@ -0,0 +1,10 @@
+"""
+PostgreSQL backend with ``CONN_HEALTH_CHECKS``.
+"""
+from django.db.backends.postgresql import base
+
+from banking.backends.base import HealthCheckMixin
+
+
+class DatabaseWrapper(HealthCheckMixin, base.DatabaseWrapper):
+    pass
@@ -0,0 +1,47 @@
+"""
+SQLite backend with ``CONN_HEALTH_CHECKS`` and the ``init_command`` and
+``transaction_mode`` options of Django 5.1.
+
+``init_command`` is run on every new connection, e.g. to switch to WAL.
+``transaction_mode`` is how ``atomic`` begins its transactions: a default
+DEFERRED transaction that reads before it writes can not wait for another
+writer and fails with "database is locked" straight away, an IMMEDIATE one
+takes the write lock up front and waits up to the ``timeout`` option.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+from banking.backends.base import HealthCheckMixin
+
+TRANSACTION_MODES = ("DEFERRED", "IMMEDIATE", "EXCLUSIVE")
+
+
+class DatabaseWrapper(HealthCheckMixin, base.DatabaseWrapper):
+    @property
+    def transaction_mode(self):
+        mode = self.settings_dict["OPTIONS"].get("transaction_mode")
+        if mode is not None and mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f"transaction_mode must be one of {', '.join(TRANSACTION_MODES)}"
+            )
+        return mode and mode.upper()
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        # Not arguments of sqlite3.connect.
+        params.pop("init_command", None)
+        params.pop("transaction_mode", None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        init_command = self.settings_dict["OPTIONS"].get("init_command")
+        if init_command:
+            for statement in init_command.split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.transaction_mode
+        self.cursor().execute(f"BEGIN {mode}" if mode else "BEGIN")
@@ -0,0 +1,242 @@
+"""
+Batch posting pipeline for settlement files.
+
+Postings are validated a chunk at a time with the field rules of
+``CreditDebitTransactionSerializer``, looking up every account of the chunk in
+a single query. Valid postings are then applied as one net balance delta per
+account and their ``Transaction`` rows are bulk inserted.
+"""
+import csv
+import json
+import time
+import uuid
+from collections import defaultdict
+
+from django.db import transaction
+from rest_framework import serializers
+from rest_framework.fields import empty
+
+from banking.models import (
+    Account,
+    DailyTotal,
+    LedgerLine,
+    OutboxMessage,
+    Transaction,
+    transaction_email,
+)
+from banking.serializers import CreditDebitTransactionSerializer
+from BankingBackend.constant import CREDIT, TRANSACTION_TYPE
+
+CSV = "csv"
+JSONL = "jsonl"
+FORMATS = (CSV, JSONL)
+
+
+def read_postings(stream, fmt):
+    """
+    Yield ``(row_number, posting)`` from a CSV or JSONL text stream.
+
+    A JSONL line that can not be parsed is yielded as ``None`` so it is
+    reported as a row error instead of aborting the whole file.
+    """
+    if fmt == CSV:
+        yield from enumerate(csv.DictReader(stream), start=1)
+    elif fmt == JSONL:
+        for number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield number, json.loads(line)
+            except ValueError:
+                yield number, None
+    else:
+        raise ValueError(f"Unsupported format {fmt}, expected one of {FORMATS}")
+
+
+def format_from_name(name):
+    """
+    Guess the posting file format from a file name.
+    """
+    return JSONL if str(name).lower().endswith((".jsonl", ".json")) else CSV
+
+
+class BatchPosting:
+    """
+    Validate and post a stream of Credit/Debit postings.
+
+    With ``atomic`` nothing is posted unless every row is valid, otherwise
+    valid rows are posted and invalid rows are reported with their errors.
+    """
+
+    def __init__(self, added_by=None, chunk_size=5000, atomic=False, notify=True):
+        self.added_by = added_by
+        self.chunk_size = chunk_size
+        self.atomic = atomic
+        self.notify = notify
+        self.batch_id = str(uuid.uuid4())
+
+        serializer_fields = CreditDebitTransactionSerializer().fields
+        self.fields = {
+            name: serializer_fields[name]
+            for name in ("transaction_method", "source", "customer_name", "amount")
+        }
+        self.fields["transaction_type"] = serializers.ChoiceField(
+            choices=TRANSACTION_TYPE
+        )
+        self.fields["reference_number"] = serializers.CharField(
+            max_length=50, required=False, allow_null=True, allow_blank=True
+        )
+
+    def run(self, rows):
+        """
+        Post every ``(row_number, posting)`` of ``rows`` and return a report.
+        """
+        started = time.perf_counter()
+        total = posted = 0
+        errors = []
+        pending = []
+        for chunk in self.chunks(rows):
+            total += len(chunk)
+            valid = self.validate_chunk(chunk, errors)
+            if self.atomic:
+                pending.extend(valid)
+            else:
+                posted += self.post(valid)
+        if self.atomic and not errors:
+            posted = self.post(pending)
+
+        elapsed = time.perf_counter() - started
+        return {
+            "batch_id": self.batch_id,
+            "rows": total,
+            "posted": posted,
+            "failed": total - posted,
+            "errors": errors,
+            "elapsed": round(elapsed, 4),
+            "postings_per_second": round(posted / elapsed, 2) if elapsed else 0.0,
+        }
+
+    def chunks(self, rows):
+        """
+        Split ``rows`` into lists of at most ``chunk_size`` rows.
+        """
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def validate_chunk(self, chunk, errors):
+        """
+        Validate a chunk of rows, appending row errors to ``errors``.
+
+        Returns the valid postings with the account they resolve to.
+        """
+        cleaned = []
+        numbers = set()
+        for number, row in chunk:
+            if not isinstance(row, dict):
+                errors.append(
+                    {"row": number, "errors": {"non_field_errors": ["Invalid row"]}}
+                )
+                continue
+            data, row_errors = {}, {}
+            for name, field in self.fields.items():
+                value = row.get(name, empty)
+                if value in (empty, None, "") and not field.required:
+                    data[name] = None
+                    continue
+                try:
+                    data[name] = field.run_validation(value)
+                except serializers.ValidationError as e:
+                    row_errors[name] = e.detail
+            try:
+                data["account"] = int(row.get("account"))
+                numbers.add(data["account"])
+            except (TypeError, ValueError):
+                row_errors["account"] = ["keyword <account> is not found"]
+            if row_errors:
+                errors.append({"row": number, "errors": row_errors})
+            else:
+                cleaned.append((number, data))
+
+        accounts = {}
+        numbers = list(numbers)
+        for start in range(0, len(numbers), 500):
+            for number, pk, first_name, last_name, email in Account.objects.filter(
+                account_number__in=numbers[start : start + 500]
+            ).values_list(
+                "account_number",
+                "id",
+                "customer__user__first_name",
+                "customer__user__last_name",
+                "customer__user__email",
+            ):
+                # The holder name as ``User.get_full_name`` builds it.
+                holder = f"{first_name} {last_name}".strip()
+                accounts[number] = (pk, holder, email)
+
+        valid = []
+        for number, data in cleaned:
+            account = accounts.get(data["account"])
+            if account is None:
+                message = "Account number not found"
+            elif account[1] != data["customer_name"]:
+                message = "Account Holder name doesn't match"
+            else:
+                valid.append((data, account))
+                continue
+            errors.append({"row": number, "errors": {"non_field_errors": [message]}})
+        return valid
+
+    def post(self, valid):
+        """
+        Apply the net delta per account and bulk insert the transactions.
+        """
+        if not valid:
+            return 0
+        deltas = defaultdict(int)
+        transactions = []
+        for data, (account_id, _, _) in valid:
+            amount = data["amount"]
+            if data["transaction_type"] == CREDIT:
+                deltas[account_id] += amount
+            else:
+                deltas[account_id] -= amount
+            transactions.append(
+                Transaction(
+                    transaction_type=data["transaction_type"],
+                    amount=amount,
+                    account_id=account_id,
+                    transaction_method=data["transaction_method"],
+                    description={
+                        "source": data["source"],
+                        "added_by": self.added_by,
+                        "batch_id": self.batch_id,
+                    },
+                    reference_number=data["reference_number"],
+                )
+            )
+        with transaction.atomic():
+            Account.objects.post_deltas(deltas)
+            Transaction.objects.bulk_create(transactions, batch_size=1000)
+            LedgerLine.objects.record(transactions)
+            DailyTotal.objects.record(transactions)
+            if self.notify:
+                OutboxMessage.objects.enqueue_many(
+                    (
+                        account_id,
+                        transaction_email(
+                            email,
+                            data["transaction_type"],
+                            data["account"],
+                            data["amount"],
+                        ),
+                    )
+                    for data, (account_id, _, email) in valid
+                    if email
+                )
+        return len(transactions)
@@ -0,0 +1,121 @@
+"""
+Helpers shared by the ``bench*`` management commands.
+"""
+import math
+import threading
+import time
+
+from django.db import connections, transaction
+
+from banking.models import (
+    Account,
+    ArchivedTotal,
+    DailyTotal,
+    LedgerLine,
+    OutboxMessage,
+    Transaction,
+)
+from BankingBackend.constant import CREDIT, UPI
+
+
+def percentile(values, pct):
+    """
+    Return the ``pct`` percentile of ``values`` using nearest rank.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100.0 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+def summarize(latencies, elapsed):
+    """
+    Summarize a list of latencies (seconds) collected over ``elapsed`` seconds.
+    """
+    count = len(latencies)
+    return {
+        "count": count,
+        "elapsed": round(elapsed, 4),
+        "throughput": round(count / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def run_concurrently(work, items, threads):
+    """
+    Call ``work(item)`` for every item from ``threads`` threads.
+
+    Returns ``(latencies, errors, elapsed)``. Every thread closes its own
+    database connection when done.
+    """
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    slices = [items[i::threads] for i in range(threads)]
+
+    def worker(chunk):
+        local_latencies = []
+        local_errors = []
+        try:
+            for item in chunk:
+                started = time.perf_counter()
+                try:
+                    work(item)
+                except Exception as e:
+                    local_errors.append(e)
+                    continue
+                local_latencies.append(time.perf_counter() - started)
+        finally:
+            connections.close_all()
+        with lock:
+            latencies.extend(local_latencies)
+            errors.extend(local_errors)
+
+    workers = [threading.Thread(target=worker, args=(chunk,)) for chunk in slices]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return latencies, errors, time.perf_counter() - started
+
+
+def seed_transactions(account, count, batch_size=10000, **fields):
+    """
+    Bulk insert ``count`` Credit transactions on ``account`` without touching
+    its balance.
+    """
+    fields.setdefault("transaction_type", CREDIT)
+    fields.setdefault("transaction_method", UPI)
+    fields.setdefault("amount", 1)
+    for start in range(0, count, batch_size):
+        Transaction.objects.bulk_create(
+            Transaction(account=account, **fields)
+            for _ in range(min(batch_size, count - start))
+        )
+
+
+def delete_accounts(account_ids):
+    """
+    Delete benchmark accounts with their transactions, ledger entries, daily
+    and archived totals and outbox messages, all or nothing.
+
+    Ledger lines are append-only, so they are removed with ``purge``.
+    """
+    with transaction.atomic():
+        transactions = Transaction.objects.filter(account_id__in=account_ids)
+        LedgerLine.objects.filter(
+            entry_id__in=transactions.values("transaction_id")
+        ).purge()
+        LedgerLine.objects.filter(
+            entry_id__in=[f"opening-{pk}" for pk in account_ids]
+        ).purge()
+        LedgerLine.objects.filter(account_id__in=account_ids).purge()
+        OutboxMessage.objects.filter(account_id__in=account_ids).delete()
+        DailyTotal.objects.filter(account_id__in=account_ids).delete()
+        ArchivedTotal.objects.filter(account_id__in=account_ids).delete()
+        transactions.delete()
+        Account.objects.filter(pk__in=account_ids).delete()
@@ -0,0 +1,179 @@
+"""
+Read-through cache for the balance enquiry.
+
+Every account has a version number in the cache and its serialized enquiry
+data is stored under a key made of the account id and version. A posting
+bumps the version once its transaction commits, so the next enquiry misses
+and reads the new balance; old entries simply expire. Versions start from a
+timestamp so a version key lost to eviction never revives an old entry.
+
+Readers always load the version before reading the database, so an entry
+written from a read that raced with a posting lands under the old version and
+is never served after the bump.
+"""
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from banking.benchmark import percentile
+from banking.models import Account, Customer
+from banking.serializers import AccountSerializer
+from banking.signals import balance_changed
+
+
+def version_key(account_id):
+    return f"enquiry:version:{account_id}"
+
+
+def entry_key(account_id, version):
+    return f"enquiry:account:{account_id}:{version}"
+
+
+def user_key(user_id):
+    return f"enquiry:user:{user_id}"
+
+
+def new_version():
+    return time.time_ns()
+
+
+def bump_versions(account_ids):
+    """
+    Atomically move the cached version of every account forward.
+    """
+    for account_id in account_ids:
+        key = version_key(account_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            if not cache.add(key, new_version(), timeout=None):
+                cache.incr(key)
+
+
+def get_versions(account_ids):
+    """
+    Return ``{account_id: version}``, creating missing versions.
+    """
+    keys = {version_key(account_id): account_id for account_id in account_ids}
+    found = cache.get_many(list(keys))
+    versions = {}
+    for key, account_id in keys.items():
+        if key not in found:
+            cache.add(key, new_version(), timeout=None)
+            found[key] = cache.get(key)
+        versions[account_id] = found[key]
+    return versions
+
+
+class CacheStats:
+    """
+    Hit rate and latency of cached enquiries in this process.
+    """
+
+    def __init__(self, size=10000):
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.latencies = deque(maxlen=size)
+
+    def record(self, hit, seconds):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self.latencies.append(seconds)
+
+    def snapshot(self):
+        with self.lock:
+            latencies = list(self.latencies)
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        }
+
+
+stats = CacheStats()
+
+
+def load_accounts(queryset):
+    """
+    Return ``{account_id: (owner user id, serialized account)}``.
+    """
+    return {
+        account.id: (account.customer.user_id, AccountSerializer(account).data)
+        for account in queryset
+    }
+
+
+def account_enquiry(user_id):
+    """
+    Return the serialized accounts of the customer user ``user_id``.
+    """
+    accounts = Account.objects.for_enquiry()
+    if not settings.ENQUIRY_CACHE_ENABLED:
+        loaded = load_accounts(accounts.filter(customer__user_id=user_id))
+        return [data for _, data in loaded.values()]
+
+    started = time.perf_counter()
+    account_ids = cache.get(user_key(user_id))
+    if account_ids is not None:
+        versions = get_versions(account_ids)
+        keys = {entry_key(pk, version): pk for pk, version in versions.items()}
+        found = cache.get_many(list(keys))
+        entries = {keys[key]: value for key, value in found.items()}
+        missing = [pk for pk in account_ids if pk not in entries]
+        if missing:
+            loaded = load_accounts(accounts.filter(pk__in=missing))
+            cache.set_many(
+                {entry_key(pk, versions[pk]): value for pk, value in loaded.items()},
+                settings.ENQUIRY_CACHE_TIMEOUT,
+            )
+            entries.update(loaded)
+        if all(pk in entries and entries[pk][0] == user_id for pk in account_ids):
+            stats.record(not missing, time.perf_counter() - started)
+            return [entries[pk][1] for pk in account_ids]
+
+    # The account list of the user is unknown or out of date. Versions can
+    # not be read before the ids are known, so this read is served but only
+    # the account list is cached; the next enquiry fills the entries.
+    loaded = load_accounts(accounts.filter(customer__user_id=user_id))
+    cache.set(user_key(user_id), list(loaded), settings.ENQUIRY_CACHE_TIMEOUT)
+    stats.record(False, time.perf_counter() - started)
+    return [data for _, data in loaded.values()]
+
+
+@receiver(balance_changed)
+def invalidate_balances(sender, account_ids, **kwargs):
+    bump_versions(account_ids)
+
+
+@receiver(post_save, sender=Account)
+@receiver(post_delete, sender=Account)
+def invalidate_account(sender, instance, **kwargs):
+    bump_versions([instance.pk])
+    if instance.customer_id:
+        # The account list of a previous owner is caught by the owner check
+        # in account_enquiry.
+        user_id = (
+            Customer.objects.filter(pk=instance.customer_id)
+            .values_list("user_id", flat=True)
+            .first()
+        )
+        cache.delete(user_key(user_id))
+
+
+@receiver(post_save, sender=Customer)
+def invalidate_customer(sender, instance, **kwargs):
+    if instance.user_id:
+        cache.delete(user_key(instance.user_id))
@@ -0,0 +1,460 @@
+"""
+Transaction history export.
+
+Rows are read with ``values_list`` over a chunked ``iterator()`` (a server side
+cursor on Postgres) and formatted into a fixed size text buffer, so memory use
+and time to first byte do not depend on the number of rows exported.
+
+The streaming export negotiates its format from the Accept header, CSV by
+default. CSV keeps writing ``description`` the way it always has, as the repr
+of the decoded dict. ``application/x-ndjson`` is one JSON object per line,
+written with a per row template around the C string encoder of ``json`` and
+the stored JSON text of ``description`` as is. ``COLUMNAR_TYPE`` is the binary columnar layout
+described at ``stream_columnar``. Both carry amounts as integer thousandths
+and are yielded a chunk at a time like the CSV.
+
+Large exports run as ``ExportJob``s on the Celery worker. The job file is a
+gzip CSV made of one gzip member per (account, month) partition, so the whole
+file decompresses as one CSV while the manifest gives the byte range of every
+partition for clients that only need part of it.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import struct
+from itertools import islice
+from json.encoder import encode_basestring
+
+from django.conf import settings
+from django.db.models import TextField
+from django.db.models.functions import Cast
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.negotiation import DefaultContentNegotiation
+
+from BankingBackend.constant import TRANSACTION_METHOD, TRANSACTION_TYPE
+
+EXPORT_HEADER = [
+    "Transaction ID",
+    "Transaction Type",
+    "Amount",
+    "Account Number",
+    "Transaction Method",
+    "Description",
+    "Reference Number",
+]
+
+# ``description_text`` is the stored JSON text of ``description``, exported
+# as is instead of being decoded and encoded again for every row.
+EXPORT_FIELDS = (
+    "transaction_id",
+    "transaction_type",
+    "amount",
+    "account__account_number",
+    "transaction_method",
+    "description_text",
+    "reference_number",
+)
+
+CHUNK_SIZE = 2000
+BUFFER_SIZE = 64 * 1024
+
+CSV_TYPE = "text/csv"
+NDJSON_TYPE = "application/x-ndjson"
+COLUMNAR_TYPE = "application/vnd.banking.transactions.columnar"
+
+# Rows per block of the columnar format.
+BLOCK_ROWS = 8192
+
+# Amounts of the NDJSON and columnar formats are integers of 10 ** -SCALE.
+SCALE = 3
+
+NULL_LENGTH = 0xFFFFFFFF
+
+COLUMNAR_MAGIC = b"TXNC"
+COLUMNAR_VERSION = 1
+COLUMNAR_SCHEMA = {
+    "scale": SCALE,
+    "columns": [
+        ["transaction_id", "string"],
+        ["transaction_type", "uint8"],
+        ["amount", "int64"],
+        ["account_number", "int64"],
+        ["transaction_method", "uint8"],
+        ["description", "string"],
+        ["reference_number", "string"],
+    ],
+    "dictionaries": {
+        "transaction_type": [value for value, _ in TRANSACTION_TYPE],
+        "transaction_method": [value for value, _ in TRANSACTION_METHOD],
+    },
+}
+TYPE_CODES = {
+    value: code
+    for code, value in enumerate(COLUMNAR_SCHEMA["dictionaries"]["transaction_type"])
+}
+METHOD_CODES = {
+    value: code
+    for code, value in enumerate(COLUMNAR_SCHEMA["dictionaries"]["transaction_method"])
+}
+
+
+def export_values(queryset, *extra):
+    """
+    ``values_list`` of the export columns of ``queryset`` followed by ``extra``.
+    """
+    return queryset.annotate(
+        description_text=Cast("description", TextField())
+    ).values_list(*EXPORT_FIELDS, *extra)
+
+
+def transaction_rows(queryset, chunk_size=CHUNK_SIZE):
+    """
+    Iterate the export columns of ``queryset`` without caching the rows.
+    """
+    return export_values(queryset).iterator(chunk_size=chunk_size)
+
+
+def stream_csv(rows, header=EXPORT_HEADER, buffer_size=BUFFER_SIZE):
+    """
+    Yield ``header`` and ``rows`` as CSV text in pieces of about ``buffer_size``.
+
+    The header is yielded on its own before the first row is read so the
+    client gets the first byte before the query has run.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= buffer_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def csv_row(row):
+    """
+    The export ``row`` as written to CSV, ``description`` decoded from its
+    stored JSON text so it is written as the repr of the dict.
+    """
+    row = list(row)
+    if row[5] is not None:
+        row[5] = json.loads(row[5])
+    return row
+
+
+def stream_transaction_csv(rows, buffer_size=BUFFER_SIZE):
+    """
+    ``stream_csv`` of export ``rows`` under ``EXPORT_HEADER``.
+    """
+    return stream_csv(map(csv_row, rows), buffer_size=buffer_size)
+
+
+def scaled(amount):
+    """
+    ``amount`` as an integer number of thousandths.
+    """
+    return int(amount.scaleb(SCALE))
+
+
+def stream_ndjson(rows, buffer_size=BUFFER_SIZE):
+    """
+    Yield ``rows`` as newline delimited JSON in pieces of about
+    ``buffer_size``, the amount in thousandths and the description as the
+    JSON object it is stored as.
+    """
+    lines, size = [], 0
+    for (
+        transaction_id,
+        transaction_type,
+        amount,
+        account_number,
+        transaction_method,
+        description,
+        reference_number,
+    ) in rows:
+        if reference_number is not None:
+            reference_number = encode_basestring(reference_number)
+        line = (
+            f'{{"transaction_id":{encode_basestring(transaction_id)},'
+            f'"transaction_type":{encode_basestring(transaction_type)},'
+            f'"amount":{scaled(amount)},"account_number":{account_number},'
+            f'"transaction_method":{encode_basestring(transaction_method)},'
+            f'"description":{description or "null"},'
+            f'"reference_number":{reference_number or "null"}}}\n'
+        )
+        lines.append(line)
+        size += len(line)
+        if size >= buffer_size:
+            yield "".join(lines)
+            lines, size = [], 0
+    if lines:
+        yield "".join(lines)
+
+
+def pack_strings(values):
+    """
+    A string column: the uint32 length of every value, ``NULL_LENGTH`` for
+    None, followed by the UTF-8 bytes of the values.
+    """
+    encoded = [None if value is None else value.encode() for value in values]
+    lengths = [NULL_LENGTH if value is None else len(value) for value in encoded]
+    return struct.pack(f"<{len(lengths)}I", *lengths) + b"".join(
+        value for value in encoded if value
+    )
+
+
+def stream_columnar(rows, block_rows=BLOCK_ROWS):
+    """
+    Yield ``rows`` in the binary columnar format, one block of up to
+    ``block_rows`` rows at a time. Integers are little endian.
+
+    The stream starts with ``COLUMNAR_MAGIC``, a uint16 version and a uint32
+    length followed by the UTF-8 JSON of ``COLUMNAR_SCHEMA``: the columns in
+    order with their types, the scale of amounts and the values of the uint8
+    coded columns. Every block is a uint32 row count ``n`` and then every
+    column in schema order, uint8 and int64 columns as ``n`` values and string
+    columns as in ``pack_strings``. A block of 0 rows ends the stream.
+    """
+    schema = json.dumps(COLUMNAR_SCHEMA).encode()
+    yield COLUMNAR_MAGIC + struct.pack("<HI", COLUMNAR_VERSION, len(schema)) + schema
+    rows = iter(rows)
+    for block in iter(lambda: list(islice(rows, block_rows)), []):
+        n = len(block)
+        (
+            transaction_ids,
+            transaction_types,
+            amounts,
+            account_numbers,
+            transaction_methods,
+            descriptions,
+            reference_numbers,
+        ) = zip(*block)
+        yield b"".join(
+            (
+                struct.pack("<I", n),
+                pack_strings(transaction_ids),
+                bytes(map(TYPE_CODES.__getitem__, transaction_types)),
+                struct.pack(f"<{n}q", *map(scaled, amounts)),
+                struct.pack(f"<{n}q", *account_numbers),
+                bytes(map(METHOD_CODES.__getitem__, transaction_methods)),
+                pack_strings(descriptions),
+                pack_strings(reference_numbers),
+            )
+        )
+    yield struct.pack("<I", 0)
+
+
+def read_exact(stream, size):
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError("Truncated columnar export")
+    return data
+
+
+def unpack_strings(stream, n):
+    lengths = struct.unpack(f"<{n}I", read_exact(stream, 4 * n))
+    data = read_exact(
+        stream, sum(length for length in lengths if length != NULL_LENGTH)
+    )
+    values, offset = [], 0
+    for length in lengths:
+        if length == NULL_LENGTH:
+            values.append(None)
+        else:
+            values.append(data[offset : offset + length].decode())
+            offset += length
+    return values
+
+
+def read_columnar(stream):
+    """
+    Yield every block of a columnar export read from the binary ``stream``
+    as ``{column: values}``, coded columns decoded and amounts in
+    thousandths.
+    """
+    if read_exact(stream, 4) != COLUMNAR_MAGIC:
+        raise ValueError("Not a columnar export")
+    version, length = struct.unpack("<HI", read_exact(stream, 6))
+    if version != COLUMNAR_VERSION:
+        raise ValueError(f"Unsupported columnar export version {version}")
+    schema = json.loads(read_exact(stream, length))
+    while True:
+        (n,) = struct.unpack("<I", read_exact(stream, 4))
+        if not n:
+            return
+        block = {}
+        for name, kind in schema["columns"]:
+            if kind == "string":
+                block[name] = unpack_strings(stream, n)
+            elif kind == "int64":
+                block[name] = list(struct.unpack(f"<{n}q", read_exact(stream, 8 * n)))
+            else:
+                values = schema["dictionaries"][name]
+                block[name] = [values[code] for code in read_exact(stream, n)]
+        yield block
+
+
+# Streaming writer and file extension of every export media type.
+EXPORT_FORMATS = {
+    CSV_TYPE: (stream_transaction_csv, "csv"),
+    NDJSON_TYPE: (stream_ndjson, "ndjson"),
+    COLUMNAR_TYPE: (stream_columnar, "txnc"),
+}
+
+
+class ExportContentNegotiation(DefaultContentNegotiation):
+    """
+    Let export views accept the export media types: responses that are not
+    exports, errors, fall back to the first renderer.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        try:
+            return super().select_renderer(request, renderers, format_suffix)
+        except NotAcceptable:
+            return renderers[0], renderers[0].media_type
+
+
+def negotiate_export(accept):
+    """
+    The export media type the ``Accept`` header prefers, CSV when it names
+    none of ``EXPORT_FORMATS``.
+    """
+    choices = []
+    for position, part in enumerate((accept or "").split(",")):
+        media_type, *params = (value.strip() for value in part.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_type in EXPORT_FORMATS and quality > 0:
+            choices.append((-quality, position, media_type))
+    return min(choices)[2] if choices else CSV_TYPE
+
+
+def open_member(raw):
+    """
+    Start a new gzip member at the current position of ``raw``.
+    """
+    member = gzip.GzipFile(fileobj=raw, mode="wb")
+    return io.TextIOWrapper(member, encoding="utf-8", newline="")
+
+
+def close_member(text):
+    """
+    Finish the gzip member behind ``text``, leaving ``raw`` open.
+    """
+    text.flush()
+    text.detach().close()
+
+
+def write_export(job, rows):
+    """
+    Write the gzip CSV of ``job`` under ``EXPORT_ROOT`` and return
+    ``(path, rows, manifest)``.
+
+    ``rows`` are export rows followed by their ``created_at`` with the rows
+    of every (account, month) together, see ``history_rows``.
+    """
+    directory = os.path.join(settings.EXPORT_ROOT, job.id)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, "transactions.csv.gz")
+    partial = path + ".part"
+
+    manifest = []
+    total = 0
+    with open(partial, "wb") as raw:
+        text = open_member(raw)
+        csv.writer(text).writerow(EXPORT_HEADER)
+        current = None
+        for row in rows:
+            partition = (row[3], row[-1].strftime("%Y-%m"))
+            if partition != current:
+                # Every partition starts on its own gzip member boundary.
+                close_member(text)
+                if manifest:
+                    manifest[-1]["length"] = raw.tell() - manifest[-1]["offset"]
+                manifest.append(
+                    {
+                        "account_number": partition[0],
+                        "month": partition[1],
+                        "offset": raw.tell(),
+                        "rows": 0,
+                    }
+                )
+                text = open_member(raw)
+                writer = csv.writer(text)
+                current = partition
+            writer.writerow(csv_row(row[:-1]))
+            manifest[-1]["rows"] += 1
+            total += 1
+        close_member(text)
+        if manifest:
+            manifest[-1]["length"] = raw.tell() - manifest[-1]["offset"]
+    os.replace(partial, path)
+    return path, total, manifest
+
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def ranged_file_response(request, path, content_type, filename, etag=None):
+    """
+    Serve ``path`` honouring a single ``Range: bytes=`` request header.
+
+    A stale ``If-Range`` or a multi range request gets the full file.
+    """
+    size = os.path.getsize(path)
+    start, end = 0, size - 1
+    partial = False
+    match = RANGE_RE.match(request.META.get("HTTP_RANGE", "").strip())
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if match and (if_range is None or if_range == etag):
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        elif last:
+            start = max(size - int(last), 0)
+        if not (first or last) or start > end:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+        partial = True
+
+    def read():
+        remaining = end - start + 1
+        with open(path, "rb") as stream:
+            stream.seek(start)
+            while remaining > 0:
+                chunk = stream.read(min(BUFFER_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    response = StreamingHttpResponse(
+        read(), status=206 if partial else 200, content_type=content_type
+    )
+    response["Content-Length"] = str(end - start + 1)
+    response["Accept-Ranges"] = "bytes"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    if etag:
+        response["ETag"] = etag
+    if partial:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return response
@@ -0,0 +1,133 @@
+"""
+Idempotent POST endpoints.
+
+A client marks a request as retryable with an ``Idempotency-Key`` header, for
+postings the ``reference_number`` of the body is used when the header is
+missing. The first response to a key is stored in ``IdempotencyKey`` for
+``IDEMPOTENCY_KEY_TTL`` seconds and replayed to every retry with the same
+body, without running the view again. Only successful responses are stored,
+a request that fails with an exception or an error response stores nothing
+and can be retried.
+
+The key row is inserted in the same transaction as the posting, so two
+concurrent requests with one key can not both post: the second waits on the
+primary key of the first and replays its response once it commits.
+"""
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from banking.models import IdempotencyKey
+
+HEADER = "HTTP_IDEMPOTENCY_KEY"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+def stored_key(scope, user_id, raw):
+    """
+    Primary key of the stored response of ``raw`` sent by ``user_id``.
+    """
+    return hashlib.sha256(f"{scope}:{user_id}:{raw}".encode()).hexdigest()
+
+
+def request_key(request, scope):
+    """
+    The stored key of ``request`` on the ``scope`` endpoint, ``None`` if the
+    request carries no idempotency key.
+    """
+    raw = request.META.get(HEADER)
+    if raw:
+        raw = f"header:{raw}"
+    elif request.data.get("reference_number"):
+        raw = f"reference:{request.data['reference_number']}"
+    else:
+        return None
+    return stored_key(scope, request.user.pk, raw)
+
+
+def fingerprint(request):
+    """
+    Hash of the request body, a key reused with another body is refused.
+    """
+    data = request.data.dict() if hasattr(request.data, "dict") else request.data
+    body = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def replay(stored, digest):
+    """
+    The response for a retry of the request behind ``stored``.
+    """
+    if stored.fingerprint != digest:
+        return Response(
+            {
+                "content": "Idempotency key reused with a different request",
+                "status": status.HTTP_422_UNPROCESSABLE_ENTITY,
+            },
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if stored.status_code is None:
+        return Response(
+            {
+                "content": "A request with this idempotency key is in progress",
+                "status": status.HTTP_409_CONFLICT,
+            },
+            status=status.HTTP_409_CONFLICT,
+        )
+    response = Response(stored.response, status=stored.status_code)
+    response[REPLAYED_HEADER] = "true"
+    return response
+
+
+def idempotent(scope):
+    """
+    Decorate the ``post`` of an APIView to replay the response of retries.
+    """
+
+    def decorator(post):
+        @functools.wraps(post)
+        def wrapper(self, request, *args, **kwargs):
+            key = request_key(request, scope)
+            if key is None:
+                return post(self, request, *args, **kwargs)
+            digest = fingerprint(request)
+
+            stored = IdempotencyKey.objects.live().filter(pk=key).first()
+            if stored is not None:
+                return replay(stored, digest)
+
+            now = timezone.now()
+            try:
+                with transaction.atomic():
+                    IdempotencyKey.objects.expired(now).filter(pk=key).delete()
+                    IdempotencyKey.objects.create(
+                        key=key,
+                        fingerprint=digest,
+                        expires_at=now
+                        + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+                    )
+                    response = post(self, request, *args, **kwargs)
+                    if not status.is_success(response.status_code):
+                        transaction.set_rollback(True)
+                        return response
+                    IdempotencyKey.objects.filter(pk=key).update(
+                        status_code=response.status_code, response=response.data
+                    )
+                    return response
+            except IntegrityError:
+                # A concurrent request with the same key committed first.
+                stored = IdempotencyKey.objects.filter(pk=key).first()
+                if stored is None:
+                    raise
+                return replay(stored, digest)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,159 @@
+"""
+Database-free ID allocation for account numbers and transaction IDs.
+
+The default allocator issues Snowflake style IDs: milliseconds since ``EPOCH_MS``
+in the high bits, then a 10 bit worker id and a 12 bit sequence. IDs sort by
+creation time and are unique as long as no two live processes share a worker
+id.
+
+The worker id is ``BANKING_WORKER_ID`` from the settings or the environment.
+Without one every process leases a free worker id in the Django cache with
+an atomic ``cache.add``, held for ``BANKING_WORKER_LEASE_TIMEOUT`` seconds
+and renewed by ``next_id``, probing from the low bits of its process id. A
+process that finds its lease gone leases another id before issuing more IDs.
+Leases only keep apart the processes that share the cache: several
+processes, on one host or many, need the Redis cache (``CACHE_BACKEND=redis``)
+or an explicit ``BANKING_WORKER_ID`` each, the local memory cache only
+covers a single process.
+
+Another allocator can be plugged in with the ``BANKING_ID_ALLOCATOR`` setting,
+a dotted path to a class with a ``next_id()`` method.
+"""
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+EPOCH_MS = 1609459200000  # 2021-01-01 00:00:00 UTC
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+
+class WorkerIdsExhausted(Exception):
+    """
+    Raised when every worker id is leased by another process.
+    """
+
+
+def lease_key(worker_id):
+    return f"ids:worker:{worker_id}"
+
+
+class SnowflakeAllocator:
+    """
+    Thread safe time/worker/sequence ID generator.
+    """
+
+    def __init__(self, worker_id=None):
+        if worker_id is None:
+            worker_id = getattr(settings, "BANKING_WORKER_ID", None)
+        if worker_id is None:
+            worker_id = os.environ.get("BANKING_WORKER_ID")
+        self.configured_worker_id = None if worker_id is None else int(worker_id)
+        self.reset()
+
+    def reset(self):
+        """
+        Drop the worker id and restart the sequence, called again in forked
+        children so they lease their own worker id instead of the parent's.
+        """
+        self.worker_id = None
+        self.holder = uuid.uuid4().hex
+        self.renew_at = 0
+        self.lock = threading.Lock()
+        self.last_ms = -1
+        self.sequence = 0
+
+    def lease(self):
+        """
+        Lease a free worker id in the cache, probing from the process id.
+        """
+        timeout = getattr(settings, "BANKING_WORKER_LEASE_TIMEOUT", 600)
+        start = os.getpid()
+        for offset in range(MAX_WORKER_ID + 1):
+            worker_id = (start + offset) & MAX_WORKER_ID
+            if cache.add(lease_key(worker_id), self.holder, timeout):
+                return worker_id
+        raise WorkerIdsExhausted(
+            "Every worker id is leased, set BANKING_WORKER_ID explicitly"
+        )
+
+    def renew(self):
+        """
+        Extend the lease of the worker id, or lease a new one when it was
+        lost, and schedule the next renewal.
+        """
+        if self.configured_worker_id is not None:
+            self.worker_id = self.configured_worker_id & MAX_WORKER_ID
+            self.renew_at = float("inf")
+            return
+        timeout = getattr(settings, "BANKING_WORKER_LEASE_TIMEOUT", 600)
+        key = None if self.worker_id is None else lease_key(self.worker_id)
+        if key is not None and cache.get(key) == self.holder:
+            cache.touch(key, timeout)
+        else:
+            self.worker_id = self.lease()
+        # Renew well before the lease runs out.
+        self.renew_at = time.monotonic() + timeout / 3
+
+    def next_id(self):
+        with self.lock:
+            if time.monotonic() >= self.renew_at:
+                self.renew()
+            now = int(time.time() * 1000) - EPOCH_MS
+            if now > self.last_ms:
+                self.last_ms = now
+                self.sequence = 0
+            else:
+                # Same millisecond, or the clock moved back: keep counting
+                # from the last timestamp and borrow the next millisecond when
+                # the sequence runs out, so IDs never repeat or go backwards.
+                self.sequence = (self.sequence + 1) & MAX_SEQUENCE
+                if self.sequence == 0:
+                    self.last_ms += 1
+            return (
+                (self.last_ms << (WORKER_BITS + SEQUENCE_BITS))
+                | (self.worker_id << SEQUENCE_BITS)
+                | self.sequence
+            )
+
+
+_allocator = None
+_allocator_lock = threading.Lock()
+
+
+def get_allocator():
+    """
+    Return the process wide allocator configured by ``BANKING_ID_ALLOCATOR``.
+    """
+    global _allocator
+    if _allocator is None:
+        with _allocator_lock:
+            if _allocator is None:
+                path = getattr(
+                    settings, "BANKING_ID_ALLOCATOR", "banking.ids.SnowflakeAllocator"
+                )
+                _allocator = import_string(path)()
+    return _allocator
+
+
+def next_id():
+    """
+    Return a new unique, time ordered integer ID.
+    """
+    return get_allocator().next_id()
+
+
+def _reset_after_fork():
+    if _allocator is not None and hasattr(_allocator, "reset"):
+        _allocator.reset()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,312 @@
+"""
+Per-request timing of views, database queries, serializers and Celery
+publishes.
+
+``InstrumentationMiddleware`` wraps every query of the request with
+``connection.execute_wrapper`` and collects the time serializers spend
+validating and rendering (``TimedSerializerMixin``) and the time spent
+publishing Celery tasks. The totals are sent back in a ``Server-Timing``
+header and added to in-process histograms per view, which ``render_metrics``
+prints in the Prometheus text format for the ``/metrics`` endpoint.
+
+Histograms live in the process, every worker of a multi-process server
+reports its own. Recording is a few ``perf_counter`` calls per query and one
+lock per request; ``manage.py benchinstrumentation`` measures the cost.
+"""
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from celery.signals import after_task_publish, before_task_publish
+from django.conf import settings
+from django.db import connection
+
+# Upper bounds of the histogram buckets, +Inf is implied.
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+_timings = ContextVar("banking_request_timings", default=None)
+
+
+class RequestTimings:
+    """
+    What one request spent its time on.
+    """
+
+    __slots__ = (
+        "queries",
+        "db_seconds",
+        "serializer_seconds",
+        "serializer_depth",
+        "publish_seconds",
+        "publish_started",
+    )
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializer_depth = 0
+        self.publish_seconds = 0.0
+        self.publish_started = None
+
+    def execute(self, execute, sql, params, many, context):
+        """
+        ``connection.execute_wrapper`` timing every query.
+        """
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.queries += 1
+
+    def server_timing(self, seconds):
+        """
+        ``Server-Timing`` header value, durations in milliseconds.
+        """
+        return (
+            f"app;dur={seconds * 1000:.2f}, "
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.queries} queries", '
+            f"serializer;dur={self.serializer_seconds * 1000:.2f}, "
+            f"celery;dur={self.publish_seconds * 1000:.2f}"
+        )
+
+
+def current_timings():
+    """
+    Timings of the request being handled, ``None`` outside the middleware.
+    """
+    return _timings.get()
+
+
+class Histogram:
+    """
+    Cumulative-on-render histogram with fixed buckets.
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """
+    Request histograms and counts per view of this process.
+    """
+
+    HISTOGRAMS = (
+        (
+            "banking_request_duration_seconds",
+            "Wall time of the request",
+            SECONDS_BUCKETS,
+        ),
+        ("banking_db_queries", "Database queries per request", QUERY_BUCKETS),
+        (
+            "banking_db_duration_seconds",
+            "Time spent in database queries per request",
+            SECONDS_BUCKETS,
+        ),
+        (
+            "banking_serializer_duration_seconds",
+            "Time spent validating and rendering serializers per request",
+            SECONDS_BUCKETS,
+        ),
+        (
+            "banking_celery_publish_duration_seconds",
+            "Time spent publishing Celery tasks per request",
+            SECONDS_BUCKETS,
+        ),
+    )
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.views = {}
+            self.requests = {}
+
+    def observe(self, view, status, seconds, timings):
+        values = (
+            seconds,
+            timings.queries,
+            timings.db_seconds,
+            timings.serializer_seconds,
+            timings.publish_seconds,
+        )
+        with self.lock:
+            histograms = self.views.get(view)
+            if histograms is None:
+                histograms = self.views[view] = [
+                    Histogram(buckets) for _, _, buckets in self.HISTOGRAMS
+                ]
+            for histogram, value in zip(histograms, values):
+                histogram.observe(value)
+            key = (view, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    def render(self):
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        with self.lock:
+            views = {
+                view: [
+                    (list(histogram.counts), histogram.sum, histogram.count)
+                    for histogram in histograms
+                ]
+                for view, histograms in self.views.items()
+            }
+            requests = dict(self.requests)
+
+        lines = [
+            "# HELP banking_requests_total Requests handled per view and status",
+            "# TYPE banking_requests_total counter",
+        ]
+        for (view, status), count in sorted(requests.items()):
+            lines.append(
+                f'banking_requests_total{{view="{view}",status="{status}"}} {count}'
+            )
+        for index, (name, help_text, buckets) in enumerate(self.HISTOGRAMS):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for view in sorted(views):
+                counts, total, count = views[view][index]
+                cumulative = 0
+                for bound, bucket_count in zip((*buckets, "+Inf"), counts):
+                    cumulative += bucket_count
+                    lines.append(
+                        f'{name}_bucket{{view="{view}",le="{bound}"}} {cumulative}'
+                    )
+                lines.append(f'{name}_sum{{view="{view}"}} {total}')
+                lines.append(f'{name}_count{{view="{view}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def render_metrics():
+    return metrics.render()
+
+
+class InstrumentationMiddleware:
+    """
+    Time every request and add it to the histograms of its view.
+
+    Async capable, so async views run without a thread hop. Their queries
+    run in other threads and are timed by ``banking.async_views.database``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Mark the instance as a coroutine function, as MiddlewareMixin does.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not settings.INSTRUMENTATION_ENABLED:
+            return self.get_response(request)
+        timings = RequestTimings()
+        token = _timings.set(timings)
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(timings.execute):
+                response = self.get_response(request)
+        finally:
+            _timings.reset(token)
+        return self.observe(request, response, timings, started)
+
+    async def __acall__(self, request):
+        if not settings.INSTRUMENTATION_ENABLED:
+            return await self.get_response(request)
+        timings = RequestTimings()
+        token = _timings.set(timings)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _timings.reset(token)
+        return self.observe(request, response, timings, started)
+
+    def observe(self, request, response, timings, started):
+        # A streamed body is not included, only the time to its first byte.
+        seconds = time.perf_counter() - started
+        metrics.observe(view_name(request), response.status_code, seconds, timings)
+        response["Server-Timing"] = timings.server_timing(seconds)
+        return response
+
+
+def view_name(request):
+    """
+    Name of the view class or function that handled ``request``.
+    """
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unresolved"
+    view = getattr(match.func, "view_class", match.func)
+    return getattr(view, "__name__", "unknown")
+
+
+class TimedSerializerMixin:
+    """
+    Add the time a serializer spends validating and rendering to the
+    serializer time of the request. Nested serializers count once.
+    """
+
+    def run_validation(self, *args, **kwargs):
+        timings = _timings.get()
+        if timings is None:
+            return super().run_validation(*args, **kwargs)
+        return _timed(timings, super().run_validation, args, kwargs)
+
+    def to_representation(self, *args, **kwargs):
+        timings = _timings.get()
+        if timings is None:
+            return super().to_representation(*args, **kwargs)
+        return _timed(timings, super().to_representation, args, kwargs)
+
+
+def _timed(timings, method, args, kwargs):
+    timings.serializer_depth += 1
+    started = time.perf_counter()
+    try:
+        return method(*args, **kwargs)
+    finally:
+        timings.serializer_depth -= 1
+        if not timings.serializer_depth:
+            timings.serializer_seconds += time.perf_counter() - started
+
+
+@before_task_publish.connect
+def publish_started(**kwargs):
+    timings = _timings.get()
+    if timings is not None:
+        timings.publish_started = time.perf_counter()
+
+
+@after_task_publish.connect
+def publish_finished(**kwargs):
+    timings = _timings.get()
+    if timings is not None and timings.publish_started is not None:
+        timings.publish_seconds += time.perf_counter() - timings.publish_started
+        timings.publish_started = None
@@ -0,0 +1,88 @@
+"""
+Point-in-time balances from the ledger.
+
+The balance of an account at any time is its newest ``BalanceSnapshot`` taken
+at or before that time plus the ledger lines posted since. Snapshots are
+written daily for every account with lines that day, so the lines to add up
+are at most a day's worth for an active account, read with a bounded range
+scan of the (account, posted_at) index instead of summing every line since
+the account was opened.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from banking.models import BalanceSnapshot, LedgerLine
+from BankingBackend.constant import CUSTOMER_BOOK
+
+SNAPSHOT_CHUNK_SIZE = 500
+
+
+def day_bounds(day):
+    """
+    Start of ``day`` and of the next day in the current time zone.
+    """
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def balance_at(account_id, at):
+    """
+    Return ``(balance, snapshot)``, the balance of the account from every line
+    posted up to and including ``at`` and the snapshot it started from.
+    """
+    snapshot = (
+        BalanceSnapshot.objects.filter(account_id=account_id, as_of__lte=at)
+        .order_by("-as_of")
+        .first()
+    )
+    if snapshot is None:
+        start, balance = None, Decimal("0.000")
+    else:
+        start, balance = snapshot.as_of, snapshot.balance
+    return balance + LedgerLine.objects.balance_between(account_id, start, at), snapshot
+
+
+def full_balance_at(account_id, at):
+    """
+    The balance at ``at`` summed from every line of the account, the slow
+    path ``balance_at`` avoids.
+    """
+    return LedgerLine.objects.balance_between(account_id, None, at)
+
+
+def snapshot_day(day, chunk_size=SNAPSHOT_CHUNK_SIZE):
+    """
+    Write the end of ``day`` snapshot of every account with lines that day.
+
+    Running a day again replaces its snapshots. Days must be snapshotted in
+    order for the snapshots of a day to start from the previous one.
+    Returns the number of snapshots written.
+    """
+    start, end = day_bounds(day)
+    last_included = end - timedelta(microseconds=1)
+    accounts = list(
+        LedgerLine.objects.filter(
+            book=CUSTOMER_BOOK, posted_at__gte=start, posted_at__lt=end
+        )
+        .order_by()
+        .values_list("account_id", flat=True)
+        .distinct()
+    )
+    for offset in range(0, len(accounts), chunk_size):
+        chunk = accounts[offset : offset + chunk_size]
+        snapshots = [
+            BalanceSnapshot(
+                account_id=account_id,
+                day=day,
+                as_of=end,
+                balance=balance_at(account_id, last_included)[0],
+            )
+            for account_id in chunk
+        ]
+        with transaction.atomic():
+            BalanceSnapshot.objects.filter(account_id__in=chunk, day=day).delete()
+            BalanceSnapshot.objects.bulk_create(snapshots)
+    return len(accounts)
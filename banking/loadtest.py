@@ -0,0 +1,598 @@
+"""
+Load test of the banking endpoints.
+
+Every scenario sends one kind of request with the tokens of seeded users,
+either through the Django test client in this process or over HTTP to a
+WSGI/ASGI server, from a pool of threads. Results are plain dicts so runs can
+be written to JSON and compared with a stored baseline.
+
+``run_slow_clients`` instead opens thousands of concurrent connections from
+one event loop, each trickling its requests in slowly, against a uvicorn or
+gunicorn server started with ``server``.
+"""
+import asyncio
+import http.client
+import json
+import platform
+import shutil
+import socket
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.servers.basehttp import ThreadedWSGIServer
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, RequestFactory
+from django.test.testcases import QuietWSGIRequestHandler
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from accounts.models import User
+from banking.benchmark import run_concurrently, summarize
+from banking.models import Account
+from banking.seed import SEED_PASSWORD
+from BankingBackend.constant import ACTIVE, BANK_MANAGER, CASH, CUSTOMER, EMPLOYEE
+
+ENDPOINTS = (
+    "obtain-token",
+    "credit-amount",
+    "debit-amount",
+    "customer-enquiry",
+    "transaction-csv",
+    "transfer",
+)
+AMOUNT = Decimal("1.000")
+# Views with an async version under banking/async/
+ASYNC_URL_NAMES = {"credit_amount", "debit_amount", "enquiry", "transfer"}
+# Command lines of the servers run_slow_clients compares, one listening
+# socket and ``workers`` processes each.
+SERVERS = {
+    "uvicorn": [
+        "uvicorn",
+        "BankingBackend.asgi:application",
+        "--host=127.0.0.1",
+        "--port={port}",
+        "--workers={workers}",
+        "--backlog=4096",
+        "--log-level=warning",
+        "--no-access-log",
+    ],
+    "gunicorn": [
+        "gunicorn",
+        "BankingBackend.wsgi:application",
+        "--bind=127.0.0.1:{port}",
+        "--workers={workers}",
+        "--worker-class=sync",
+        "--backlog=4096",
+        "--log-level=warning",
+    ],
+}
+
+
+class LoadTestError(Exception):
+    """
+    Raised when the database has no data to load test with.
+    """
+
+
+class UnexpectedResponse(Exception):
+    """
+    Raised by a scenario request answered with an unexpected status.
+    """
+
+
+class Fixture:
+    """
+    Seeded users the scenarios send requests as.
+
+    Customers must have a single active account holding enough to pay for
+    every transfer and debit of the run, staff are found by user type.
+    obtain-token logs in as the customers with the seed password.
+    """
+
+    def __init__(self, customers=20, min_balance=Decimal("1000")):
+        self.employee = self.staff(EMPLOYEE)
+        self.manager = self.staff(BANK_MANAGER)
+        # Transfers look the sender account up by user, so only customers
+        # with a single account can send.
+        self.accounts = list(
+            Account.objects.annotate(owned=Count("customer__customer_account"))
+            .filter(
+                owned=1,
+                status=ACTIVE,
+                balance__gte=min_balance,
+                customer__user__user_type=CUSTOMER,
+            )
+            .select_related("customer__user", "customer__branch")
+            .order_by("account_number")[:customers]
+        )
+        if len(self.accounts) < 2:
+            raise LoadTestError(
+                "Need at least two funded customer accounts, run "
+                "createsamplerecords or pass --seed-accounts"
+            )
+        users = [account.customer.user for account in self.accounts]
+        # Seeded users share one password hash, verify it once.
+        login = next((u for u in users if u.check_password(SEED_PASSWORD)), None)
+        if login is None:
+            raise LoadTestError("No customer has the seed password")
+        self.logins = [user for user in users if user.password == login.password]
+        self.tokens = {
+            user.pk: Token.objects.get_or_create(user=user)[0].key
+            for user in [self.employee, self.manager]
+            + users
+        }
+
+    def staff(self, user_type):
+        user = User.objects.filter(user_type=user_type, is_active=True).first()
+        if user is None:
+            raise LoadTestError(
+                f"No {user_type} user found, run createsamplerecords first"
+            )
+        return user
+
+    def token(self, user):
+        return self.tokens[user.pk]
+
+
+def scenarios(fixture, asynchronous=False):
+    """
+    Map every endpoint to a function building request ``i``: a tuple of
+    method, path, JSON body, the user to authenticate as and the expected
+    status. ``asynchronous`` sends the requests to the async views where an
+    endpoint has one.
+    """
+    accounts = fixture.accounts
+    today = timezone.localdate()
+
+    def url(name):
+        if asynchronous and name in ASYNC_URL_NAMES:
+            name = f"async_{name}"
+        return reverse(name)
+
+    def obtain_token(i):
+        user = fixture.logins[i % len(fixture.logins)]
+        body = {"username": user.username, "password": SEED_PASSWORD}
+        return "POST", reverse("token"), body, None, 200
+
+    def posting(name):
+        def request(i):
+            account = accounts[i % len(accounts)]
+            body = {
+                "account": account.account_number,
+                "transaction_method": CASH,
+                "amount": str(AMOUNT),
+                "source": "loadtest",
+                "customer_name": account.customer.user.get_full_name(),
+            }
+            return "POST", url(name), body, fixture.employee, 200
+
+        return request
+
+    def enquiry(i):
+        user = accounts[i % len(accounts)].customer.user
+        return "GET", url("enquiry"), None, user, 200
+
+    def history(i):
+        body = {
+            "acc_ids": [accounts[i % len(accounts)].account_number],
+            "start_date": str(today - timedelta(days=30)),
+            "end_date": str(today),
+        }
+        return "POST", reverse("history"), body, fixture.manager, 200
+
+    def transfer(i):
+        # Send around a ring so every balance ends where it started.
+        sender = accounts[i % len(accounts)]
+        receiver = accounts[(i + 1) % len(accounts)]
+        body = {
+            "account_number": receiver.account_number,
+            "amount": str(AMOUNT),
+            "account_holder_name": receiver.customer.user.get_full_name(),
+            "contact_number": receiver.customer.user.contact_number or "0",
+            "remarks": "loadtest",
+            "source": "loadtest",
+            "ifsc_code": receiver.customer.branch.ifsc_code,
+        }
+        return "POST", url("transfer"), body, sender.customer.user, 200
+
+    return {
+        "obtain-token": obtain_token,
+        "credit-amount": posting("credit_amount"),
+        "debit-amount": posting("debit_amount"),
+        "customer-enquiry": enquiry,
+        "transaction-csv": history,
+        "transfer": transfer,
+    }
+
+
+class ClientTransport:
+    """
+    Send requests through the Django test client, a client per thread.
+    """
+
+    name = "client"
+
+    def __init__(self, fixture):
+        self.fixture = fixture
+        self.local = threading.local()
+
+    @contextmanager
+    def running(self):
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            yield self
+
+    def request(self, method, path, body, user):
+        if not hasattr(self.local, "client"):
+            self.local.client = Client()
+        headers = {}
+        if user is not None:
+            headers["HTTP_AUTHORIZATION"] = f"Token {self.fixture.token(user)}"
+        if method == "GET":
+            response = self.local.client.get(path, **headers)
+        else:
+            response = self.local.client.post(
+                path, json.dumps(body), content_type="application/json", **headers
+            )
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response.status_code
+
+
+class WSGITransport:
+    """
+    Call the WSGI application from the sending thread, request signals
+    included, so the threads keep their database connections across
+    requests like the threads of a server.
+    """
+
+    name = "wsgi"
+
+    def __init__(self, fixture):
+        self.fixture = fixture
+        self.factory = RequestFactory()
+        self.application = None
+
+    @contextmanager
+    def running(self):
+        self.application = get_wsgi_application()
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            yield self
+
+    def request(self, method, path, body, user):
+        headers = {}
+        if user is not None:
+            headers["HTTP_AUTHORIZATION"] = f"Token {self.fixture.token(user)}"
+        if method == "GET":
+            request = self.factory.get(path, **headers)
+        else:
+            request = self.factory.post(
+                path, json.dumps(body), content_type="application/json", **headers
+            )
+        statuses = []
+
+        def start_response(status, response_headers, exc_info=None):
+            statuses.append(status)
+
+        response = self.application(request.environ, start_response)
+        try:
+            for _ in response:
+                pass
+        finally:
+            # Sends request_finished.
+            response.close()
+        return int(statuses[0].split()[0])
+
+
+class RequestHandler(QuietWSGIRequestHandler):
+    # Headers and body are written separately, without TCP_NODELAY every
+    # keep-alive response waits for the delayed ACK of the client.
+    disable_nagle_algorithm = True
+
+
+@contextmanager
+def local_server():
+    """
+    Serve the WSGI application from threads of this process, yield its URL.
+    """
+    server = ThreadedWSGIServer(("127.0.0.1", 0), RequestHandler)
+    server.set_app(get_wsgi_application())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def server(name, workers=1, timeout=30):
+    """
+    Start the ``SERVERS`` server ``name`` on a free local port, or the
+    threaded WSGI server of this process for ``local``, and yield its URL.
+    """
+    if name == "local":
+        with local_server() as url:
+            yield url
+        return
+    if shutil.which(SERVERS[name][0]) is None:
+        raise LoadTestError(f"{name} is not installed, pip install {name}")
+    port = free_port()
+    args = [arg.format(port=port, workers=workers) for arg in SERVERS[name]]
+    process = subprocess.Popen(args, cwd=settings.BASE_DIR)
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            if process.poll() is not None:
+                raise LoadTestError(f"{name} exited with {process.returncode}")
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise LoadTestError(f"{name} did not start in {timeout}s")
+                time.sleep(0.1)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+class HttpTransport:
+    """
+    Send requests over HTTP/1.1 keep-alive connections, one per thread, to
+    ``url`` or to a threaded WSGI server started on a free local port.
+    """
+
+    name = "http"
+
+    def __init__(self, fixture, url=None):
+        self.fixture = fixture
+        self.url = url
+        self.local = threading.local()
+
+    @contextmanager
+    def running(self):
+        if self.url:
+            yield self
+            return
+        with local_server() as url:
+            self.url = url
+            try:
+                yield self
+            finally:
+                self.url = None
+
+    def connection(self):
+        if getattr(self.local, "connection", None) is None:
+            parts = urlsplit(self.url)
+            self.local.connection = http.client.HTTPConnection(
+                parts.hostname, parts.port, timeout=60
+            )
+            self.local.prefix = parts.path.rstrip("/")
+        return self.local.connection
+
+    def request(self, method, path, body, user):
+        headers = {"Content-Type": "application/json"}
+        if user is not None:
+            headers["Authorization"] = f"Token {self.fixture.token(user)}"
+        payload = None if body is None else json.dumps(body)
+        for attempt in range(2):
+            conn = self.connection()
+            try:
+                conn.request(method, self.local.prefix + path, payload, headers)
+                response = conn.getresponse()
+                response.read()
+            except (http.client.HTTPException, ConnectionError):
+                # The server closed the keep-alive connection, reconnect once.
+                conn.close()
+                self.local.connection = None
+                if attempt:
+                    raise
+                continue
+            if response.getheader("Connection", "").lower() == "close":
+                conn.close()
+                self.local.connection = None
+            return response.status
+
+
+def count_queries(fixture, build, samples):
+    """
+    Average database queries of ``samples`` requests made in this thread.
+    """
+    transport = ClientTransport(fixture)
+    with transport.running(), CaptureQueriesContext(connection) as queries:
+        for i in range(samples):
+            method, path, body, user, _ = build(i)
+            transport.request(method, path, body, user)
+    return round(len(queries) / samples, 2) if samples else None
+
+
+def run_scenario(transport, build, requests, threads):
+    """
+    Send ``requests`` requests of a scenario from ``threads`` threads.
+    """
+
+    def send(i):
+        method, path, body, user, expected = build(i)
+        status = transport.request(method, path, body, user)
+        if status != expected:
+            raise UnexpectedResponse(f"{method} {path} returned {status}")
+
+    latencies, errors, elapsed = run_concurrently(send, list(range(requests)), threads)
+    result = summarize(latencies, elapsed)
+    result["errors"] = len(errors)
+    if errors:
+        result["first_error"] = repr(errors[0])
+    return result
+
+
+def run(
+    transport,
+    endpoints=ENDPOINTS,
+    requests=200,
+    threads=8,
+    query_samples=5,
+    on_result=None,
+):
+    """
+    Load test ``endpoints`` and return the results document.
+    """
+    builds = scenarios(transport.fixture)
+    results = {}
+    with transport.running():
+        for name in endpoints:
+            result = run_scenario(transport, builds[name], requests, threads)
+            result["queries"] = count_queries(
+                transport.fixture, builds[name], query_samples
+            )
+            results[name] = result
+            if on_result is not None:
+                on_result(name, result)
+    return {
+        "meta": {
+            "created_at": timezone.now().isoformat(),
+            "transport": transport.name,
+            "requests": requests,
+            "threads": threads,
+            "database": connection.vendor,
+            "accounts": Account.objects.count(),
+            "debug": settings.DEBUG,
+            "python": platform.python_version(),
+        },
+        "endpoints": results,
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Regressions of ``results`` against ``baseline``, as messages.
+
+    Latency percentiles may grow and throughput may drop by ``threshold``
+    (0.2 is 20%), queries per request may not grow at all.
+    """
+    regressions = []
+    for name, result in results["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(name)
+        if base is None:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            if base[metric] and result[metric] > base[metric] * (1 + threshold):
+                regressions.append(
+                    f"{name} {metric} {result[metric]} > baseline {base[metric]}"
+                )
+        if base["throughput"] and result["throughput"] < base["throughput"] * (
+            1 - threshold
+        ):
+            regressions.append(
+                f"{name} throughput {result['throughput']} < baseline "
+                f"{base['throughput']}"
+            )
+        if base.get("queries") is not None and result["queries"] is not None:
+            if result["queries"] > base["queries"]:
+                regressions.append(
+                    f"{name} queries {result['queries']} > baseline {base['queries']}"
+                )
+    return regressions
+
+
+async def slow_request(host, port, head, body, delay):
+    """
+    Send one request over a new connection, the first line now and the rest
+    after ``delay`` seconds, and return the response status.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        first, rest = head.split(b"\r\n", 1)
+        writer.write(first + b"\r\n")
+        await writer.drain()
+        await asyncio.sleep(delay)
+        writer.write(rest + body)
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+    finally:
+        writer.close()
+    try:
+        return int(status_line.split()[1])
+    except (IndexError, ValueError):
+        raise UnexpectedResponse(f"Malformed status line {status_line!r}")
+
+
+async def slow_clients(fixture, url, build, connections, requests, delay, timeout):
+    parts = urlsplit(url)
+    prefix = parts.path.rstrip("/")
+    latencies = []
+    errors = []
+
+    def encode(i):
+        method, path, body, user, expected = build(i)
+        payload = b"" if body is None else json.dumps(body).encode()
+        headers = [
+            f"{method} {prefix}{path} HTTP/1.1",
+            f"Host: {parts.hostname}",
+            "Connection: close",
+            "Content-Type: application/json",
+            f"Content-Length: {len(payload)}",
+        ]
+        if user is not None:
+            headers.append(f"Authorization: Token {fixture.token(user)}")
+        head = ("\r\n".join(headers) + "\r\n\r\n").encode()
+        return f"{method} {path}", head, payload, expected
+
+    async def client(number):
+        for i in range(number * requests, (number + 1) * requests):
+            name, head, payload, expected = encode(i)
+            started = time.perf_counter()
+            try:
+                code = await asyncio.wait_for(
+                    slow_request(parts.hostname, parts.port, head, payload, delay),
+                    timeout,
+                )
+                if code != expected:
+                    raise UnexpectedResponse(f"{name} returned {code}")
+            except (OSError, asyncio.TimeoutError, UnexpectedResponse) as e:
+                errors.append(e)
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(number) for number in range(connections)))
+    result = summarize(latencies, time.perf_counter() - started)
+    result["errors"] = len(errors)
+    if errors:
+        result["first_error"] = repr(errors[0])
+    return result
+
+
+def run_slow_clients(
+    fixture, url, build, connections=1000, requests=5, delay=0.5, timeout=60
+):
+    """
+    Keep ``connections`` slow clients busy at once, each sending
+    ``requests`` requests one after another on fresh connections. Every
+    request waits ``delay`` seconds between its request line and the rest.
+    """
+    return asyncio.run(
+        slow_clients(fixture, url, build, connections, requests, delay, timeout)
+    )
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from banking.partitions import archivable_months, archive_month, ensure_partitions
+
+
+class Command(BaseCommand):
+    """
+    Archive the months of transactions older than --months months to gzip
+    files and remove them from the live table, detaching their partitions on
+    Postgres. The partitions of the coming months are created first.
+    """
+
+    help = "Archive old months of transactions and create the coming partitions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months",
+            type=int,
+            default=None,
+            help="Age in months to archive from, TRANSACTION_ARCHIVE_MONTHS by "
+            "default",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only list the months that would be archived",
+        )
+
+    def handle(self, *args, **options):
+        if options["months"] is not None and options["months"] < 1:
+            raise CommandError("--months must be at least 1")
+        if not options["dry_run"]:
+            months = ensure_partitions()
+            if months:
+                self.stdout.write(f"Partitions ready up to {months[-1]:%Y-%m}")
+        for month in archivable_months(options["months"]):
+            if options["dry_run"]:
+                self.stdout.write(f"{month:%Y-%m}: would be archived")
+                continue
+            archive = archive_month(month)
+            self.stdout.write(
+                f"{month:%Y-%m}: {archive.rows} transactions, {archive.size} bytes "
+                f"to {archive.path}"
+            )
@@ -0,0 +1,52 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from banking.models import Transaction
+from banking.summaries import backfill
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the daily totals of a range of days from the transactions, from
+    the day of the oldest transaction to yesterday by default. Months that
+    are archived keep their totals.
+    """
+
+    help = "Rebuild the daily Credit and Debit totals from the transactions"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="First day, YYYY-MM-DD")
+        parser.add_argument("--end", help="Last day, YYYY-MM-DD")
+
+    def handle(self, *args, **options):
+        start, end = day_range(options)
+        if start is None:
+            self.stdout.write("No transactions")
+            return
+        written = backfill(start, end)
+        self.stdout.write(f"{start} to {end}: {written} daily totals written")
+
+
+def day_range(options):
+    """
+    ``(start, end)`` days of the --start and --end options.
+    """
+    try:
+        end = (
+            date.fromisoformat(options["end"])
+            if options["end"]
+            else timezone.localdate() - timedelta(days=1)
+        )
+        if options["start"]:
+            start = date.fromisoformat(options["start"])
+        else:
+            oldest = Transaction.objects.aggregate(oldest=Min("created_at"))["oldest"]
+            start = timezone.localdate(oldest) if oldest else None
+    except ValueError as e:
+        raise CommandError(e)
+    if start is not None and start > end:
+        raise CommandError("--start must not be after --end")
+    return start, end
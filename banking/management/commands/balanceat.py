@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from banking.ledger import balance_at
+from banking.models import Account
+
+
+class Command(BaseCommand):
+    """
+    Print the ledger balance of an account at a point in time.
+    """
+
+    help = "Point-in-time balance of an account from the ledger"
+
+    def add_arguments(self, parser):
+        parser.add_argument("account_number", type=int)
+        parser.add_argument("at", nargs="?", help="ISO timestamp, default now")
+
+    def handle(self, *args, **options):
+        at = timezone.now()
+        if options["at"]:
+            at = parse_datetime(options["at"])
+            if at is None:
+                raise CommandError(f"Invalid timestamp {options['at']}")
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+        account = Account.objects.filter(
+            account_number=options["account_number"]
+        ).first()
+        if account is None:
+            raise CommandError("Account number not found")
+
+        balance, snapshot = balance_at(account.pk, at)
+        start = f"snapshot of {snapshot.as_of}" if snapshot else "opening"
+        self.stdout.write(f"{account.account_number} at {at}: {balance} (from {start})")
@@ -0,0 +1,114 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from banking.authentication import CachedTokenAuthentication, tokens
+from banking.models import Account
+from BankingBackend.constant import CUSTOMER
+
+# Settings of every mode: the token query on every request, the shared
+# cache tier alone and both tiers.
+MODES = (
+    ("query", {"AUTH_TOKEN_CACHE_ENABLED": False}),
+    (
+        "shared",
+        {
+            "AUTH_TOKEN_CACHE_ENABLED": True,
+            "AUTH_TOKEN_SHARED_CACHE": True,
+            "AUTH_TOKEN_LOCAL_TIMEOUT": -1,
+        },
+    ),
+    ("local", {"AUTH_TOKEN_CACHE_ENABLED": True, "AUTH_TOKEN_SHARED_CACHE": True}),
+)
+
+
+class Command(BaseCommand):
+    """
+    Compare token authentication querying on every request with the shared
+    cache tier and with the LRU of the process, alone and on customer-enquiry
+    end to end.
+    """
+
+    help = "Benchmark cached token authentication"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--customers", type=int, default=50)
+        parser.add_argument("--rounds", type=int, default=5)
+
+    def handle(self, *args, **options):
+        accounts = list(
+            Account.objects.filter(customer__user__user_type=CUSTOMER)
+            .select_related("customer__user")
+            .order_by("account_number")[: options["customers"]]
+        )
+        if not accounts:
+            raise CommandError(
+                "No customer accounts found, run createsamplerecords first"
+            )
+        keys = [
+            Token.objects.get_or_create(user=account.customer.user)[0].key
+            for account in accounts
+        ]
+        self.authenticate(keys, options["requests"] * 5, options["rounds"])
+        self.enquiry(keys, options["requests"], options["rounds"])
+
+    def best(self, rounds, count, call):
+        """
+        Fastest mean seconds per call of every mode over interleaved rounds.
+        """
+        best = {}
+        for _ in range(rounds):
+            for mode, overrides in MODES:
+                tokens.clear()
+                cache.clear()
+                with override_settings(**overrides):
+                    # Warm the caches before timing.
+                    call(-1)
+                    started = time.perf_counter()
+                    for i in range(count):
+                        call(i)
+                    mean = (time.perf_counter() - started) / count
+                best[mode] = min(best.get(mode, mean), mean)
+        return best
+
+    def authenticate(self, keys, count, rounds):
+        authentication = CachedTokenAuthentication()
+
+        def call(i):
+            if i < 0:
+                for key in keys:
+                    authentication.authenticate_credentials(key)
+            else:
+                authentication.authenticate_credentials(keys[i % len(keys)])
+
+        best = self.best(rounds, count, call)
+        self.stdout.write(
+            "authenticate: "
+            + ", ".join(f"{mode} {best[mode] * 1e6:.1f}us" for mode, _ in MODES)
+        )
+
+    def enquiry(self, keys, count, rounds):
+        clients = [Client(HTTP_AUTHORIZATION=f"Token {key}") for key in keys]
+        url = reverse("enquiry")
+
+        def call(i):
+            for client in clients if i < 0 else [clients[i % len(clients)]]:
+                if client.get(url).status_code != 200:
+                    raise CommandError("Enquiry failed")
+
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            best = self.best(rounds, count, call)
+        for mode, _ in MODES:
+            self.stdout.write(
+                f"customer-enquiry auth {mode}: {1 / best[mode]:.1f} requests/s "
+                f"({best[mode] * 1000:.3f}ms per request)"
+            )
+        self.stdout.write(
+            f"local cache speedup: {best['query'] / best['local']:.2f}x"
+        )
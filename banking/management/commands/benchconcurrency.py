@@ -0,0 +1,100 @@
+import json
+import resource
+
+from django.core.management.base import BaseCommand, CommandError
+
+from banking.loadtest import (
+    SERVERS,
+    Fixture,
+    LoadTestError,
+    run_slow_clients,
+    scenarios,
+    server,
+)
+
+ENDPOINTS = ("customer-enquiry", "credit-amount", "debit-amount", "transfer")
+
+
+class Command(BaseCommand):
+    """
+    Hold thousands of concurrent slow connections against uvicorn serving
+    the async views and gunicorn sync workers serving the DRF views, and
+    report the throughput and latency each server keeps up.
+    """
+
+    help = "Benchmark concurrent slow clients under uvicorn and gunicorn"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--runs",
+            default="uvicorn:async,gunicorn:sync",
+            help="Comma separated server:views pairs, servers are "
+            f"{', '.join([*SERVERS, 'local'])} and views sync or async",
+        )
+        parser.add_argument("--workers", type=int, default=1)
+        parser.add_argument(
+            "--endpoint", choices=ENDPOINTS, default="customer-enquiry"
+        )
+        parser.add_argument("--connections", type=int, default=1000)
+        parser.add_argument(
+            "--requests", type=int, default=5, help="Requests per connection"
+        )
+        parser.add_argument(
+            "--delay",
+            type=float,
+            default=0.5,
+            help="Seconds every request waits between its first line and "
+            "the rest",
+        )
+        parser.add_argument("--timeout", type=float, default=60)
+        parser.add_argument("--customers", type=int, default=20)
+        parser.add_argument("--output", help="Write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        runs = []
+        for run in options["runs"].split(","):
+            name, _, views = run.strip().partition(":")
+            if name not in SERVERS and name != "local":
+                raise CommandError(f"Unknown server {name}")
+            if views not in ("sync", "async"):
+                raise CommandError(f"Views of {run} must be sync or async")
+            runs.append((name, views))
+
+        # Every connection is a file descriptor on both ends.
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if hard == resource.RLIM_INFINITY or hard > soft:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        try:
+            fixture = Fixture(customers=options["customers"])
+        except LoadTestError as e:
+            raise CommandError(e)
+
+        results = {}
+        for name, views in runs:
+            build = scenarios(fixture, asynchronous=views == "async")[
+                options["endpoint"]
+            ]
+            try:
+                with server(name, workers=options["workers"]) as url:
+                    result = run_slow_clients(
+                        fixture,
+                        url,
+                        build,
+                        connections=options["connections"],
+                        requests=options["requests"],
+                        delay=options["delay"],
+                        timeout=options["timeout"],
+                    )
+            except LoadTestError as e:
+                raise CommandError(e)
+            key = f"{name}:{views}"
+            results[key] = result
+            self.stdout.write(
+                f"{key} {options['workers']} workers, {options['connections']} "
+                f"connections: {result['count']} requests {result['throughput']}/s "
+                f"p50={result['p50_ms']}ms p99={result['p99_ms']}ms "
+                f"errors={result['errors']}"
+            )
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2)
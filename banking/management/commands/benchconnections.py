@@ -0,0 +1,114 @@
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import override_settings
+
+from banking.loadtest import (
+    Fixture,
+    LoadTestError,
+    WSGITransport,
+    run_scenario,
+    scenarios,
+)
+
+# CONN_MAX_AGE and CONN_HEALTH_CHECKS of every mode.
+MODES = {
+    "none": (0, False),
+    "persistent": (600, False),
+    "checked": (600, True),
+}
+
+
+class Command(BaseCommand):
+    """
+    Measure connection churn on the configured database: requests/sec and
+    connections opened with a new connection per request, with persistent
+    connections and with persistent connections checked before reuse.
+
+    Requests go through the WSGI application from long lived threads, like
+    the threads of a server, with the enquiry and token caches off so every
+    request queries. Run it with DB_BACKEND=postgres against a local server,
+    or with DB_POOL_MODE=pgbouncer and POSTGRES_PORT at PgBouncer.
+    """
+
+    help = "Benchmark requests/sec with and without persistent connections"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--modes",
+            default=",".join(MODES),
+            help=f"Comma separated subset of {', '.join(MODES)}",
+        )
+        parser.add_argument(
+            "--endpoint",
+            choices=["customer-enquiry", "credit-amount", "transfer"],
+            default="customer-enquiry",
+        )
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--customers", type=int, default=20)
+        parser.add_argument("--rounds", type=int, default=3)
+
+    def handle(self, *args, **options):
+        modes = [mode.strip() for mode in options["modes"].split(",")]
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f"Unknown modes: {', '.join(sorted(unknown))}")
+        try:
+            fixture = Fixture(customers=options["customers"])
+        except LoadTestError as e:
+            raise CommandError(e)
+        transport = WSGITransport(fixture)
+        build = scenarios(fixture)[options["endpoint"]]
+
+        opened = [0]
+        lock = threading.Lock()
+
+        def count(sender, **kwargs):
+            with lock:
+                opened[0] += 1
+
+        # The connection of every thread is built from this dict.
+        settings_dict = connections.databases[connection.alias]
+        saved = (settings_dict["CONN_MAX_AGE"], settings_dict.get("CONN_HEALTH_CHECKS"))
+        self.stdout.write(
+            f"{connection.vendor} {options['endpoint']}: {options['requests']} "
+            f"requests from {options['threads']} threads, best of "
+            f"{options['rounds']} rounds"
+        )
+        best = {}
+        connection_created.connect(count)
+        try:
+            with override_settings(
+                ENQUIRY_CACHE_ENABLED=False, AUTH_TOKEN_CACHE_ENABLED=False
+            ), transport.running():
+                for _ in range(options["rounds"]):
+                    for mode in modes:
+                        max_age, health_checks = MODES[mode]
+                        settings_dict["CONN_MAX_AGE"] = max_age
+                        settings_dict["CONN_HEALTH_CHECKS"] = health_checks
+                        opened[0] = 0
+                        result = run_scenario(
+                            transport, build, options["requests"], options["threads"]
+                        )
+                        if result["errors"]:
+                            raise CommandError(
+                                f"{mode}: {result['errors']} errors, "
+                                f"{result['first_error']}"
+                            )
+                        result["connections"] = opened[0]
+                        if result["throughput"] > best.get(mode, {}).get(
+                            "throughput", 0
+                        ):
+                            best[mode] = result
+        finally:
+            connection_created.disconnect(count)
+            settings_dict["CONN_MAX_AGE"], settings_dict["CONN_HEALTH_CHECKS"] = saved
+        for mode in modes:
+            result = best[mode]
+            self.stdout.write(
+                f"{mode}: {result['throughput']}/s p50={result['p50_ms']}ms "
+                f"p99={result['p99_ms']}ms connections={result['connections']}"
+            )
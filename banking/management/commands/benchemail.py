@@ -0,0 +1,89 @@
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection, send_mail
+from django.core.management.base import BaseCommand
+
+from banking.notifications import deliver, posting_line
+from BankingBackend.constant import CREDIT, DEBIT
+
+BACKENDS = {
+    "locmem": "django.core.mail.backends.locmem.EmailBackend",
+    "file": "django.core.mail.backends.filebased.EmailBackend",
+}
+
+
+class Command(BaseCommand):
+    """
+    Compare notification emails/sec of one ``send_mail`` per posting with
+    batched delivery over one connection, with and without coalescing, on
+    the offline locmem and file email backends.
+    """
+
+    help = "Benchmark notification email delivery on offline mail backends"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--postings", type=int, default=10000)
+        parser.add_argument(
+            "--customers",
+            type=int,
+            default=1000,
+            help="Customers the postings are spread over, fewer customers "
+            "means more postings coalesced into each digest",
+        )
+
+    def handle(self, *args, **options):
+        payloads = [
+            {
+                "email": [f"customer{i % options['customers']}@example.com"],
+                "transaction_type": CREDIT if i % 2 else DEBIT,
+                "account_number": 100000000 + i % options["customers"],
+                "amount": "1.000",
+            }
+            for i in range(options["postings"])
+        ]
+        # Every posting to its own address, so nothing is coalesced.
+        distinct = [
+            dict(payload, email=[f"posting{i}@example.com"])
+            for i, payload in enumerate(payloads)
+        ]
+        for name, backend in BACKENDS.items():
+            with tempfile.TemporaryDirectory() as directory:
+                kwargs = {"file_path": directory} if name == "file" else {}
+
+                def connection():
+                    return get_connection(backend, **kwargs)
+
+                self.report(
+                    name, "send_mail", *self.per_posting(payloads, connection)
+                )
+                self.report(name, "batched", *self.batched(distinct, connection))
+                self.report(name, "coalesced", *self.batched(payloads, connection))
+
+    def per_posting(self, payloads, connection):
+        """
+        The previous delivery: a new connection and message per posting.
+        """
+        started = time.perf_counter()
+        for payload in payloads:
+            send_mail(
+                "Amount Credited",
+                posting_line(payload),
+                settings.EMAIL_FROM,
+                payload["email"],
+                connection=connection(),
+            )
+        return len(payloads), len(payloads), time.perf_counter() - started
+
+    def batched(self, payloads, connection):
+        started = time.perf_counter()
+        emails, _ = deliver(payloads, connection=connection())
+        return len(payloads), emails, time.perf_counter() - started
+
+    def report(self, backend, mode, postings, emails, elapsed):
+        self.stdout.write(
+            f"{backend} {mode}: {postings} postings as {emails} emails in "
+            f"{elapsed:.3f}s ({postings / elapsed:.0f} postings/s, "
+            f"{emails / elapsed:.0f} emails/s)"
+        )
@@ -0,0 +1,125 @@
+import json
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from banking.loadtest import (
+    ENDPOINTS,
+    ClientTransport,
+    Fixture,
+    HttpTransport,
+    LoadTestError,
+    WSGITransport,
+    compare,
+    run,
+)
+
+
+class Command(BaseCommand):
+    """
+    Load test every banking endpoint and report throughput, p50/p95/p99
+    latency and queries per request, optionally failing on regressions from
+    a stored baseline.
+    """
+
+    help = "Benchmark the banking endpoints against a seeded dataset"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--endpoints",
+            default=",".join(ENDPOINTS),
+            help=f"Comma separated subset of {', '.join(ENDPOINTS)}",
+        )
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--customers", type=int, default=20)
+        parser.add_argument(
+            "--transport",
+            choices=["client", "wsgi", "http"],
+            default="client",
+            help="Django test client or the WSGI application in process, or "
+            "HTTP to a local WSGI server or --url",
+        )
+        parser.add_argument(
+            "--url",
+            help="Base URL of a running server (gunicorn, uvicorn) for "
+            "--transport http",
+        )
+        parser.add_argument("--query-samples", type=int, default=5)
+        parser.add_argument(
+            "--seed-accounts",
+            type=int,
+            default=0,
+            help="Seed this many accounts with createsamplerecords first",
+        )
+        parser.add_argument("--seed-transactions", type=int, default=None)
+        parser.add_argument("--output", help="Write the results to this JSON file")
+        parser.add_argument("--baseline", help="JSON results of a previous run")
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.2,
+            help="Allowed latency growth and throughput drop, 0.2 is 20%%",
+        )
+
+    def handle(self, *args, **options):
+        endpoints = [name.strip() for name in options["endpoints"].split(",")]
+        unknown = set(endpoints) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+        if options["url"] and options["transport"] != "http":
+            raise CommandError("--url needs --transport http")
+
+        if options["seed_accounts"]:
+            call_command(
+                "createsamplerecords",
+                str(options["seed_accounts"]),
+                transactions=options["seed_transactions"],
+                stdout=self.stdout,
+            )
+        try:
+            fixture = Fixture(customers=options["customers"])
+        except LoadTestError as e:
+            raise CommandError(e)
+        if options["transport"] == "http":
+            transport = HttpTransport(fixture, url=options["url"])
+        elif options["transport"] == "wsgi":
+            transport = WSGITransport(fixture)
+        else:
+            transport = ClientTransport(fixture)
+
+        def on_result(name, result):
+            self.stdout.write(
+                f"{name}: {result['count']} requests {result['throughput']}/s "
+                f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms "
+                f"p99={result['p99_ms']}ms queries={result['queries']} "
+                f"errors={result['errors']}"
+            )
+
+        results = run(
+            transport,
+            endpoints=endpoints,
+            requests=options["requests"],
+            threads=options["threads"],
+            query_samples=options["query_samples"],
+            on_result=on_result,
+        )
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(results, output, indent=2)
+
+        failures = [
+            f"{name} had {result['errors']} errors: {result['first_error']}"
+            for name, result in results["endpoints"].items()
+            if result["errors"]
+        ]
+        if options["baseline"]:
+            with open(options["baseline"]) as baseline:
+                regressions = compare(
+                    results, json.load(baseline), options["threshold"]
+                )
+            for regression in regressions:
+                self.stdout.write(f"regression: {regression}")
+            failures.extend(regressions)
+        if failures:
+            raise CommandError(f"{len(failures)} failures: {failures[0]}")
@@ -0,0 +1,63 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from banking.benchmark import summarize
+from banking.cache import stats
+from banking.models import Account
+from banking.views import CustomerEnquiry
+from BankingBackend.constant import CUSTOMER
+
+
+class Command(BaseCommand):
+    """
+    Compare p50/p99 latency of the balance enquiry with the read-through
+    cache disabled and enabled.
+    """
+
+    help = "Benchmark the customer enquiry with and without the cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        account = (
+            Account.objects.filter(customer__user__user_type=CUSTOMER)
+            .select_related("customer__user")
+            .first()
+        )
+        if account is None:
+            raise CommandError(
+                "No customer accounts found, run createsamplerecords first"
+            )
+        user = account.customer.user
+        view = CustomerEnquiry.as_view()
+
+        def enquiry():
+            request = APIRequestFactory().get(reverse("enquiry"))
+            force_authenticate(request, user=user)
+            response = view(request)
+            response.render()
+            return response
+
+        for enabled in (False, True):
+            cache.clear()
+            with override_settings(ENQUIRY_CACHE_ENABLED=enabled):
+                latencies = []
+                started = time.perf_counter()
+                for _ in range(options["requests"]):
+                    begun = time.perf_counter()
+                    if enquiry().status_code != 200:
+                        raise CommandError("Enquiry failed")
+                    latencies.append(time.perf_counter() - begun)
+                result = summarize(latencies, time.perf_counter() - started)
+            self.stdout.write(
+                f"cache {'on' if enabled else 'off'}: "
+                f"p50 {result['p50_ms']}ms, p99 {result['p99_ms']}ms, "
+                f"{result['throughput']} enquiries/s"
+            )
+        self.stdout.write(f"cache stats: {stats.snapshot()}")
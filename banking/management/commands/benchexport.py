@@ -0,0 +1,95 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import User
+from banking.benchmark import seed_transactions
+from banking.models import Account, Transaction
+from banking.views import TransactionHistoryCsv
+from BankingBackend.constant import ACTIVE, BANK_MANAGER, SAVING
+
+
+class Command(BaseCommand):
+    """
+    Measure time to first byte, total time and peak memory of the transaction
+    history CSV export for growing export sizes.
+    """
+
+    help = "Benchmark the streaming transaction history CSV export"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="1000,100000",
+            help="Comma separated number of rows to export",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=3.0,
+            help="Allowed ratio between the largest and smallest export's "
+            "time to first byte and peak memory",
+        )
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options["sizes"].split(","))
+        results = []
+        for size in sizes:
+            account = Account.objects.create(account_type=SAVING, status=ACTIVE)
+            try:
+                seed_transactions(account, size)
+                results.append(self.measure(account, size))
+            finally:
+                Transaction.objects.filter(account=account).delete()
+                account.delete()
+
+        smallest, largest = results[0], results[-1]
+        # Allow a fixed floor so tiny absolute values do not fail on noise.
+        ttfb_limit = max(smallest["ttfb_ms"] * options["tolerance"], 50.0)
+        memory_limit = max(smallest["peak_kb"] * options["tolerance"], 1024.0)
+        if largest["ttfb_ms"] > ttfb_limit or largest["peak_kb"] > memory_limit:
+            raise CommandError(
+                f"Export does not stay flat: {largest['rows']} rows took "
+                f"{largest['ttfb_ms']}ms to first byte and {largest['peak_kb']}KB, "
+                f"limits are {ttfb_limit:.1f}ms and {memory_limit:.0f}KB"
+            )
+
+    def measure(self, account, size):
+        view = TransactionHistoryCsv.as_view()
+        user = User(user_type=BANK_MANAGER)
+        data = {"acc_ids": [account.account_number]}
+
+        def export():
+            request = APIRequestFactory().post(reverse("history"), data, format="json")
+            force_authenticate(request, user=user)
+            return view(request).streaming_content
+
+        started = time.perf_counter()
+        content = export()
+        next(content)
+        ttfb = time.perf_counter() - started
+        size_bytes = sum(len(chunk) for chunk in content)
+        total = time.perf_counter() - started
+
+        tracemalloc.start()
+        for _ in export():
+            pass
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        result = {
+            "rows": size,
+            "ttfb_ms": round(ttfb * 1000, 3),
+            "total_s": round(total, 3),
+            "bytes": size_bytes,
+            "peak_kb": round(peak / 1024, 1),
+        }
+        self.stdout.write(
+            f"{size} rows: first byte {result['ttfb_ms']}ms, "
+            f"total {result['total_s']}s ({size / total:.0f} rows/s), "
+            f"{size_bytes} bytes, peak memory {result['peak_kb']}KB"
+        )
+        return result
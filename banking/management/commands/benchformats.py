@@ -0,0 +1,127 @@
+import csv
+import gzip
+import io
+import json
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import User
+from banking.benchmark import seed_transactions
+from banking.exports import (
+    COLUMNAR_TYPE,
+    CSV_TYPE,
+    EXPORT_FORMATS,
+    NDJSON_TYPE,
+    read_columnar,
+)
+from banking.models import Account, Transaction
+from banking.views import TransactionHistoryCsv
+from BankingBackend.constant import ACTIVE, BANK_MANAGER, SAVING
+
+
+def parse_csv(content):
+    return sum(1 for _ in csv.reader(io.StringIO(content.decode()))) - 1
+
+
+def parse_ndjson(content):
+    return len([json.loads(line) for line in content.decode().splitlines()])
+
+
+def parse_columnar(content):
+    return sum(len(block["amount"]) for block in read_columnar(io.BytesIO(content)))
+
+
+# How a Python client turns every format into rows, returning the row count.
+PARSERS = {
+    CSV_TYPE: parse_csv,
+    NDJSON_TYPE: parse_ndjson,
+    COLUMNAR_TYPE: parse_columnar,
+}
+
+
+class Command(BaseCommand):
+    """
+    Export the same --rows transactions as CSV, NDJSON and the binary
+    columnar format and compare bytes on the wire, raw and gzip compressed,
+    server CPU time per million rows and the time a Python client takes to
+    parse the export into values, best of --repeat runs.
+
+    Server CPU is the process time of the whole streamed response, the
+    history query included, so the differences between formats are the
+    formatting alone.
+    """
+
+    help = "Benchmark the transaction history export formats against CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=200000)
+        parser.add_argument(
+            "--repeat", type=int, default=3, help="Keep the best of N runs"
+        )
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        if rows < 1:
+            raise CommandError("--rows must be positive")
+        account = Account.objects.create(account_type=SAVING, status=ACTIVE)
+        try:
+            seed_transactions(
+                account,
+                rows,
+                amount=Decimal("1234.567"),
+                description={"source": "settlement", "added_by": "teller-17"},
+                reference_number="NEFT2024000123",
+            )
+            results = {}
+            for _ in range(max(options["repeat"], 1)):
+                for content_type in EXPORT_FORMATS:
+                    result = self.measure(account, rows, content_type)
+                    best = results.setdefault(content_type, result)
+                    best["cpu_s"] = min(best["cpu_s"], result["cpu_s"])
+                    best["parse_s"] = min(best["parse_s"], result["parse_s"])
+        finally:
+            Transaction.objects.filter(account=account).delete()
+            account.delete()
+
+        baseline = results[CSV_TYPE]
+        for content_type, result in results.items():
+            self.stdout.write(
+                f"{EXPORT_FORMATS[content_type][1]}: {result['bytes']} bytes "
+                f"({result['bytes'] / baseline['bytes']:.2f}x CSV), "
+                f"{result['gzip_bytes']} gzipped, "
+                f"server CPU {result['cpu_s'] * 1000000 / rows:.2f}s per million "
+                f"rows ({result['cpu_s'] / baseline['cpu_s']:.2f}x CSV), "
+                f"client parse {result['parse_s']:.3f}s "
+                f"({result['parse_s'] / baseline['parse_s']:.2f}x CSV)"
+            )
+
+    def measure(self, account, rows, content_type):
+        view = TransactionHistoryCsv.as_view()
+        user = User(user_type=BANK_MANAGER)
+        request = APIRequestFactory().post(
+            reverse("history"),
+            {"acc_ids": [account.account_number], "start_date": "2000-01-01"},
+            format="json",
+            HTTP_ACCEPT=content_type,
+        )
+        force_authenticate(request, user=user)
+
+        started = time.process_time()
+        content = b"".join(view(request).streaming_content)
+        cpu = time.process_time() - started
+
+        started = time.perf_counter()
+        parsed = PARSERS[content_type](content)
+        parse = time.perf_counter() - started
+        if parsed != rows:
+            raise CommandError(f"{content_type} export has {parsed} of {rows} rows")
+        return {
+            "bytes": len(content),
+            "gzip_bytes": len(gzip.compress(content, 6)),
+            "cpu_s": cpu,
+            "parse_s": parse,
+        }
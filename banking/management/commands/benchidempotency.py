@@ -0,0 +1,99 @@
+import random
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import User
+from banking.benchmark import delete_accounts, run_concurrently, summarize
+from banking.idempotency import stored_key
+from banking.models import (
+    Account,
+    Customer,
+    IdempotencyKey,
+    Transaction,
+)
+from banking.views import CreditAmount
+from BankingBackend.constant import ACTIVE, EMPLOYEE, SAVING
+
+AMOUNT = Decimal("1.000")
+
+
+class Command(BaseCommand):
+    """
+    Load test CreditAmount with retry storms: fresh postings, retries of
+    completed postings, and bursts of the same new key racing each other.
+    Fails if any key is posted more than once.
+    """
+
+    help = "Benchmark idempotent retries of credit postings"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keys", type=int, default=500)
+        parser.add_argument(
+            "--retries", type=int, default=5, help="Copies sent of every key"
+        )
+        parser.add_argument("--threads", type=int, default=8)
+
+    def handle(self, *args, **options):
+        employee = User.objects.filter(user_type=EMPLOYEE).first()
+        customer = Customer.objects.filter(user__isnull=False).first()
+        if employee is None or customer is None:
+            raise CommandError(
+                "No employee or customer found, run createsamplerecords first"
+            )
+        account = Account.objects.create(
+            customer=customer, account_type=SAVING, status=ACTIVE
+        )
+        view = CreditAmount.as_view()
+        url = reverse("credit_amount")
+        data = {
+            "account": account.account_number,
+            "transaction_method": "CASH",
+            "amount": str(AMOUNT),
+            "source": "benchidempotency",
+            "customer_name": customer.user.get_full_name(),
+        }
+
+        def credit(key):
+            request = APIRequestFactory().post(
+                url, data, format="json", HTTP_IDEMPOTENCY_KEY=key
+            )
+            force_authenticate(request, user=employee)
+            response = view(request)
+            if response.status_code != 200:
+                raise CommandError(f"Unexpected response {response.status_code}")
+
+        keys = [f"bench-{account.pk}-{i}" for i in range(options["keys"] * 2)]
+        fresh, racing = keys[: options["keys"]], keys[options["keys"] :]
+        replays = fresh * options["retries"]
+        storm = racing * options["retries"]
+        random.shuffle(replays)
+        random.shuffle(storm)
+        try:
+            phases = (
+                ("fresh postings", fresh),
+                ("retries of posted keys", replays),
+                ("racing duplicates of new keys", storm),
+            )
+            for name, items in phases:
+                latencies, errors, elapsed = run_concurrently(
+                    credit, items, options["threads"]
+                )
+                stats = summarize(latencies, elapsed)
+                self.stdout.write(
+                    f"{name}: {stats['count']} requests in {stats['elapsed']}s "
+                    f"({stats['throughput']}/s) p50={stats['p50_ms']}ms "
+                    f"p99={stats['p99_ms']}ms errors={len(errors)}"
+                )
+
+            postings = Transaction.objects.filter(account=account).count()
+            balance = Account.objects.get(pk=account.pk).balance
+            self.stdout.write(f"{postings} postings for {len(keys)} keys")
+            if postings != len(keys) or balance != AMOUNT * len(keys):
+                raise CommandError("A key was posted more than once")
+        finally:
+            stored = [stored_key("credit", employee.pk, f"header:{k}") for k in keys]
+            IdempotencyKey.objects.filter(pk__in=stored).delete()
+            delete_accounts([account.pk])
@@ -0,0 +1,78 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+
+from banking.benchmark import seed_transactions
+from banking.models import Account, Transaction, generate_txn_id
+from BankingBackend.constant import ACTIVE, CREDIT, SAVING, UPI
+
+BENCH_REFERENCE = "benchids"
+
+
+def legacy_txn_id():
+    """
+    The previous scheme: 12 random digits checked with one query per ID.
+    """
+    while True:
+        txn_id = "txn" + "".join(random.choices(string.digits, k=12))
+        if not Transaction.objects.filter(transaction_id=txn_id).exists():
+            return txn_id
+
+
+class Command(BaseCommand):
+    """
+    Compare single row Transaction inserts/sec with the legacy random ID scheme
+    and the Snowflake allocator on a table of ``--rows`` transactions.
+    """
+
+    help = "Benchmark transaction ID generation on a large Transaction table"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000000)
+        parser.add_argument("--inserts", type=int, default=5000)
+        parser.add_argument(
+            "--keep", action="store_true", help="Keep the generated rows"
+        )
+
+    def handle(self, *args, **options):
+        account = Account.objects.create(account_type=SAVING, status=ACTIVE)
+        try:
+            self.fill(account, options["rows"])
+            schemes = (("legacy", legacy_txn_id), ("snowflake", generate_txn_id))
+            for name, generate in schemes:
+                started = time.perf_counter()
+                for _ in range(options["inserts"]):
+                    Transaction.objects.bulk_create(
+                        [self.transaction(account, generate())]
+                    )
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{name}: {options['inserts']} inserts in {elapsed:.3f}s "
+                    f"({options['inserts'] / elapsed:.1f} inserts/s)"
+                )
+        finally:
+            if not options["keep"]:
+                Transaction.objects.filter(account=account).delete()
+                account.delete()
+
+    def fill(self, account, rows):
+        """
+        Bulk insert ``rows`` transactions so the ID lookups run on a big table.
+        """
+        started = time.perf_counter()
+        seed_transactions(account, rows, reference_number=BENCH_REFERENCE)
+        self.stdout.write(
+            f"Filled {rows} rows in {time.perf_counter() - started:.1f}s, "
+            f"table has {Transaction.objects.count()} rows"
+        )
+
+    def transaction(self, account, transaction_id):
+        return Transaction(
+            transaction_id=transaction_id,
+            transaction_type=CREDIT,
+            account=account,
+            transaction_method=UPI,
+            reference_number=BENCH_REFERENCE,
+        )
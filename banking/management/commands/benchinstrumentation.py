@@ -0,0 +1,105 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from banking.benchmark import summarize
+from banking.instrumentation import InstrumentationMiddleware, metrics
+from banking.models import Account
+from BankingBackend.constant import CUSTOMER
+
+
+class Command(BaseCommand):
+    """
+    Measure what the instrumentation middleware costs: per request and per
+    query around a bare view, and on customer-enquiry end to end.
+    """
+
+    help = "Microbenchmark the overhead of the instrumentation middleware"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=5000)
+        parser.add_argument("--queries", type=int, default=5)
+        parser.add_argument("--rounds", type=int, default=5)
+
+    def handle(self, *args, **options):
+        self.bare_view(options["requests"], options["queries"], options["rounds"])
+        self.enquiry(options["requests"] // 5, options["rounds"])
+        metrics.reset()
+
+    def best(self, modes, rounds, count, call):
+        """
+        Fastest mean seconds per call of every mode over interleaved rounds.
+        """
+        best = {}
+        for _ in range(rounds):
+            for mode, enabled in modes:
+                with override_settings(INSTRUMENTATION_ENABLED=enabled):
+                    started = time.perf_counter()
+                    for _ in range(count):
+                        call(mode)
+                    mean = (time.perf_counter() - started) / count
+                best[mode] = min(best.get(mode, mean), mean)
+        return best
+
+    def bare_view(self, count, queries, rounds):
+        def view(request):
+            with connection.cursor() as cursor:
+                for _ in range(queries):
+                    cursor.execute("SELECT 1")
+            return HttpResponse("ok")
+
+        request = RequestFactory().get("/")
+        handlers = {"bare": view, "instrumented": InstrumentationMiddleware(view)}
+        best = self.best(
+            [("bare", True), ("instrumented", True)],
+            rounds,
+            count,
+            lambda mode: handlers[mode](request),
+        )
+        overhead = best["instrumented"] - best["bare"]
+        self.stdout.write(
+            f"bare view with {queries} queries: {best['bare'] * 1e6:.1f}us, "
+            f"instrumented: {best['instrumented'] * 1e6:.1f}us, overhead "
+            f"{overhead * 1e6:.1f}us per request "
+            f"({overhead / (queries + 1) * 1e6:.2f}us per query)"
+        )
+
+    def enquiry(self, count, rounds):
+        account = (
+            Account.objects.filter(customer__user__user_type=CUSTOMER)
+            .select_related("customer__user")
+            .first()
+        )
+        if account is None:
+            raise CommandError(
+                "No customer accounts found, run createsamplerecords first"
+            )
+        token = Token.objects.get_or_create(user=account.customer.user)[0]
+        client = Client(HTTP_AUTHORIZATION=f"Token {token.key}")
+        url = reverse("enquiry")
+        latencies = {"off": [], "on": []}
+
+        def call(mode):
+            started = time.perf_counter()
+            if client.get(url).status_code != 200:
+                raise CommandError("Enquiry failed")
+            latencies[mode].append(time.perf_counter() - started)
+
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            best = self.best([("off", False), ("on", True)], rounds, count, call)
+        for mode in ("off", "on"):
+            stats = summarize(latencies[mode], sum(latencies[mode]))
+            self.stdout.write(
+                f"customer-enquiry instrumentation {mode}: best mean "
+                f"{best[mode] * 1000:.3f}ms p50={stats['p50_ms']}ms "
+                f"p99={stats['p99_ms']}ms"
+            )
+        self.stdout.write(
+            f"end to end overhead: {(best['on'] / best['off'] - 1) * 100:.2f}%"
+        )
@@ -0,0 +1,101 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from banking.benchmark import delete_accounts, summarize
+from banking.ledger import balance_at, full_balance_at, snapshot_day
+from banking.models import Account, LedgerLine
+from BankingBackend.constant import ACTIVE, BANK_BOOK, CUSTOMER_BOOK, SAVING
+
+
+class Command(BaseCommand):
+    """
+    Compare point-in-time balances from the nearest snapshot with summing
+    every ledger line of an account with ``--lines`` lines over ``--days``.
+    """
+
+    help = "Benchmark point-in-time balances against full recomputation"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lines", type=int, default=100000)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        account = Account.objects.create(account_type=SAVING, status=ACTIVE)
+        end = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        start = end - timedelta(days=options["days"])
+        span = (end - start).total_seconds()
+        try:
+            self.seed(account, options["lines"], start, span, rng)
+            started = time.perf_counter()
+            day = start.date()
+            while day < end.date():
+                snapshot_day(day)
+                day += timedelta(days=1)
+            self.stdout.write(
+                f"{options['days']} daily snapshots in "
+                f"{time.perf_counter() - started:.3f}s"
+            )
+
+            moments = [
+                start + timedelta(seconds=rng.uniform(0, span))
+                for _ in range(options["queries"])
+            ]
+            results = {}
+            for name, query in (
+                ("snapshot + delta", lambda at: balance_at(account.pk, at)[0]),
+                ("full recomputation", lambda at: full_balance_at(account.pk, at)),
+            ):
+                latencies, balances = [], []
+                began = time.perf_counter()
+                for at in moments:
+                    started = time.perf_counter()
+                    balances.append(query(at))
+                    latencies.append(time.perf_counter() - started)
+                stats = summarize(latencies, time.perf_counter() - began)
+                results[name] = balances
+                self.stdout.write(
+                    f"{name}: {stats['count']} queries p50={stats['p50_ms']}ms "
+                    f"p99={stats['p99_ms']}ms ({stats['throughput']}/s)"
+                )
+            if results["snapshot + delta"] != results["full recomputation"]:
+                raise CommandError("Point-in-time balances do not match")
+        finally:
+            delete_accounts([account.pk])
+
+    def seed(self, account, count, start, span, rng, batch_size=10000):
+        """
+        Bulk insert ``count`` Credit entries spread over the period.
+        """
+        for offset in range(0, count, batch_size):
+            lines = []
+            for i in range(offset, min(offset + batch_size, count)):
+                posted_at = start + timedelta(seconds=rng.uniform(0, span))
+                amount = Decimal(rng.randint(1, 100000)) / 1000
+                entry_id = f"benchledger-{account.pk}-{i}"
+                lines.append(
+                    LedgerLine(
+                        entry_id=entry_id,
+                        account=account,
+                        book=CUSTOMER_BOOK,
+                        amount=amount,
+                        posted_at=posted_at,
+                    )
+                )
+                lines.append(
+                    LedgerLine(
+                        entry_id=entry_id,
+                        book=BANK_BOOK,
+                        amount=-amount,
+                        posted_at=posted_at,
+                    )
+                )
+            LedgerLine.objects.bulk_create(lines)
+        self.stdout.write(f"Seeded {count} ledger entries")
@@ -0,0 +1,121 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+
+from banking.benchmark import delete_accounts, summarize
+from banking.models import Account, Customer, OutboxMessage, Transaction
+from banking.outbox import CELERY, drain
+from BankingBackend.constant import ACTIVE, CREDIT, SAVING, UPI
+from BankingBackend.tasks.celery import app, schedule_send_email
+
+
+class Command(BaseCommand):
+    """
+    Compare posting latency of the previous inline ``delay()`` notification
+    with the transactional outbox, with the broker up and down.
+    """
+
+    help = "Benchmark posting latency with inline broker calls and the outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--postings", type=int, default=500)
+        parser.add_argument(
+            "--inline-postings",
+            type=int,
+            default=3,
+            help="Inline postings while the broker is down, each waits for "
+            "the publish retries to give up",
+        )
+        parser.add_argument("--broker-url", default="memory://")
+        parser.add_argument("--down-url", default="amqp://127.0.0.1:1//")
+
+    def handle(self, *args, **options):
+        customer = Customer.objects.filter(user__isnull=False).first()
+        if customer is None:
+            raise CommandError("No customers found, run createsamplerecords first")
+        account = Account.objects.create(
+            customer=customer, account_type=SAVING, status=ACTIVE
+        )
+        brokers = (
+            ("up", options["broker_url"], options["postings"]),
+            ("down", options["down_url"], options["inline_postings"]),
+        )
+        try:
+            for state, url, inline in brokers:
+                with app.connection_for_write(url) as connection:
+                    stats = self.measure(
+                        inline, lambda: self.post_inline(account, connection)
+                    )
+                self.report(f"inline, broker {state}", stats)
+                stats = self.measure(
+                    options["postings"], lambda: self.post_outbox(account)
+                )
+                self.report(f"outbox, broker {state}", stats)
+
+                with override_settings(NOTIFICATION_COALESCE_WINDOW=0):
+                    relayed = drain(delivery=CELERY, broker_url=url)
+                pending = OutboxMessage.objects.filter(account=account).count()
+                self.stdout.write(
+                    f"relay, broker {state}: sent {relayed['sent']} in "
+                    f"{relayed['elapsed']}s, {pending - relayed['sent']} pending"
+                )
+                OutboxMessage.objects.filter(account=account).delete()
+        finally:
+            delete_accounts([account.pk])
+
+    def measure(self, count, post):
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(count):
+            begun = time.perf_counter()
+            try:
+                post()
+            except Exception:
+                pass
+            latencies.append(time.perf_counter() - begun)
+        return summarize(latencies, time.perf_counter() - started)
+
+    def post_outbox(self, account):
+        Transaction(
+            account=account,
+            transaction_type=CREDIT,
+            transaction_method=UPI,
+            amount=Decimal("1.000"),
+        ).save()
+
+    def post_inline(self, account, connection):
+        """
+        The previous posting: commit, then publish the email inside the request.
+        """
+        with transaction.atomic():
+            Account.objects.post_amount(account.id, CREDIT, Decimal("1.000"))
+            Transaction.objects.bulk_create(
+                [
+                    Transaction(
+                        account=account,
+                        transaction_type=CREDIT,
+                        transaction_method=UPI,
+                        amount=Decimal("1.000"),
+                    )
+                ]
+            )
+        schedule_send_email.apply_async(
+            kwargs={
+                "email": [account.customer.user.email],
+                "transaction_type": CREDIT,
+                "account_number": account.account_number,
+                "amount": "1.000",
+            },
+            connection=connection,
+            ignore_result=True,
+        )
+
+    def report(self, name, stats):
+        self.stdout.write(
+            f"{name}: {stats['count']} postings in {stats['elapsed']}s "
+            f"({stats['throughput']}/s) p50={stats['p50_ms']}ms "
+            f"p99={stats['p99_ms']}ms"
+        )
@@ -0,0 +1,253 @@
+import math
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from banking.benchmark import percentile
+from banking.partitions import (
+    add_months,
+    create_partition,
+    month_start,
+    partition_name,
+)
+
+START = datetime(2015, 1, 1, tzinfo=timezone.utc)
+COLUMNS = "id, transaction_id, transaction_type, amount, account_id, created_at"
+FILL_BATCH = 1000000
+
+
+class Command(BaseCommand):
+    """
+    Compare insert and range query latency of a plain transaction table with
+    a table partitioned by month as it grows to every --rows size.
+
+    Both are scratch tables shaped like the transaction table, filled in SQL
+    with rows --seconds-per-row apart, so the table grows forward in time the
+    way postings do. On Postgres the monthly layout is a declaratively
+    partitioned table, on SQLite one table per month with the rows routed by
+    the benchmark, the routing fallback. Inserts are single rows at the newest
+    time, queries read one account over the last 30 days.
+    """
+
+    help = "Benchmark a partitioned transaction table against a plain one"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", default="10000000,50000000,100000000")
+        parser.add_argument("--accounts", type=int, default=100000)
+        parser.add_argument("--seconds-per-row", type=float, default=0.5)
+        parser.add_argument("--inserts", type=int, default=2000)
+        parser.add_argument("--queries", type=int, default=500)
+        parser.add_argument("--keep", action="store_true", help="Keep the tables")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted(int(size) for size in options["rows"].split(","))
+        except ValueError:
+            raise CommandError("--rows must be comma separated integers")
+        self.vendor = connection.vendor
+        if self.vendor not in ("postgresql", "sqlite"):
+            raise CommandError(f"Unsupported database {self.vendor}")
+        self.accounts = options["accounts"]
+        self.step = options["seconds_per_row"]
+        self.rng = random.Random(0)
+        layouts = {"plain": "bench_txn_plain", "monthly": "bench_txn_monthly"}
+        self.months = {table: set() for table in layouts.values()}
+        counts = dict.fromkeys(layouts.values(), 0)
+        for table in layouts.values():
+            self.drop(table)
+            self.create(table, partitioned=table == layouts["monthly"])
+        try:
+            for size in sizes:
+                for name, table in layouts.items():
+                    started = time.perf_counter()
+                    self.fill(table, counts[table], size)
+                    filled = time.perf_counter() - started
+                    counts[table] = size
+                    self.analyze(table)
+                    inserts = self.time_inserts(table, counts, options["inserts"])
+                    queries = self.time_queries(
+                        table, counts[table], options["queries"]
+                    )
+                    self.stdout.write(
+                        f"{size} rows {name}: fill {filled:.1f}s, "
+                        f"{len(self.months[table]) or 1} tables, "
+                        f"insert p50={percentile(inserts, 50) * 1000:.3f}ms "
+                        f"p99={percentile(inserts, 99) * 1000:.3f}ms, "
+                        f"30 day query p50={percentile(queries, 50) * 1000:.3f}ms "
+                        f"p99={percentile(queries, 99) * 1000:.3f}ms"
+                    )
+        finally:
+            if not options["keep"]:
+                for table in layouts.values():
+                    self.drop(table)
+
+    def at(self, i):
+        return START + timedelta(seconds=i * self.step)
+
+    def index_of(self, moment):
+        """
+        First row index created at or after ``moment``.
+        """
+        return max(math.ceil((moment - START).total_seconds() / self.step), 0)
+
+    def stamp(self, moment):
+        if self.vendor == "sqlite":
+            return f"{moment:%Y-%m-%d %H:%M:%S}.{moment.microsecond // 1000:03d}"
+        return moment
+
+    def create(self, table, partitioned):
+        types = (
+            "varchar(100), transaction_id varchar(100), transaction_type "
+            "varchar(10), amount numeric(20, 3), account_id varchar(100)"
+        )
+        with connection.cursor() as cursor:
+            if partitioned and self.vendor == "postgresql":
+                cursor.execute(
+                    f"CREATE TABLE {table} (id {types}, created_at timestamptz) "
+                    f"PARTITION BY RANGE (created_at)"
+                )
+            elif not partitioned:
+                timestamp = "timestamptz" if self.vendor == "postgresql" else "text"
+                cursor.execute(
+                    f"CREATE TABLE {table} (id {types}, created_at {timestamp})"
+                )
+        if self.vendor == "postgresql" or not partitioned:
+            self.index(table)
+
+    def index(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE INDEX {table}_id ON {table} (id)")
+            cursor.execute(
+                f"CREATE INDEX {table}_account ON {table} (account_id, created_at)"
+            )
+            cursor.execute(f"CREATE INDEX {table}_txn ON {table} (transaction_id)")
+
+    def month_table(self, table, month):
+        """
+        Table the rows of ``month`` go to, created on first use.
+        """
+        if table.endswith("_plain"):
+            return table
+        name = partition_name(month, table)
+        if month not in self.months[table]:
+            self.months[table].add(month)
+            if self.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    create_partition(cursor, month, table)
+            else:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"CREATE TABLE {name} AS SELECT * FROM bench_txn_plain "
+                        f"WHERE 0"
+                    )
+                self.index(name)
+        return name if self.vendor == "sqlite" else table
+
+    def fill(self, table, first, last):
+        """
+        Insert rows ``first`` to ``last`` - 1, one statement per month and
+        million rows.
+        """
+        i = first
+        while i < last:
+            month = month_start(self.at(i))
+            end = min(last, i + FILL_BATCH, self.index_of(add_months(month, 1)))
+            end = max(end, i + 1)
+            self.insert_range(self.month_table(table, month), i, end - 1)
+            i = end
+
+    def insert_range(self, table, first, last):
+        row = (
+            "'id' || i, 'txn' || i, CASE WHEN i %% 2 = 0 THEN 'Credit' "
+            "ELSE 'Debit' END, (i %% 100000) / 100.0, 'acct' || (i %% %s)"
+        )
+        with connection.cursor() as cursor:
+            if self.vendor == "postgresql":
+                cursor.execute(
+                    f"INSERT INTO {table} ({COLUMNS}) SELECT {row}, "
+                    f"%s::timestamptz + i * %s * interval '1 second' "
+                    f"FROM generate_series(%s, %s) AS i",
+                    [self.accounts, START, self.step, first, last],
+                )
+            else:
+                cursor.execute(
+                    f"INSERT INTO {table} ({COLUMNS}) WITH RECURSIVE seq(i) AS "
+                    f"(SELECT %s UNION ALL SELECT i + 1 FROM seq WHERE i < %s) "
+                    f"SELECT {row}, strftime('%%Y-%%m-%%d %%H:%%M:%%f', %s, "
+                    f"'+' || (i * %s) || ' seconds') FROM seq",
+                    [first, last, self.accounts, self.stamp(START), self.step],
+                )
+
+    def analyze(self, table):
+        with connection.cursor() as cursor:
+            if self.vendor == "postgresql":
+                cursor.execute(f"ANALYZE {table}")
+            else:
+                cursor.execute("ANALYZE")
+
+    def time_inserts(self, table, counts, inserts):
+        latencies = []
+        for _ in range(inserts):
+            i = counts[table]
+            moment = self.at(i)
+            target = self.month_table(table, month_start(moment))
+            started = time.perf_counter()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {target} ({COLUMNS}) "
+                    f"VALUES (%s, %s, %s, %s, %s, %s)",
+                    [
+                        f"id{i}",
+                        f"txn{i}",
+                        "Credit",
+                        "1.000",
+                        f"acct{i % self.accounts}",
+                        self.stamp(moment),
+                    ],
+                )
+            latencies.append(time.perf_counter() - started)
+            counts[table] += 1
+        return latencies
+
+    def time_queries(self, table, count, queries):
+        end = self.at(count)
+        start = end - timedelta(days=30)
+        if self.vendor == "sqlite" and not table.endswith("_plain"):
+            tables = [
+                partition_name(month, table)
+                for month in sorted(self.months[table])
+                if add_months(month, 1) > start and month <= end
+            ]
+        else:
+            tables = [table]
+        sql = " UNION ALL ".join(
+            f"SELECT id, transaction_type, amount, created_at FROM {name} "
+            f"WHERE account_id = %s AND created_at >= %s AND created_at < %s"
+            for name in tables
+        )
+        latencies = []
+        for _ in range(queries):
+            account = f"acct{self.rng.randrange(self.accounts)}"
+            params = [account, self.stamp(start), self.stamp(end)] * len(tables)
+            started = time.perf_counter()
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                cursor.fetchall()
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    def drop(self, table):
+        with connection.cursor() as cursor:
+            if self.vendor == "postgresql":
+                cursor.execute(f"DROP TABLE IF EXISTS {table} CASCADE")
+                return
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND "
+                "(name = %s OR name LIKE %s)",
+                [table, f"{table}_p%"],
+            )
+            for (name,) in cursor.fetchall():
+                cursor.execute(f"DROP TABLE {name}")
@@ -0,0 +1,74 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from banking.benchmark import run_concurrently, summarize
+from banking.models import Account
+from BankingBackend.constant import ACTIVE, CREDIT, DEBIT, SAVING
+
+
+class Command(BaseCommand):
+    """
+    Fire concurrent Credit/Debit postings at a single account and verify the
+    final balance is exact.
+    """
+
+    help = "Benchmark concurrent balance postings against one account"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--postings", type=int, default=5000)
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument(
+            "--naive",
+            action="store_true",
+            help="Also run the old read-modify-write posting for comparison",
+        )
+
+    def handle(self, *args, **options):
+        # Alternate a Credit of 2.000 with a Debit of 1.000 so the expected
+        # balance is known exactly and never goes below zero for long.
+        postings = [
+            (CREDIT, Decimal("2.000")) if i % 2 == 0 else (DEBIT, Decimal("1.000"))
+            for i in range(options["postings"])
+        ]
+        expected = sum(
+            amount if txn_type == CREDIT else -amount for txn_type, amount in postings
+        )
+
+        failed = self.run("engine", postings, expected, options, self.post_engine)
+        if options["naive"]:
+            self.run("naive", postings, expected, options, self.post_naive)
+        if failed:
+            raise CommandError("Final balance does not match the postings")
+
+    def run(self, name, postings, expected, options, post):
+        account = Account.objects.create(account_type=SAVING, status=ACTIVE)
+        try:
+            latencies, errors, elapsed = run_concurrently(
+                lambda posting: post(account.id, *posting),
+                postings,
+                options["threads"],
+            )
+            balance = Account.objects.get(pk=account.id).balance
+        finally:
+            Account.objects.filter(pk=account.id).delete()
+
+        stats = summarize(latencies, elapsed)
+        self.stdout.write(
+            f"{name}: {stats['count']} postings in {stats['elapsed']}s "
+            f"({stats['throughput']}/s) p50={stats['p50_ms']}ms "
+            f"p99={stats['p99_ms']}ms errors={len(errors)}"
+        )
+        self.stdout.write(f"{name}: expected balance {expected}, got {balance}")
+        return balance != expected or errors
+
+    def post_engine(self, account_id, transaction_type, amount):
+        Account.objects.post_amount(account_id, transaction_type, amount)
+
+    def post_naive(self, account_id, transaction_type, amount):
+        account = Account.objects.get(pk=account_id)
+        if transaction_type == CREDIT:
+            account.balance = round(account.balance + amount, 3)
+        else:
+            account.balance = round(account.balance - amount, 3)
+        account.save()
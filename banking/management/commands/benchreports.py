@@ -0,0 +1,71 @@
+import random
+import time
+from datetime import date, timedelta
+from itertools import chain, islice, repeat
+
+from django.core.management.base import BaseCommand, CommandError
+
+from banking import reports
+from banking.reports import METHODS, SCALE, build_report, loop_report
+from BankingBackend.constant import CREDIT, DEBIT
+
+BLOCK_SIZE = 100000
+
+
+class Command(BaseCommand):
+    """
+    Time the vectorized branch report over --rows rows against the per-row
+    Python loop and check they agree. Needs NumPy.
+
+    The rows are shaped like ``report_rows`` output, a block of random rows
+    repeated, so the time measured is the reduction alone: reading the rows
+    from the database costs the same for both.
+    """
+
+    help = "Benchmark the vectorized branch report against a per-row loop"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000000)
+        parser.add_argument("--accounts", type=int, default=5000)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--top", type=int, default=10)
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        if rows < 1:
+            raise CommandError("--rows must be positive")
+        if reports.numpy is None:
+            raise CommandError("NumPy is not installed")
+        rng = random.Random(0)
+        first = date(2024, 1, 1)
+        block = [
+            (
+                10 ** 9 + rng.randrange(options["accounts"]),
+                rng.choice((CREDIT, DEBIT)),
+                rng.choice(METHODS),
+                int(rng.lognormvariate(7, 2) * SCALE),
+                first + timedelta(days=rng.randrange(options["days"])),
+            )
+            for _ in range(min(rows, BLOCK_SIZE))
+        ]
+
+        def stream():
+            blocks = chain.from_iterable(repeat(block, -(-rows // len(block))))
+            return islice(blocks, rows)
+
+        timings = {}
+        started = time.perf_counter()
+        expected = loop_report(stream(), options["top"])
+        timings["loop"] = time.perf_counter() - started
+        started = time.perf_counter()
+        report = build_report(stream(), options["top"])
+        timings["numpy"] = time.perf_counter() - started
+
+        for name, seconds in timings.items():
+            self.stdout.write(
+                f"{name}: {rows} rows in {seconds:.2f}s, "
+                f"{rows / seconds:.0f} rows/s, "
+                f"{timings['loop'] / seconds:.1f}x the loop"
+            )
+        if report != expected:
+            raise CommandError("The vectorized report differs from the loop")
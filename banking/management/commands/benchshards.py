@@ -0,0 +1,66 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from banking.benchmark import run_concurrently, summarize
+from banking.models import Account, BalanceShard
+from BankingBackend.constant import ACTIVE, CREDIT, SAVING
+
+
+class Command(BaseCommand):
+    """
+    Fire concurrent Credits at a single account with its balance unsharded
+    and spread over 1 to 64 shards, then compact the shards and verify the
+    final balance is exact.
+
+    Sharding removes the wait on the row lock of the account, which Postgres
+    takes per row. SQLite locks the whole database for every write, there the
+    shard count should make no difference.
+    """
+
+    help = "Benchmark single account credit throughput by shard count"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--shards",
+            default="0,1,2,4,8,16,32,64",
+            help="Comma separated shard counts, 0 is the unsharded account",
+        )
+        parser.add_argument("--credits", type=int, default=5000)
+        parser.add_argument("--threads", type=int, default=32)
+
+    def handle(self, *args, **options):
+        try:
+            counts = [int(count) for count in options["shards"].split(",")]
+        except ValueError:
+            raise CommandError("--shards must be comma separated integers")
+        failed = False
+        for count in counts:
+            failed = self.run(count, options["credits"], options["threads"]) or failed
+        if failed:
+            raise CommandError("Final balance does not match the credits")
+
+    def run(self, shards, credits, threads):
+        account = Account.objects.create(account_type=SAVING, status=ACTIVE)
+        amount = Decimal("1.000")
+        try:
+            Account.objects.set_balance_shards(account.pk, shards)
+            latencies, errors, elapsed = run_concurrently(
+                lambda _: Account.objects.post_amount(account.pk, CREDIT, amount),
+                range(credits),
+                threads,
+            )
+            BalanceShard.objects.compact([account.pk])
+            balance = Account.objects.get(pk=account.pk).balance
+        finally:
+            Account.objects.filter(pk=account.pk).delete()
+
+        stats = summarize(latencies, elapsed)
+        expected = amount * len(latencies)
+        self.stdout.write(
+            f"{shards} shards: {stats['count']} credits in {stats['elapsed']}s "
+            f"({stats['throughput']}/s) p50={stats['p50_ms']}ms "
+            f"p99={stats['p99_ms']}ms errors={len(errors)} "
+            f"balance={balance} expected={expected}"
+        )
+        return balance != expected or bool(errors)
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from banking.management.commands.backfilldailytotals import day_range
+from banking.summaries import check
+
+
+class Command(BaseCommand):
+    """
+    Compare the daily totals of a range of days with totals of the
+    transactions and report the keys that differ.
+    """
+
+    help = "Check the daily Credit and Debit totals against the transactions"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="First day, YYYY-MM-DD")
+        parser.add_argument("--end", help="Last day, YYYY-MM-DD, yesterday by default")
+
+    def handle(self, *args, **options):
+        start, end = day_range(options)
+        if start is None:
+            self.stdout.write("No transactions")
+            return
+        mismatches = check(start, end)
+        for mismatch in mismatches:
+            self.stdout.write(
+                f"{mismatch.account_id} {mismatch.day} {mismatch.transaction_method} "
+                f"{mismatch.transaction_type}: stored {mismatch.stored[0]} in "
+                f"{mismatch.stored[1]}, transactions {mismatch.raw[0]} in "
+                f"{mismatch.raw[1]}"
+            )
+        if mismatches:
+            raise CommandError(
+                f"{len(mismatches)} daily totals differ, rebuild them with "
+                f"backfilldailytotals"
+            )
+        self.stdout.write(f"{start} to {end}: daily totals match")
@@ -1,88 +1,124 @@
-from accounts.models import User
-from banking.models import *
-from datetime import datetime
-import random
-from django.core.management.base import BaseCommand
-from decimal import Decimal
-from faker import Faker
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
 
-fake = Faker()
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Max
+from django.utils import timezone
 
-from BankingBackend.constant import (
-    ACCOUNT_CHOICES,
-    ACCOUNT_STATUS_CHOICES,
-    TRANSACTION_METHOD,
-    TRANSACTION_TYPE,
-    USER_CHOICES,
+from banking.models import Customer
+from banking.seed import (
+    ACCOUNTS_PER_BRANCH,
+    SEED_BATCH_SIZE,
+    SEED_PASSWORD,
+    create_branches,
+    seed_worker,
+    setup_worker,
+    split,
 )
+from banking.summaries import backfill
 
-user_type = [choice[0] for choice in USER_CHOICES]
-account_type = [choice[0] for choice in ACCOUNT_CHOICES]
-account_status = [choice[0] for choice in ACCOUNT_STATUS_CHOICES]
-transaction_type = [choice[0] for choice in TRANSACTION_TYPE]
-transaction_method = [choice[0] for choice in TRANSACTION_METHOD]
 
+class Command(BaseCommand):
+    """
+    Bulk create ``total`` customer accounts with their users and a skewed
+    transaction history, optionally from several processes.
+    """
 
-class Load_data:
-    def __init__(self, count):
-        self.count = count
+    help = "Create sample customers, accounts and transactions in bulk"
 
-    def load(self):
-        for _ in range(self.count):
-            user = User.objects.create(
-                username=fake.user_name(),
-                email=fake.email(),
-                user_type=random.choice(user_type),
-                contact_number=fake.phone_number(),
-                first_name=fake.first_name(),
-                last_name=fake.last_name(),
-            )
-            user.set_password("admin")
-            user.save()
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "total", type=int, help="Indicates the number of data to be created"
+        )
+        parser.add_argument(
+            "--transactions",
+            type=int,
+            default=None,
+            help="Transactions over all accounts, 20 per account by default",
+        )
+        parser.add_argument("--batch-size", type=int, default=SEED_BATCH_SIZE)
+        parser.add_argument("--workers", type=int, default=1)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--days", type=int, default=365, help="Days of transaction history"
+        )
+        parser.add_argument(
+            "--skew",
+            type=float,
+            default=1.2,
+            help="Pareto shape of transactions per account, lower is more skewed",
+        )
+        parser.add_argument(
+            "--no-ledger",
+            action="store_true",
+            help="Skip the ledger lines of the transactions",
+        )
 
-            branch = Branch.objects.create(
-                name=fake.name(),
-                city=fake.city(),
-                ifsc_code=fake.pystr(11),
-                micr_code=fake.pystr(11),
-            )
+    def handle(self, *args, **options):
+        total = options["total"]
+        workers = options["workers"]
+        if total < 1 or workers < 1 or options["batch_size"] < 1:
+            raise CommandError("total, --workers and --batch-size must be positive")
+        transactions = options["transactions"]
+        if transactions is None:
+            transactions = total * 20
 
-            cust = Customer.objects.create(
-                user_id=user.id,
-                customer_id=fake.pyint(),
-                date_of_birth=fake.date_time(),
-                address=fake.address(),
-                pan_card_number=fake.pystr(10),
-                aadhar_card_number=fake.pyint(),
-                occupation=fake.job(),
-                branch_id=branch.id,
-            )
+        started = time.perf_counter()
+        now = timezone.now()
+        password = make_password(SEED_PASSWORD)
+        branch_ids = create_branches(
+            max(1, total // ACCOUNTS_PER_BRANCH), now, password
+        )
+        customer_start = (Customer.objects.aggregate(m=Max("customer_id"))["m"] or 0) + 1
 
-            acc = Account.objects.create(
-                account_number=fake.pyint(10),
-                balance=fake.pydecimal(
-                    min_value=1000,
-                ),
-                customer_id=cust.id,
-                account_type=random.choice(account_type),
-                status=random.choice(account_status),
-            )
-            txn = Transaction.objects.create(
-                transaction_type=random.choice(transaction_type),
-                amount=fake.pydecimal(min_value=10, max_value=100),
-                account_id=acc.id,
-                transaction_method=random.choice(transaction_method),
-                description={},
-                reference_number=fake.pystr(10),
+        jobs = []
+        first_account = 0
+        for worker, (accounts, share) in enumerate(
+            zip(split(total, workers), split(transactions, workers))
+        ):
+            jobs.append(
+                {
+                    "worker": worker,
+                    "accounts": accounts,
+                    "transactions": share,
+                    "customer_start": customer_start + first_account,
+                    "seed": options["seed"],
+                    "days": options["days"],
+                    "skew": options["skew"],
+                    "batch_size": options["batch_size"],
+                    "ledger": not options["no_ledger"],
+                    "password": password,
+                    "branch_ids": branch_ids,
+                    "now": now,
+                }
             )
+            first_account += accounts
 
+        if workers > 1:
+            # Forked workers must not share the connection of this process.
+            connections.close_all()
+            with ProcessPoolExecutor(workers, initializer=setup_worker) as pool:
+                results = list(pool.map(seed_worker, jobs))
+        else:
+            results = [seed_worker(job) for job in jobs]
 
-class Command(BaseCommand):
-    def add_arguments(self, parser):
-        parser.add_argument(
-            "total", type=int, help="Indicates the number of data to be created"
+        written = {
+            table: sum(result[table] for result in results) for table in results[0]
+        }
+        # Seeded transactions skip the posting path, total them afterwards.
+        written["daily_totals"] = backfill(
+            timezone.localdate(now - timedelta(days=options["days"])),
+            timezone.localdate(now),
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Created {len(branch_ids)} branches, {written['users']} customers, "
+            f"{written['accounts']} accounts, {written['transactions']} "
+            f"transactions, {written['ledger_lines']} ledger lines and "
+            f"{written['daily_totals']} daily totals in "
+            f"{elapsed:.2f}s ({written['transactions'] / elapsed * 60:,.0f} "
+            f"transactions/minute)"
         )
-
-    def handle(self, *args, **kwargs):
-        load = Load_data(kwargs.get("total"))
-        load.load()
@@ -0,0 +1,86 @@
+import json
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.utils import timezone
+
+from banking.benchmark import seed_transactions
+from banking.exports import export_values
+from banking.models import Account, Transaction
+
+
+class Command(BaseCommand):
+    """
+    EXPLAIN and time the hot queries of CustomerEnquiry, TransferSerializer
+    and TransactionHistoryCsv on the current database.
+    """
+
+    help = "Report query plans and timings of the hot banking queries"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Bulk insert this many transactions on the busiest account first",
+        )
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--output", help="Write the report as JSON to this file")
+
+    def handle(self, *args, **options):
+        busiest = (
+            Account.objects.filter(customer__user__isnull=False)
+            .annotate(transactions=Count("account_transaction"))
+            .order_by("-transactions")
+            .select_related("customer")
+            .first()
+        )
+        if busiest is None:
+            raise CommandError(
+                "No customer accounts found, run createsamplerecords first"
+            )
+        if options["seed"]:
+            seed_transactions(busiest, options["seed"])
+
+        end = timezone.now()
+        start = end - timedelta(days=30)
+        queries = {
+            "enquiry_account": Account.objects.filter(
+                customer__user_id=busiest.customer.user_id
+            ),
+            "transfer_receiver": Account.objects.filter(
+                account_number=busiest.account_number
+            ),
+            "history_rows": export_values(
+                Transaction.objects.history([busiest.account_number], start, end)
+            ),
+            "history_watermark": Transaction.objects.history(
+                [busiest.account_number], start, end
+            ).values("account_id").annotate(rows=Count("id")),
+        }
+
+        report = {}
+        for name, queryset in queries.items():
+            timings = []
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append(time.perf_counter() - started)
+            report[name] = {
+                "plan": queryset.explain(),
+                "median_ms": round(statistics.median(timings) * 1000, 3),
+                "max_ms": round(max(timings) * 1000, 3),
+            }
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(report[name]["plan"])
+            self.stdout.write(
+                f"median {report[name]['median_ms']}ms, "
+                f"max {report[name]['max_ms']}ms\n"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(report, output, indent=2)
@@ -0,0 +1,49 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from banking.batch import FORMATS, BatchPosting, format_from_name, read_postings
+
+
+class Command(BaseCommand):
+    """
+    Post a CSV or JSONL settlement file of Credit/Debit postings.
+    """
+
+    help = "Validate and bulk post a CSV or JSONL file of postings"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or JSONL file of postings")
+        parser.add_argument("--format", choices=FORMATS)
+        parser.add_argument("--chunk-size", type=int, default=5000)
+        parser.add_argument(
+            "--atomic",
+            action="store_true",
+            help="Post nothing unless every row is valid",
+        )
+        parser.add_argument("--added-by", type=int, help="User id to record")
+        parser.add_argument(
+            "--no-notify", action="store_true", help="Do not send customer emails"
+        )
+
+    def handle(self, *args, **options):
+        fmt = options["format"] or format_from_name(options["path"])
+        batch = BatchPosting(
+            added_by=options["added_by"],
+            chunk_size=options["chunk_size"],
+            atomic=options["atomic"],
+            notify=not options["no_notify"],
+        )
+        try:
+            with open(options["path"], newline="", encoding="utf-8") as stream:
+                report = batch.run(read_postings(stream, fmt))
+        except OSError as e:
+            raise CommandError(e)
+
+        for error in report["errors"]:
+            self.stderr.write(json.dumps(error, default=str))
+        self.stdout.write(
+            f"Batch {report['batch_id']}: posted {report['posted']} of "
+            f"{report['rows']} rows in {report['elapsed']}s "
+            f"({report['postings_per_second']} postings/s), {report['failed']} failed"
+        )
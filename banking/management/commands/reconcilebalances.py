@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from banking.reconciliation import reconcile
+
+
+class Command(BaseCommand):
+    """
+    Compare every account balance with its opening balance plus Credits less
+    Debits and report the accounts that drifted.
+    """
+
+    help = "Reconcile account balances with their transaction history"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Only check accounts touched since the previous run",
+        )
+        parser.add_argument("--chunk-size", type=int, default=None)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Processes checking account id ranges in parallel",
+        )
+        parser.add_argument(
+            "--quiet-chunks", action="store_true", help="Do not time every chunk"
+        )
+
+    def handle(self, *args, **options):
+        chunk_number = 0
+
+        def on_chunk(result):
+            nonlocal chunk_number
+            chunk_number += 1
+            if not options["quiet_chunks"]:
+                self.stdout.write(
+                    f"chunk {chunk_number} from {result.first or 'start'}: "
+                    f"{result.accounts} accounts, {len(result.mismatches)} "
+                    f"mismatches in {result.seconds * 1000:.1f}ms"
+                )
+
+        run, mismatches = reconcile(
+            incremental=options["incremental"],
+            chunk_size=options["chunk_size"],
+            workers=options["workers"],
+            on_chunk=on_chunk,
+        )
+        for mismatch in mismatches:
+            self.stdout.write(
+                f"{mismatch.account_number}: balance {mismatch.balance}, "
+                f"expected {mismatch.expected}, drift "
+                f"{mismatch.balance - mismatch.expected}"
+            )
+        scope = f"since {run.watermark}" if run.incremental else "all accounts"
+        elapsed = (run.finished_at - run.started_at).total_seconds()
+        self.stdout.write(
+            f"Reconciled {run.accounts} accounts ({scope}) in {chunk_number} "
+            f"chunks, {elapsed:.3f}s: {run.mismatches} mismatches"
+        )
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} account balances do not reconcile")
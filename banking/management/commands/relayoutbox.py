@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from banking.outbox import DELIVERIES, drain
+
+
+class Command(BaseCommand):
+    """
+    Deliver the pending notification outbox, once or continuously.
+    """
+
+    help = "Relay outbox notifications to Celery or the mail backend"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--delivery", choices=DELIVERIES)
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument("--broker-url", help="Publish to this broker instead")
+        parser.add_argument(
+            "--loop", action="store_true", help="Keep relaying until interrupted"
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait when the outbox is empty or delivery fails",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            report = drain(
+                options["batch_size"], options["delivery"], options["broker_url"]
+            )
+            if report["sent"] or report["failed"]:
+                self.stdout.write(
+                    f"sent {report['sent']}, failed {report['failed']} "
+                    f"in {report['elapsed']}s"
+                )
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
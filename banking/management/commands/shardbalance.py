@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from banking.models import Account, BalanceShard
+
+
+class Command(BaseCommand):
+    """
+    Turn sharded balances on or off for hot accounts, or fold the shards of
+    every sharded account back into its balance now.
+    """
+
+    help = "Set the balance shards of accounts or compact them"
+
+    def add_arguments(self, parser):
+        parser.add_argument("account_numbers", nargs="*", type=int)
+        parser.add_argument(
+            "--shards",
+            type=int,
+            help="Shard rows per account, 0 turns sharding off",
+        )
+        parser.add_argument(
+            "--compact",
+            action="store_true",
+            help="Fold the shards of every sharded account into its balance",
+        )
+
+    def handle(self, *args, **options):
+        if options["compact"]:
+            folded = BalanceShard.objects.compact()
+            self.stdout.write(f"Compacted {folded} accounts")
+            return
+        if options["shards"] is None or not options["account_numbers"]:
+            raise CommandError("Pass account numbers and --shards, or --compact")
+        if not 0 <= options["shards"] <= 1024:
+            raise CommandError("--shards must be between 0 and 1024")
+        accounts = dict(
+            Account.objects.filter(
+                account_number__in=options["account_numbers"]
+            ).values_list("account_number", "pk")
+        )
+        missing = set(options["account_numbers"]) - set(accounts)
+        if missing:
+            raise CommandError(
+                f"Account numbers not found: {', '.join(map(str, sorted(missing)))}"
+            )
+        for number, pk in accounts.items():
+            Account.objects.set_balance_shards(pk, options["shards"])
+            self.stdout.write(f"{number}: {options['shards']} shards")
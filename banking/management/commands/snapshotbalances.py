@@ -0,0 +1,40 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from banking.ledger import snapshot_day
+
+
+class Command(BaseCommand):
+    """
+    Write the daily balance snapshots of the ledger, for yesterday by default.
+    """
+
+    help = "Snapshot end of day ledger balances of the accounts posted to"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--day", help="Day to snapshot, YYYY-MM-DD")
+        parser.add_argument(
+            "--since",
+            help="Snapshot every day from this YYYY-MM-DD up to --day, in order",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            last = (
+                date.fromisoformat(options["day"])
+                if options["day"]
+                else timezone.localdate() - timedelta(days=1)
+            )
+            first = date.fromisoformat(options["since"]) if options["since"] else last
+        except ValueError as e:
+            raise CommandError(e)
+        if first > last:
+            raise CommandError("--since must not be after --day")
+
+        day = first
+        while day <= last:
+            written = snapshot_day(day)
+            self.stdout.write(f"{day}: {written} snapshots")
+            day += timedelta(days=1)
@@ -0,0 +1,106 @@
+import random
+import threading
+from collections import Counter
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Sum
+
+from banking.benchmark import delete_accounts, run_concurrently, summarize
+from banking.models import Account, Transaction
+from banking.transfers import TransferRejected, execute_transfer
+from BankingBackend.constant import ACTIVE, CREDIT, SAVING, UPI
+
+
+class Command(BaseCommand):
+    """
+    Run random cross transfers between a small set of accounts from many
+    threads and check no money is created or lost and no account overdraws.
+    """
+
+    help = "Stress test concurrent transfers and check money is conserved"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--transfers", type=int, default=5000)
+        parser.add_argument("--accounts", type=int, default=10)
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument(
+            "--balance",
+            default="100.000",
+            help="Opening balance of every account, small balances make "
+            "transfers compete for the same funds",
+        )
+        parser.add_argument("--max-retries", type=int, default=10)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        opening = Decimal(options["balance"])
+        accounts = [
+            Account.objects.create(
+                account_type=SAVING, status=ACTIVE, balance=opening
+            ).pk
+            for _ in range(options["accounts"])
+        ]
+        transfers = [
+            (*rng.sample(accounts, 2), Decimal(rng.randint(1, 5000)) / 100)
+            for _ in range(options["transfers"])
+        ]
+        outcomes = Counter()
+        lock = threading.Lock()
+
+        def transfer(item):
+            sender, receiver, amount = item
+            try:
+                execute_transfer(
+                    sender,
+                    receiver,
+                    amount,
+                    UPI,
+                    max_retries=options["max_retries"],
+                )
+                outcome = "posted"
+            except TransferRejected:
+                outcome = "rejected"
+            with lock:
+                outcomes[outcome] += 1
+
+        try:
+            latencies, errors, elapsed = run_concurrently(
+                transfer, transfers, options["threads"]
+            )
+            self.verify(accounts, opening, outcomes)
+        finally:
+            delete_accounts(accounts)
+
+        stats = summarize(latencies, elapsed)
+        self.stdout.write(
+            f"{len(transfers)} transfers in {stats['elapsed']}s "
+            f"({stats['throughput']}/s) p50={stats['p50_ms']}ms "
+            f"p99={stats['p99_ms']}ms: {outcomes['posted']} posted, "
+            f"{outcomes['rejected']} rejected, {len(errors)} errors"
+        )
+        if errors:
+            raise CommandError(f"Transfers failed: {errors[0]!r}")
+
+    def verify(self, accounts, opening, outcomes):
+        balances = dict(
+            Account.objects.filter(pk__in=accounts).values_list("pk", "balance")
+        )
+        total = sum(balances.values())
+        expected = opening * len(accounts)
+        if total != expected:
+            raise CommandError(f"Money not conserved: {total} != {expected}")
+        if min(balances.values()) < 0:
+            raise CommandError("An account was overdrawn")
+
+        # Every balance must match the transactions posted on it.
+        posted = Transaction.objects.filter(account_id__in=accounts)
+        for pk, balance in balances.items():
+            legs = posted.filter(account_id=pk)
+            credits = legs.filter(transaction_type=CREDIT).aggregate(s=Sum("amount"))
+            debits = legs.exclude(transaction_type=CREDIT).aggregate(s=Sum("amount"))
+            if opening + (credits["s"] or 0) - (debits["s"] or 0) != balance:
+                raise CommandError(f"Balance of {pk} does not match its transactions")
+        if posted.count() != 2 * outcomes["posted"]:
+            raise CommandError("Transactions do not match the posted transfers")
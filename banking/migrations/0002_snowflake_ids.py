@@ -0,0 +1,29 @@
+# Generated by Django 3.2 on 2026-10-18 15:15
+
+import banking.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banking', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='account',
+            name='account_number',
+            field=models.BigIntegerField(default=banking.models.get_default_account, editable=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='beneficiary',
+            name='account_number',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='transaction_id',
+            field=models.CharField(db_index=True, default=banking.models.generate_txn_id, editable=False, max_length=100),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 3.2 on 2026-10-18 15:20
+
+import banking.models
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import jsonfield.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('banking', '0002_snowflake_ids'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now_add=True)),
+                ('is_deleted', models.BooleanField(default=False, null=True)),
+                ('id', models.CharField(default=banking.models.uuid_str, max_length=100, primary_key=True, serialize=False)),
+                ('cache_key', models.CharField(db_index=True, max_length=64)),
+                ('acc_ids', jsonfield.fields.JSONField(default=list)),
+                ('start_date', models.DateTimeField()),
+                ('end_date', models.DateTimeField()),
+                ('status', models.CharField(choices=[('PE', 'Pending'), ('RU', 'Running'), ('DN', 'Done'), ('FL', 'Failed')], default='PE', max_length=2)),
+                ('file_path', models.CharField(blank=True, max_length=500)),
+                ('size', models.BigIntegerField(default=0)),
+                ('rows', models.BigIntegerField(default=0)),
+                ('manifest', jsonfield.fields.JSONField(default=list)),
+                ('error', models.TextField(blank=True)),
+                ('requested_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='export_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
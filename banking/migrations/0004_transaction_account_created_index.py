@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-18 15:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banking', '0003_exportjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['account', 'created_at'], name='banking_txn_account_created'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 3.2 on 2026-10-18 15:30
+
+import banking.models
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import jsonfield.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banking', '0004_transaction_account_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now_add=True)),
+                ('is_deleted', models.BooleanField(default=False, null=True)),
+                ('id', models.CharField(default=banking.models.uuid_str, max_length=100, primary_key=True, serialize=False)),
+                ('topic', models.CharField(choices=[('transaction_email', 'Transaction Email')], max_length=30)),
+                ('payload', jsonfield.fields.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('PE', 'Pending'), ('RU', 'Running'), ('DN', 'Done'), ('FL', 'Failed')], default='PE', max_length=2)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('account', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='outbox_messages', to='banking.account')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='outboxmessage',
+            index=models.Index(fields=['status', 'available_at'], name='banking_outbox_ready'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 3.2 on 2026-10-18 15:39
+
+import banking.models
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banking', '0006_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerLine',
+            fields=[
+                ('id', models.CharField(default=banking.models.uuid_str, max_length=100, primary_key=True, serialize=False)),
+                ('entry_id', models.CharField(max_length=100)),
+                ('book', models.CharField(choices=[('CA', 'Customer Account'), ('BK', 'Bank Settlement')], max_length=2)),
+                ('amount', models.DecimalField(decimal_places=3, max_digits=20)),
+                ('posted_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('account', models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='ledger_lines', to='banking.account')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.CharField(default=banking.models.uuid_str, max_length=100, primary_key=True, serialize=False)),
+                ('day', models.DateField()),
+                ('as_of', models.DateTimeField()),
+                ('balance', models.DecimalField(decimal_places=3, max_digits=20)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshots', to='banking.account')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='ledgerline',
+            index=models.Index(fields=['account', 'posted_at'], name='banking_ledger_account'),
+        ),
+        migrations.AddIndex(
+            model_name='ledgerline',
+            index=models.Index(fields=['posted_at'], name='banking_ledger_posted'),
+        ),
+        migrations.AddIndex(
+            model_name='balancesnapshot',
+            index=models.Index(fields=['account', 'as_of'], name='banking_snapshot_as_of'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='balancesnapshot',
+            unique_together={('account', 'day')},
+        ),
+    ]
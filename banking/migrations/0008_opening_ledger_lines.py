@@ -0,0 +1,55 @@
+from django.db import migrations
+from django.utils import timezone
+
+
+def open_ledger(apps, schema_editor):
+    """
+    Record the balance of every existing account as an opening ledger entry.
+
+    Transactions from before the ledger have no lines, the ledger starts
+    from the balances at the time of this migration.
+    """
+    Account = apps.get_model("banking", "Account")
+    LedgerLine = apps.get_model("banking", "LedgerLine")
+    opened_at = timezone.now()
+    lines = []
+    for account_id, balance in (
+        Account.objects.exclude(balance=0).values_list("id", "balance").iterator()
+    ):
+        entry_id = f"opening-{account_id}"
+        lines.append(
+            LedgerLine(
+                id=f"{entry_id}-CA",
+                entry_id=entry_id,
+                account_id=account_id,
+                book="CA",
+                amount=balance,
+                posted_at=opened_at,
+            )
+        )
+        lines.append(
+            LedgerLine(
+                id=f"{entry_id}-BK",
+                entry_id=entry_id,
+                book="BK",
+                amount=-balance,
+                posted_at=opened_at,
+            )
+        )
+    LedgerLine.objects.bulk_create(lines, batch_size=1000)
+
+
+def close_ledger(apps, schema_editor):
+    LedgerLine = apps.get_model("banking", "LedgerLine")
+    LedgerLine.objects.filter(entry_id__startswith="opening-").delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("banking", "0007_ledger"),
+    ]
+
+    operations = [
+        migrations.RunPython(open_ledger, close_ledger),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2 on 2026-10-18 15:44
+
+import banking.models
+from decimal import Decimal
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banking', '0008_opening_ledger_lines'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReconciliationRun',
+            fields=[
+                ('id', models.CharField(default=banking.models.uuid_str, max_length=100, primary_key=True, serialize=False)),
+                ('incremental', models.BooleanField(default=False)),
+                ('watermark', models.DateTimeField(null=True)),
+                ('started_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(null=True)),
+                ('accounts', models.PositiveIntegerField(default=0)),
+                ('mismatches', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='opening_balance',
+            field=models.DecimalField(decimal_places=3, default=Decimal('0.000'), max_digits=20),
+        ),
+    ]
@@ -0,0 +1,41 @@
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Q, Sum
+
+
+def set_opening_balances(apps, schema_editor):
+    """
+    Set the opening balance of every existing account to the part of its
+    balance its transactions do not explain.
+
+    Balances are taken as correct at the time of this migration, drift from
+    before can not be told apart from an opening balance.
+    """
+    Account = apps.get_model("banking", "Account")
+    accounts = Account.objects.annotate(
+        credits=Sum(
+            "account_transaction__amount",
+            filter=Q(account_transaction__transaction_type="Credit"),
+        ),
+        debits=Sum(
+            "account_transaction__amount",
+            filter=Q(account_transaction__transaction_type="Debit"),
+        ),
+    ).values_list("id", "balance", "credits", "debits")
+    for account_id, balance, credits, debits in accounts.iterator():
+        opening = balance - Decimal(credits or 0) + Decimal(debits or 0)
+        opening = opening.quantize(Decimal("0.001"))
+        if opening:
+            Account.objects.filter(pk=account_id).update(opening_balance=opening)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("banking", "0009_reconciliation"),
+    ]
+
+    operations = [
+        migrations.RunPython(set_opening_balances, migrations.RunPython.noop),
+    ]
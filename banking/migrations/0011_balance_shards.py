@@ -0,0 +1,33 @@
+# Generated by Django 3.2 on 2026-10-18 16:10
+
+import banking.models
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banking', '0010_opening_balances'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='balance_shards',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='BalanceShard',
+            fields=[
+                ('id', models.CharField(default=banking.models.uuid_str, max_length=100, primary_key=True, serialize=False)),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('balance', models.DecimalField(decimal_places=3, default=Decimal('0.000'), max_digits=20)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_shard_rows', to='banking.account')),
+            ],
+            options={
+                'unique_together': {('account', 'shard')},
+            },
+        ),
+    ]
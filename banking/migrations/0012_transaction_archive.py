@@ -0,0 +1,43 @@
+# Generated by Django 3.2 on 2026-10-18 16:14
+
+import banking.models
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import jsonfield.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banking', '0011_balance_shards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionArchive',
+            fields=[
+                ('id', models.CharField(default=banking.models.uuid_str, max_length=100, primary_key=True, serialize=False)),
+                ('month', models.DateField(unique=True)),
+                ('path', models.CharField(max_length=500)),
+                ('rows', models.BigIntegerField(default=0)),
+                ('size', models.BigIntegerField(default=0)),
+                ('manifest', jsonfield.fields.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedTotal',
+            fields=[
+                ('id', models.CharField(default=banking.models.uuid_str, max_length=100, primary_key=True, serialize=False)),
+                ('credits', models.DecimalField(decimal_places=3, default=Decimal('0.000'), max_digits=20)),
+                ('debits', models.DecimalField(decimal_places=3, default=Decimal('0.000'), max_digits=20)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_totals', to='banking.account')),
+                ('archive', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='totals', to='banking.transactionarchive')),
+            ],
+            options={
+                'unique_together': {('archive', 'account')},
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+from django.db import migrations
+from django.utils import timezone
+
+TABLE = "banking_transaction"
+OLD = "banking_transaction_unpartitioned"
+
+
+def partition_transactions(apps, schema_editor):
+    """
+    Rebuild the transaction table of a Postgres database as a table
+    partitioned by month of ``created_at``, with a partition for every month
+    that has rows, the next months and a default partition.
+
+    The primary key of a partitioned table has to include the partition key,
+    it becomes (id, created_at). Nothing references transactions by foreign
+    key. Other databases keep the plain table.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    from banking.partitions import add_months, create_partition, month_start
+
+    quote = schema_editor.quote_name
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s "
+            "AND indexdef NOT LIKE 'CREATE UNIQUE%%'",
+            [TABLE],
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(f"SELECT min(created_at) FROM {quote(TABLE)}")
+        first = cursor.fetchone()[0] or timezone.now()
+
+        cursor.execute(f"ALTER TABLE {quote(TABLE)} RENAME TO {quote(OLD)}")
+        cursor.execute(
+            f"CREATE TABLE {quote(TABLE)} (LIKE {quote(OLD)} INCLUDING DEFAULTS "
+            f"INCLUDING CONSTRAINTS) PARTITION BY RANGE (created_at)"
+        )
+        month, last = month_start(first), add_months(month_start(timezone.now()), 3)
+        while month <= last:
+            create_partition(cursor, month, TABLE)
+            month = add_months(month, 1)
+        cursor.execute(
+            f"CREATE TABLE {quote(TABLE + '_default')} PARTITION OF {quote(TABLE)} "
+            f"DEFAULT"
+        )
+        cursor.execute(f"INSERT INTO {quote(TABLE)} SELECT * FROM {quote(OLD)}")
+        cursor.execute(f"DROP TABLE {quote(OLD)}")
+
+        # Indexes of the parent are created on every partition, building them
+        # after the copy is faster than maintaining them during it.
+        cursor.execute(
+            f"ALTER TABLE {quote(TABLE)} ADD CONSTRAINT {quote(TABLE + '_pkey')} "
+            f"PRIMARY KEY (id, created_at)"
+        )
+        cursor.execute(
+            f"ALTER TABLE {quote(TABLE)} ADD CONSTRAINT "
+            f"{quote(TABLE + '_account_id_fk_banking_account_id')} FOREIGN KEY "
+            f"(account_id) REFERENCES banking_account (id) "
+            f"DEFERRABLE INITIALLY DEFERRED"
+        )
+        for _, definition in indexes:
+            cursor.execute(definition)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("banking", "0012_transaction_archive"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            partition_transactions, reverse_code=migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.2 on 2026-10-18 16:18
+
+import banking.models
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banking', '0013_partition_transactions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyTotal',
+            fields=[
+                ('id', models.CharField(default=banking.models.uuid_str, max_length=100, primary_key=True, serialize=False)),
+                ('day', models.DateField()),
+                ('transaction_method', models.CharField(choices=[('UPI', 'UPI'), ('NEFT', 'NEFT'), ('IMPS', 'IMPS'), ('RTGS', 'RTGS'), ('ATM', 'ATM'), ('POS', 'POS'), ('WITHDRAW', 'WITHDRAW'), ('OT', 'OTHER'), ('CASH', 'CASH')], max_length=8)),
+                ('transaction_type', models.CharField(choices=[('Debit', 'Debit'), ('Credit', 'Credit')], max_length=10)),
+                ('amount', models.DecimalField(decimal_places=3, default=Decimal('0.000'), max_digits=20)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='daily_totals', to='banking.account')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='dailytotal',
+            index=models.Index(fields=['day'], name='banking_daily_total_day'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailytotal',
+            unique_together={('account', 'day', 'transaction_method', 'transaction_type')},
+        ),
+    ]
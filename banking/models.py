@@ -1,23 +1,46 @@
+import itertools
 import random
-import string
 import uuid
-from django.db import models
+import zlib
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Case, F, Sum, Value, When
 from decimal import Decimal
 from django.forms.models import model_to_dict
+from django.utils import timezone
 
 from jsonfield import JSONField
 
 from accounts.models import User
-from BankingBackend.tasks.celery import schedule_send_email
+from banking.ids import next_id
+from banking.signals import balance_changed
 
 from BankingBackend.constant import (
     ACCOUNT_CHOICES,
     ACCOUNT_STATUS_CHOICES,
+    BANK_BOOK,
+    CREDIT,
+    CUSTOMER_BOOK,
+    DEBIT,
+    JOB_STATUS_CHOICES,
+    LEDGER_BOOKS,
+    OUTBOX_TOPICS,
+    PENDING,
+    RUNNING,
+    TRANSACTION_EMAIL,
     TRANSACTION_METHOD,
     TRANSACTION_TYPE,
 )
 
 
+class InsufficientBalance(Exception):
+    """
+    Raised when a debit would take an account balance below zero.
+    """
+
+
 def uuid_str():
     """
     Generate UUID
@@ -29,20 +52,14 @@ def get_default_account():
     """
     Create account number
     """
-    num = "".join(random.choices(string.digits, k=12))
-    if not Account.objects.filter(account_number=num).exists():
-        return int(num)
-    get_default_account()
+    return next_id()
 
 
 def generate_txn_id():
     """
     Generate Transction ID for the Transaction table
     """
-    txn_id = "".join(random.choices(string.digits, k=12))
-    if not Transaction.objects.filter(transaction_id="txn" + txn_id).exists():
-        return "txn" + str(txn_id)
-    generate_txn_id()
+    return "txn" + str(next_id())
 
 
 class BaseModelClass(models.Model):
@@ -144,18 +161,206 @@ class Address(BaseModelClass):
         return f"{self.address_line1}_{self.city}"
 
 
+def notify_balance_changed(account_ids):
+    """
+    Send ``balance_changed`` for ``account_ids`` once the current transaction
+    commits.
+    """
+    if not account_ids:
+        return
+    transaction.on_commit(
+        lambda: balance_changed.send(sender=Account, account_ids=account_ids)
+    )
+
+
+# Round-robin position of the process, from a random start so processes do
+# not all credit the same shards first. next() on a count is thread safe.
+_next_shard = itertools.count(random.randrange(1 << 16))
+
+
+def choose_shard(shards, key=None):
+    """
+    Shard of ``shards`` a credit lands on, by hash of ``key`` when
+    ``BALANCE_SHARD_STRATEGY`` is 'hash', round-robin otherwise.
+    """
+    if key is not None and settings.BALANCE_SHARD_STRATEGY == "hash":
+        return zlib.crc32(str(key).encode()) % shards
+    return next(_next_shard) % shards
+
+
+class AccountQuerySet(models.QuerySet):
+    """
+    Balance posting engine.
+
+    Balances are never read into Python and written back, every posting is a
+    single UPDATE of the balance column with an ``F()`` expression so
+    concurrent postings to the same account can not overwrite each other.
+    """
+
+    def post_amount(
+        self,
+        account_id,
+        transaction_type,
+        amount,
+        check_balance=False,
+        shard_key=None,
+    ):
+        """
+        Credit or Debit ``amount`` on the account and return the new balance.
+
+        With ``check_balance`` a Debit is only applied when the balance covers
+        it, otherwise ``InsufficientBalance`` is raised and nothing changes.
+
+        Credits to a sharded account update one of its ``BalanceShard`` rows,
+        picked by ``choose_shard`` with ``shard_key``, and leave the account
+        row alone. Debits of a sharded account lock the account row, check the
+        balance with its shards and are posted on ``balance``.
+        """
+        if transaction_type == CREDIT:
+            delta = amount
+        elif transaction_type == DEBIT:
+            delta = -amount
+        else:
+            raise ValueError(f"Unknown transaction type {transaction_type}")
+
+        with transaction.atomic():
+            while True:
+                accounts = self.filter(pk=account_id, balance_shards=0)
+                if check_balance and delta < 0:
+                    accounts = accounts.filter(balance__gte=amount)
+                if accounts.update(balance=F("balance") + delta):
+                    break
+                shards = (
+                    self.filter(pk=account_id)
+                    .values_list("balance_shards", flat=True)
+                    .first()
+                )
+                if shards is None:
+                    raise Account.DoesNotExist("Account not found")
+                if shards:
+                    if self._post_sharded(
+                        account_id, shards, delta, check_balance, shard_key
+                    ):
+                        break
+                elif check_balance and delta < 0:
+                    raise InsufficientBalance("Insufficient account balance")
+                # Sharding was turned on or off in between, post again.
+            notify_balance_changed([account_id])
+            return self.filter(pk=account_id).total_balances()[account_id]
+
+    def _post_sharded(self, account_id, shards, delta, check_balance, shard_key):
+        if delta > 0:
+            return BalanceShard.objects.filter(
+                account_id=account_id, shard=choose_shard(shards, shard_key)
+            ).update(balance=F("balance") + delta)
+        # The compactor locks the account row as well, the shards can only
+        # grow while the balance is checked.
+        balance = (
+            self.select_for_update()
+            .filter(pk=account_id, balance_shards=shards)
+            .values_list("balance", flat=True)
+            .first()
+        )
+        if balance is None:
+            return 0
+        if check_balance:
+            balance += BalanceShard.objects.totals([account_id]).get(account_id, 0)
+            if balance < -delta:
+                raise InsufficientBalance("Insufficient account balance")
+        return self.filter(pk=account_id).update(balance=F("balance") + delta)
+
+    def total_balances(self):
+        """
+        ``{account_id: balance}`` of the accounts, with the shards of sharded
+        accounts added.
+        """
+        rows = list(self.values_list("pk", "balance", "balance_shards"))
+        shards = BalanceShard.objects.totals([pk for pk, _, n in rows if n])
+        return {pk: balance + shards.get(pk, 0) for pk, balance, _ in rows}
+
+    def set_balance_shards(self, account_id, shards):
+        """
+        Spread the credits of the account over ``shards`` shard rows, 0 turns
+        sharding off. The shards are folded into ``balance`` first.
+        """
+        with transaction.atomic():
+            BalanceShard.objects.fold(account_id)
+            BalanceShard.objects.filter(
+                account_id=account_id, shard__gte=shards
+            ).delete()
+            existing = set(
+                BalanceShard.objects.filter(account_id=account_id).values_list(
+                    "shard", flat=True
+                )
+            )
+            BalanceShard.objects.bulk_create(
+                BalanceShard(account_id=account_id, shard=shard)
+                for shard in range(shards)
+                if shard not in existing
+            )
+            self.filter(pk=account_id).update(balance_shards=shards)
+
+    def for_enquiry(self):
+        """
+        Accounts with only the columns ``AccountSerializer`` reads, customer,
+        branch and user joined in the same query.
+        """
+        return self.select_related("customer__user", "customer__branch").only(
+            "account_number",
+            "balance",
+            "balance_shards",
+            "account_type",
+            "customer__pan_card_number",
+            "customer__aadhar_card_number",
+            "customer__customer_id",
+            "customer__branch__ifsc_code",
+            "customer__user__first_name",
+            "customer__user__last_name",
+        )
+
+    def post_deltas(self, deltas, chunk_size=300):
+        """
+        Apply net balance changes ``{account_id: delta}`` to many accounts with
+        one UPDATE per ``chunk_size`` accounts.
+
+        The net change of a sharded account is posted on ``balance`` too, its
+        balance with the shards stays right.
+        """
+        items = [(pk, delta) for pk, delta in deltas.items() if delta]
+        balance_field = Account._meta.get_field("balance")
+        with transaction.atomic():
+            for start in range(0, len(items), chunk_size):
+                chunk = items[start : start + chunk_size]
+                self.filter(pk__in=[pk for pk, _ in chunk]).update(
+                    balance=F("balance")
+                    + Case(
+                        *[When(pk=pk, then=Value(delta)) for pk, delta in chunk],
+                        output_field=balance_field,
+                    )
+                )
+            notify_balance_changed([pk for pk, _ in items])
+
+
 class Account(BaseModelClass):
     """
     Customer bank account table
     """
 
     id = models.CharField(primary_key=True, default=uuid_str, max_length=100)
-    account_number = models.IntegerField(
+    account_number = models.BigIntegerField(
         default=get_default_account, unique=True, editable=False
     )
     balance = models.DecimalField(
         max_digits=20, decimal_places=3, default=Decimal("0.000")
     )
+    # Balance the account was opened with, before any transaction
+    opening_balance = models.DecimalField(
+        max_digits=20, decimal_places=3, default=Decimal("0.000")
+    )
+
+    # Number of BalanceShard rows the credits of a hot account are spread
+    # over, 0 posts every credit on balance
+    balance_shards = models.PositiveSmallIntegerField(default=0)
 
     # here I'm assuming only for saving account
     customer = models.ForeignKey(
@@ -167,11 +372,151 @@ class Account(BaseModelClass):
     account_type = models.CharField(max_length=2, choices=ACCOUNT_CHOICES)
     status = models.CharField(max_length=2, choices=ACCOUNT_STATUS_CHOICES)
 
+    objects = AccountQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.account_number} - {self.customer.user.get_full_name()}"
 
     def get_account_balance(self):
-        return self.balance
+        return self.current_balance
+
+    @property
+    def current_balance(self):
+        """
+        Balance of the account, with the credits still on its shards.
+        """
+        if not self.balance_shards:
+            return self.balance
+        return self.balance + BalanceShard.objects.totals([self.pk]).get(self.pk, 0)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            return super(Account, self).save(*args, **kwargs)
+        # A new account with a balance starts with its opening ledger entry,
+        # so its point-in-time balances add up to the balance.
+        self.opening_balance = self.balance
+        with transaction.atomic():
+            super(Account, self).save(*args, **kwargs)
+            LedgerLine.objects.open([self])
+
+
+class BalanceShardQuerySet(models.QuerySet):
+    """
+    Sub-balances of sharded accounts and their compaction.
+    """
+
+    def totals(self, account_ids):
+        """
+        ``{account_id: sum of its shards}`` of ``account_ids``.
+        """
+        rows = (
+            self.filter(account_id__in=account_ids)
+            .order_by()
+            .values("account")
+            .annotate(total=Sum("balance"))
+            .values_list("account", "total")
+        )
+        # SQLite sums decimals as floats, round back to the amount scale.
+        return {
+            pk: Decimal(total or 0).quantize(Decimal("0.001")) for pk, total in rows
+        }
+
+    def fold(self, account_id):
+        """
+        Move the shards of the account into ``Account.balance``, must run
+        inside a transaction. Returns the amount moved.
+
+        The account row is locked first, like debits do, then the shards so
+        a credit posts either before the fold or on the emptied shard.
+        """
+        Account.objects.select_for_update().filter(pk=account_id).values_list(
+            "pk"
+        ).first()
+        shards = dict(
+            self.select_for_update()
+            .filter(account_id=account_id)
+            .values_list("pk", "balance")
+        )
+        moved = sum(shards.values(), Decimal("0.000"))
+        if moved:
+            self.filter(pk__in=shards).update(balance=Decimal("0.000"))
+            Account.objects.filter(pk=account_id).update(
+                balance=F("balance") + moved
+            )
+        return moved
+
+    def compact(self, account_ids=None):
+        """
+        Fold the shards of ``account_ids``, of every account with a non-zero
+        shard by default, each account in its own short transaction. Returns
+        the number of accounts folded.
+
+        The balance of an account does not change, enquiries stay cached.
+        """
+        if account_ids is None:
+            account_ids = (
+                self.exclude(balance=0)
+                .order_by()
+                .values_list("account_id", flat=True)
+                .distinct()
+            )
+        folded = 0
+        for account_id in list(account_ids):
+            with transaction.atomic():
+                if self.fold(account_id):
+                    folded += 1
+        return folded
+
+
+class BalanceShard(models.Model):
+    """
+    Sub-balance of a sharded account.
+
+    Concurrent credits to a hot account update different shard rows instead
+    of queueing on the lock of the account row. The balance of the account is
+    ``Account.balance`` plus its shards until the compactor folds them back.
+    """
+
+    id = models.CharField(primary_key=True, default=uuid_str, max_length=100)
+    account = models.ForeignKey(
+        Account, related_name="balance_shard_rows", on_delete=models.CASCADE
+    )
+    shard = models.PositiveSmallIntegerField()
+    balance = models.DecimalField(
+        max_digits=20, decimal_places=3, default=Decimal("0.000")
+    )
+
+    objects = BalanceShardQuerySet.as_manager()
+
+    class Meta:
+        unique_together = [("account", "shard")]
+
+    def __str__(self):
+        return f"{self.account_id} #{self.shard} {self.balance}"
+
+
+class TransactionQuerySet(models.QuerySet):
+    """
+    Transaction lookups.
+    """
+
+    def history(self, account_numbers, start_date, end_date):
+        """
+        Transactions of the ``account_numbers`` accounts created in the range.
+
+        Account numbers are resolved to account ids first so the range scan
+        runs on the (account, created_at) index without a join to Account.
+        """
+        account_ids = list(
+            Account.objects.filter(account_number__in=account_numbers).values_list(
+                "id", flat=True
+            )
+        )
+        return self.filter(
+            account_id__in=account_ids,
+            created_at__gte=start_date,
+            created_at__lte=end_date,
+        )
 
 
 class Transaction(BaseModelClass):
@@ -181,7 +526,7 @@ class Transaction(BaseModelClass):
 
     id = models.CharField(primary_key=True, default=uuid_str, max_length=100)
     transaction_id = models.CharField(
-        default=generate_txn_id, editable=False, max_length=100
+        default=generate_txn_id, editable=False, max_length=100, db_index=True
     )
 
     transaction_type = models.CharField(max_length=10, choices=TRANSACTION_TYPE)
@@ -198,28 +543,440 @@ class Transaction(BaseModelClass):
     description = JSONField(default=dict)
     reference_number = models.CharField(max_length=50, null=True, blank=True)
 
+    objects = TransactionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["account", "created_at"], name="banking_txn_account_created"
+            ),
+        ]
+
     def __str__(self):
         return self.transaction_id
 
     def save(self, *args, **kwargs):
         """
-        Overide save method where amount will be Credit or Deibit from customer account
-        """
-        account = self.account
-        if self.transaction_type == "Credit":
-            account.balance = round(account.balance + self.amount, 3)
-        elif self.transaction_type == "Debit":
-            account.balance = round(account.balance - self.amount, 3)
-        account.save()
-        super(Transaction, self).save(*args, **kwargs)
-        
-        parmas = {
-            "email":[account.customer.user.email],
-            "transaction_type": self.transaction_type, 
-            "account_number":account.account_number, 
-            "amount": self.amount
-        }
-        schedule_send_email.delay(**parmas)
+        Overide save method where amount will be Credit or Deibit from customer account.
+
+        The balance is posted only when the transaction is first inserted, pass
+        ``check_balance=True`` to refuse a Debit the balance can not cover.
+        """
+        check_balance = kwargs.pop("check_balance", False)
+        if not self._state.adding:
+            return super(Transaction, self).save(*args, **kwargs)
+
+        with transaction.atomic():
+            balance = Account.objects.post_amount(
+                self.account_id,
+                self.transaction_type,
+                self.amount,
+                check_balance,
+                shard_key=self.transaction_id,
+            )
+            super(Transaction, self).save(*args, **kwargs)
+            LedgerLine.objects.record([self])
+            DailyTotal.objects.record([self])
+            account = self.account
+            if account.customer is not None:
+                OutboxMessage.objects.enqueue(
+                    account,
+                    transaction_email(
+                        account.customer.user.email,
+                        self.transaction_type,
+                        account.account_number,
+                        self.amount,
+                    ),
+                )
+        account.balance = balance
+
+
+class ImmutableLedger(Exception):
+    """
+    Raised on an attempt to change or delete a ledger line.
+    """
+
+
+class LedgerQuerySet(models.QuerySet):
+    """
+    Append-only double-entry ledger.
+    """
+
+    def record(self, transactions):
+        """
+        Append the two ledger lines of every saved ``Transaction``.
+
+        The customer account line carries the signed balance change and the
+        bank settlement line the opposite amount, so every entry sums to zero.
+        """
+        lines = []
+        for txn in transactions:
+            amount = txn.amount if txn.transaction_type == CREDIT else -txn.amount
+            for account_id, book, signed in (
+                (txn.account_id, CUSTOMER_BOOK, amount),
+                (None, BANK_BOOK, -amount),
+            ):
+                lines.append(
+                    LedgerLine(
+                        entry_id=txn.transaction_id,
+                        account_id=account_id,
+                        book=book,
+                        amount=signed,
+                        posted_at=txn.created_at,
+                    )
+                )
+        return self.bulk_create(lines, batch_size=1000)
+
+    def open(self, accounts):
+        """
+        Append the opening entry of every new account with an opening balance,
+        with the ids the opening ledger migration uses.
+        """
+        lines = []
+        for account in accounts:
+            if not account.opening_balance:
+                continue
+            entry_id = f"opening-{account.pk}"
+            for account_id, book, signed in (
+                (account.pk, CUSTOMER_BOOK, account.opening_balance),
+                (None, BANK_BOOK, -account.opening_balance),
+            ):
+                lines.append(
+                    LedgerLine(
+                        id=f"{entry_id}-{book}",
+                        entry_id=entry_id,
+                        account_id=account_id,
+                        book=book,
+                        amount=signed,
+                        posted_at=account.created_at,
+                    )
+                )
+        return self.bulk_create(lines, batch_size=1000)
+
+    def update(self, **kwargs):
+        raise ImmutableLedger("Ledger lines can not be changed")
+
+    def delete(self):
+        raise ImmutableLedger("Ledger lines can not be deleted")
+
+    def purge(self):
+        """
+        Delete the selected lines regardless of the ledger being append-only.
+
+        Only for removing benchmark and test data, never for posted entries.
+        """
+        return self._raw_delete(self.db)
+
+    def balance_between(self, account_id, start, end):
+        """
+        Sum of the lines of ``account_id`` posted in ``[start, end]``.
+
+        Runs as a range scan of the (account, posted_at) index. SQLite sums
+        decimals as floats, the total is rounded back to the amount scale.
+        """
+        lines = self.filter(account_id=account_id, posted_at__lte=end)
+        if start is not None:
+            lines = lines.filter(posted_at__gte=start)
+        total = lines.aggregate(total=Sum("amount"))["total"] or 0
+        return Decimal(total).quantize(Decimal("0.001"))
+
+
+class LedgerLine(models.Model):
+    """
+    One immutable line of a double-entry ledger entry.
+
+    Lines are only ever inserted, corrections are new entries.
+    """
+
+    id = models.CharField(primary_key=True, default=uuid_str, max_length=100)
+    entry_id = models.CharField(max_length=100)
+    account = models.ForeignKey(
+        Account,
+        related_name="ledger_lines",
+        on_delete=models.PROTECT,
+        null=True,
+    )
+    book = models.CharField(max_length=2, choices=LEDGER_BOOKS)
+    amount = models.DecimalField(max_digits=20, decimal_places=3)
+    posted_at = models.DateTimeField(default=timezone.now)
+
+    objects = LedgerQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["account", "posted_at"], name="banking_ledger_account"
+            ),
+            models.Index(fields=["posted_at"], name="banking_ledger_posted"),
+        ]
+
+    def __str__(self):
+        return f"{self.entry_id} {self.book} {self.amount}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ImmutableLedger("Ledger lines can not be changed")
+        return super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ImmutableLedger("Ledger lines can not be deleted")
+
+
+class DailyTotalQuerySet(models.QuerySet):
+    """
+    Credit and Debit totals per (account, day, method, type).
+    """
+
+    def record(self, transactions):
+        """
+        Add saved ``Transaction``s to the totals of their key, must run in the
+        transaction that posts them.
+
+        A total is one UPDATE with ``F()`` expressions, the first posting of
+        a key inserts its row first. Keys are updated in order so concurrent
+        batches lock them in the same order.
+        """
+        totals = defaultdict(lambda: [Decimal("0.000"), 0])
+        for txn in transactions:
+            key = (
+                txn.account_id,
+                timezone.localdate(txn.created_at),
+                txn.transaction_method,
+                txn.transaction_type,
+            )
+            totals[key][0] += txn.amount
+            totals[key][1] += 1
+        keys = sorted(totals)
+        missing = [key for key in keys if not self._add(key, *totals[key])]
+        if missing:
+            # Concurrent first postings of a key insert it only once.
+            self.bulk_create(
+                (
+                    DailyTotal(
+                        account_id=account_id,
+                        day=day,
+                        transaction_method=method,
+                        transaction_type=transaction_type,
+                    )
+                    for account_id, day, method, transaction_type in missing
+                ),
+                batch_size=1000,
+                ignore_conflicts=True,
+            )
+            for key in missing:
+                self._add(key, *totals[key])
+
+    def _add(self, key, amount, count):
+        account_id, day, method, transaction_type = key
+        return self.filter(
+            account_id=account_id,
+            day=day,
+            transaction_method=method,
+            transaction_type=transaction_type,
+        ).update(amount=F("amount") + amount, count=F("count") + count)
+
+
+class DailyTotal(models.Model):
+    """
+    Amount and number of the Credits or Debits of an account on a day by one
+    transaction method.
+
+    Kept up to date by the postings themselves, summaries over a range read
+    these rows instead of the transactions.
+    """
+
+    id = models.CharField(primary_key=True, default=uuid_str, max_length=100)
+    account = models.ForeignKey(
+        Account, related_name="daily_totals", on_delete=models.PROTECT
+    )
+    day = models.DateField()
+    transaction_method = models.CharField(max_length=8, choices=TRANSACTION_METHOD)
+    transaction_type = models.CharField(max_length=10, choices=TRANSACTION_TYPE)
+    amount = models.DecimalField(
+        max_digits=20, decimal_places=3, default=Decimal("0.000")
+    )
+    count = models.PositiveIntegerField(default=0)
+
+    objects = DailyTotalQuerySet.as_manager()
+
+    class Meta:
+        unique_together = [
+            ("account", "day", "transaction_method", "transaction_type")
+        ]
+        indexes = [models.Index(fields=["day"], name="banking_daily_total_day")]
+
+    def __str__(self):
+        return (
+            f"{self.account_id} {self.day} {self.transaction_method} "
+            f"{self.transaction_type} {self.amount}"
+        )
+
+
+class BalanceSnapshot(models.Model):
+    """
+    Balance of an account from all ledger lines posted before ``as_of``.
+
+    Written daily for the accounts with lines that day, so the balance at
+    any time is the nearest earlier snapshot plus the few lines after it.
+    """
+
+    id = models.CharField(primary_key=True, default=uuid_str, max_length=100)
+    account = models.ForeignKey(
+        Account, related_name="balance_snapshots", on_delete=models.CASCADE
+    )
+    day = models.DateField()
+    as_of = models.DateTimeField()
+    balance = models.DecimalField(max_digits=20, decimal_places=3)
+
+    class Meta:
+        unique_together = [("account", "day")]
+        indexes = [
+            models.Index(
+                fields=["account", "as_of"], name="banking_snapshot_as_of"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.account_id} {self.day} {self.balance}"
+
+
+def transaction_email(email, transaction_type, account_number, amount):
+    """
+    Outbox payload of the email sent to a customer for a posting.
+    """
+    return {
+        "email": [email],
+        "transaction_type": transaction_type,
+        "account_number": account_number,
+        "amount": str(amount),
+    }
+
+
+class OutboxQuerySet(models.QuerySet):
+    """
+    Transactional outbox.
+    """
+
+    def enqueue(self, account, payload, topic=TRANSACTION_EMAIL):
+        """
+        Write a message in the current transaction.
+
+        The row only becomes visible to the relay when the surrounding
+        transaction commits and disappears with it on rollback, so a posting
+        never talks to the broker and rolled back postings send nothing.
+        """
+        return self.create(account=account, topic=topic, payload=payload)
+
+    def enqueue_many(self, messages, topic=TRANSACTION_EMAIL):
+        """
+        Bulk write ``(account_id, payload)`` messages in the current transaction.
+        """
+        return self.bulk_create(
+            [
+                OutboxMessage(account_id=account_id, topic=topic, payload=payload)
+                for account_id, payload in messages
+            ],
+            batch_size=1000,
+        )
+
+    def ready(self, now=None):
+        """
+        Messages due for delivery, oldest first: pending ones and those whose
+        relay claimed them and did not finish within its claim.
+        """
+        return self.filter(
+            status__in=(PENDING, RUNNING), available_at__lte=now or timezone.now()
+        ).order_by("available_at")
+
+
+class OutboxMessage(BaseModelClass):
+    """
+    Notification written in the same transaction as the posting it is about
+    and delivered afterwards by the outbox relay.
+    """
+
+    id = models.CharField(primary_key=True, default=uuid_str, max_length=100)
+    account = models.ForeignKey(
+        Account,
+        related_name="outbox_messages",
+        on_delete=models.SET_NULL,
+        null=True,
+    )
+    topic = models.CharField(max_length=30, choices=OUTBOX_TOPICS)
+    payload = JSONField(default=dict)
+    status = models.CharField(
+        max_length=2, choices=JOB_STATUS_CHOICES, default=PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    objects = OutboxQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "available_at"], name="banking_outbox_ready"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} - {self.get_status_display()}"
+
+
+class IdempotencyKeyQuerySet(models.QuerySet):
+    """
+    Stored results of idempotent requests.
+    """
+
+    def live(self, now=None):
+        return self.filter(expires_at__gt=now or timezone.now())
+
+    def expired(self, now=None):
+        return self.filter(expires_at__lte=now or timezone.now())
+
+
+class IdempotencyKey(models.Model):
+    """
+    The first response to a request carrying an idempotency key.
+
+    ``key`` is the SHA-256 of the endpoint, user and client key, so lookups
+    are a single primary key probe whatever the client sends. A row without
+    ``status_code`` is a request still in progress.
+    """
+
+    key = models.CharField(primary_key=True, max_length=64)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    objects = IdempotencyKeyQuerySet.as_manager()
+
+    def __str__(self):
+        return self.key
+
+
+class ReconciliationRun(models.Model):
+    """
+    One run of the balance reconciliation.
+
+    An incremental run only checks accounts with transactions created since
+    ``watermark``, the start of the previous finished run less a safety lag.
+    """
+
+    id = models.CharField(primary_key=True, default=uuid_str, max_length=100)
+    incremental = models.BooleanField(default=False)
+    watermark = models.DateTimeField(null=True)
+    started_at = models.DateTimeField(default=timezone.now, db_index=True)
+    finished_at = models.DateTimeField(null=True)
+    accounts = models.PositiveIntegerField(default=0)
+    mismatches = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.started_at} - {self.mismatches} mismatches"
 
 
 # TODO: we are not using benificiary account for the transfer for now but will use it
@@ -227,7 +984,7 @@ class Beneficiary(BaseModelClass):
     """"""
 
     id = models.CharField(primary_key=True, default=uuid_str, max_length=100)
-    account_number = models.IntegerField()
+    account_number = models.BigIntegerField()
     ifsc_code = models.CharField(max_length=11)
     contact_number = models.CharField(max_length=16)
     customer = models.ForeignKey(
@@ -236,3 +993,80 @@ class Beneficiary(BaseModelClass):
 
     def __str__(self):
         return f"{self.name} - {self.customer.user.get_full_name()}"
+
+
+class ExportJob(BaseModelClass):
+    """
+    Asynchronous transaction history export requested by a BankManager.
+
+    ``cache_key`` identifies the exported rows (accounts, start date and the
+    last transaction watermark) so identical requests reuse the same file.
+    """
+
+    id = models.CharField(primary_key=True, default=uuid_str, max_length=100)
+    requested_by = models.ForeignKey(
+        User, related_name="export_jobs", on_delete=models.SET_NULL, null=True
+    )
+    cache_key = models.CharField(max_length=64, db_index=True)
+    acc_ids = JSONField(default=list)
+    start_date = models.DateTimeField()
+    end_date = models.DateTimeField()
+    status = models.CharField(
+        max_length=2, choices=JOB_STATUS_CHOICES, default=PENDING
+    )
+    file_path = models.CharField(max_length=500, blank=True)
+    size = models.BigIntegerField(default=0)
+    rows = models.BigIntegerField(default=0)
+    manifest = JSONField(default=list)
+    error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.id} - {self.get_status_display()}"
+
+
+class TransactionArchive(models.Model):
+    """
+    One month of transactions moved out of the live table into a gzip CSV.
+
+    The file holds one gzip member per account, ``manifest`` maps every
+    account id to the ``[offset, length, rows]`` of its member so a history
+    read only decompresses the accounts it asks for.
+    """
+
+    id = models.CharField(primary_key=True, default=uuid_str, max_length=100)
+    month = models.DateField(unique=True)
+    path = models.CharField(max_length=500)
+    rows = models.BigIntegerField(default=0)
+    size = models.BigIntegerField(default=0)
+    manifest = JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} - {self.rows} rows"
+
+
+class ArchivedTotal(models.Model):
+    """
+    Credits and Debits of an account in an archived month, reconciliation
+    adds them to the transactions still in the live table.
+    """
+
+    id = models.CharField(primary_key=True, default=uuid_str, max_length=100)
+    archive = models.ForeignKey(
+        TransactionArchive, related_name="totals", on_delete=models.CASCADE
+    )
+    account = models.ForeignKey(
+        Account, related_name="archived_totals", on_delete=models.PROTECT
+    )
+    credits = models.DecimalField(
+        max_digits=20, decimal_places=3, default=Decimal("0.000")
+    )
+    debits = models.DecimalField(
+        max_digits=20, decimal_places=3, default=Decimal("0.000")
+    )
+
+    class Meta:
+        unique_together = [("archive", "account")]
+
+    def __str__(self):
+        return f"{self.archive_id} {self.account_id}"
@@ -0,0 +1,150 @@
+"""
+Batched delivery of transaction emails.
+
+Notifications of the postings relayed together are coalesced per recipient,
+several postings to the same customer become one digest email, and the
+resulting messages go out over a single mail connection with
+``send_messages``, ``EMAIL_BATCH_SIZE`` messages per call. Sending is
+throttled per mail backend with the rates in ``EMAIL_RATE_LIMITS``.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+from BankingBackend.constant import CREDIT, DEBIT
+
+SUBJECTS = {CREDIT: "Amount Credited", DEBIT: "Amount Debited"}
+DIGEST_SUBJECT = "Account Activity"
+
+
+def masked(account_number):
+    return f"XXXXXX{str(account_number)[-4:]}"
+
+
+def posting_line(payload):
+    """
+    One line describing the posting of a ``transaction_email`` payload.
+    """
+    transaction_type = payload.get("transaction_type")
+    if transaction_type not in SUBJECTS:
+        raise ValueError(f"Unknown transaction type {transaction_type}")
+    subject = SUBJECTS[transaction_type]
+    return (
+        f"Your account {masked(payload['account_number'])} has been "
+        f"{subject.split()[-1]} with amount {payload['amount']}"
+    )
+
+
+def coalesce(payloads):
+    """
+    Build the email messages of ``payloads``, one per recipient.
+
+    Returns ``(messages, errors)`` where ``errors`` maps the index of every
+    payload that could not be turned into an email to its exception.
+    """
+    lines = OrderedDict()
+    errors = {}
+    for index, payload in enumerate(payloads):
+        try:
+            line = posting_line(payload)
+            recipients = tuple(payload["email"])
+        except (KeyError, TypeError, ValueError) as e:
+            errors[index] = e
+            continue
+        lines.setdefault(recipients, []).append((payload, line))
+
+    now = datetime.now()
+    messages = []
+    for recipients, postings in lines.items():
+        if len(postings) == 1:
+            payload, line = postings[0]
+            subject = SUBJECTS[payload["transaction_type"]]
+            body = f"{line} on {now}"
+        else:
+            subject = DIGEST_SUBJECT
+            body = "\n".join(
+                [f"{len(postings)} transactions on your account up to {now}:"]
+                + [line for _, line in postings]
+            )
+        messages.append(
+            EmailMessage(subject, body, settings.EMAIL_FROM, list(recipients))
+        )
+    return messages, errors
+
+
+class RateLimiter:
+    """
+    Token bucket allowing ``rate`` messages per second in bursts of ``burst``.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, count=1):
+        """
+        Take ``count`` tokens, sleeping until the bucket has refilled enough.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= count
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def backend_path(connection):
+    return f"{type(connection).__module__}.{type(connection).__name__}"
+
+
+def limiter_for(connection):
+    """
+    The shared ``RateLimiter`` of the backend of ``connection``, if limited.
+    """
+    path = backend_path(connection)
+    rate = settings.EMAIL_RATE_LIMITS.get(path)
+    if not rate:
+        return None
+    with _limiters_lock:
+        limiter = _limiters.get(path)
+        if limiter is None or limiter.rate != rate:
+            limiter = _limiters[path] = RateLimiter(rate)
+    return limiter
+
+
+def deliver(payloads, connection=None, batch_size=None):
+    """
+    Send the emails of ``payloads`` over one mail connection.
+
+    Returns ``(sent, errors)``, the number of emails sent and the errors of
+    payloads that could not be sent as in ``coalesce``.
+    """
+    batch_size = batch_size or settings.EMAIL_BATCH_SIZE
+    messages, errors = coalesce(payloads)
+    if not messages:
+        return 0, errors
+    connection = connection or get_connection()
+    limiter = limiter_for(connection)
+    sent = 0
+    with connection:
+        for start in range(0, len(messages), batch_size):
+            chunk = messages[start : start + batch_size]
+            if limiter:
+                limiter.acquire(len(chunk))
+            sent += connection.send_messages(chunk) or 0
+    return sent, errors
@@ -0,0 +1,172 @@
+"""
+Relay for the transactional outbox.
+
+Postings write ``OutboxMessage`` rows in their own database transaction (see
+``OutboxQuerySet.enqueue``). The relay claims committed messages in batches
+and hands them either to Celery, publishing the whole batch as one task, or
+straight to the mail backend. Messages younger than
+``NOTIFICATION_COALESCE_WINDOW`` seconds are held back so a burst of postings
+to one customer is relayed together and sent as one digest email.
+
+A batch is relayed in three steps so no database transaction, and on SQLite
+no write lock, is held while talking to the broker or the mail server: the
+messages are claimed, marked Running for ``OUTBOX_CLAIM_TIMEOUT`` seconds, in
+a short transaction; delivered outside any transaction; and marked sent or
+failed in a second short transaction. A claim that is not finished in time
+is ready again, so delivery is at least once: a relay that dies after
+delivering but before marking the batch sent delivers it again.
+
+Failed messages are retried with exponential backoff until
+``OUTBOX_MAX_ATTEMPTS`` is reached. With Celery delivery a message is sent
+once its batch is published, the ``send_email_batch`` task retries the
+emails that fail up to ``EMAIL_MAX_RETRIES`` times and then fails.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from banking.models import OutboxMessage
+from banking.notifications import deliver
+from BankingBackend.constant import DONE, FAILED, PENDING, RUNNING
+from BankingBackend.tasks.celery import app, send_email_batch
+
+CELERY = "celery"
+MAIL = "mail"
+DELIVERIES = (CELERY, MAIL)
+
+MAX_BACKOFF = 300
+
+
+class BrokerUnavailable(Exception):
+    """
+    Raised when the batch can not be published to the broker.
+    """
+
+
+def publish(messages, broker_url=None):
+    """
+    Publish ``messages`` to Celery as one ``send_email_batch`` task and yield
+    every ``(message, error)``.
+    """
+    try:
+        with app.connection_for_write(broker_url) as connection:
+            # Nobody waits on the result, skipping it keeps the result
+            # backend out of the publish path.
+            send_email_batch.apply_async(
+                args=([message.payload for message in messages],),
+                connection=connection,
+                retry=False,
+                ignore_result=True,
+            )
+    except Exception as e:
+        error = BrokerUnavailable(str(e))
+        for message in messages:
+            yield message, error
+        return
+    for message in messages:
+        yield message, None
+
+
+def send(messages):
+    """
+    Send ``messages`` with the mail backend, coalesced per recipient over one
+    connection, and yield every ``(message, error)``.
+    """
+    try:
+        _, errors = deliver([message.payload for message in messages])
+    except Exception as e:
+        errors = dict.fromkeys(range(len(messages)), e)
+    for index, message in enumerate(messages):
+        yield message, errors.get(index)
+
+
+def claim(batch_size, window):
+    """
+    Mark up to ``batch_size`` ready messages Running and return them.
+
+    On Postgres the batch is claimed with ``SKIP LOCKED`` so several relays
+    can drain the outbox side by side.
+    """
+    with transaction.atomic():
+        now = timezone.now()
+        messages = list(
+            OutboxMessage.objects.ready(now - window)
+            .select_for_update(skip_locked=True)[:batch_size]
+        )
+        claimed = [message.pk for message in messages]
+        OutboxMessage.objects.filter(pk__in=claimed).update(
+            status=RUNNING,
+            available_at=now + timedelta(seconds=settings.OUTBOX_CLAIM_TIMEOUT),
+        )
+    return messages
+
+
+def mark(sent, failed):
+    """
+    Mark the ``sent`` message ids Done and back off the ``failed``
+    ``(message, error)``s, or give up on them after ``OUTBOX_MAX_ATTEMPTS``.
+    """
+    with transaction.atomic():
+        now = timezone.now()
+        OutboxMessage.objects.filter(pk__in=sent).update(status=DONE, sent_at=now)
+        for message, error in failed:
+            attempts = message.attempts + 1
+            given_up = attempts >= settings.OUTBOX_MAX_ATTEMPTS
+            backoff = timedelta(seconds=min(2 ** attempts, MAX_BACKOFF))
+            OutboxMessage.objects.filter(pk=message.pk).update(
+                attempts=attempts,
+                status=FAILED if given_up else PENDING,
+                available_at=now + backoff,
+                error=str(error),
+            )
+
+
+def relay_batch(batch_size=None, delivery=None, broker_url=None):
+    """
+    Deliver one batch of ready messages and return ``(sent, failed)``.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    delivery = delivery or settings.OUTBOX_DELIVERY
+    if delivery not in DELIVERIES:
+        raise ValueError(f"Unknown outbox delivery {delivery}")
+
+    window = timedelta(seconds=settings.NOTIFICATION_COALESCE_WINDOW)
+    messages = claim(batch_size, window)
+    if not messages:
+        return 0, 0
+    if delivery == CELERY:
+        results = publish(messages, broker_url)
+    else:
+        results = send(messages)
+    sent, failed = [], []
+    for message, error in results:
+        if error is None:
+            sent.append(message.pk)
+        else:
+            failed.append((message, error))
+    mark(sent, failed)
+    return len(sent), len(failed)
+
+
+def drain(batch_size=None, delivery=None, broker_url=None):
+    """
+    Relay batches until no ready message is left or a batch fails.
+
+    Returns ``{"sent", "failed", "elapsed"}``.
+    """
+    started = time.perf_counter()
+    total_sent = total_failed = 0
+    while True:
+        sent, failed = relay_batch(batch_size, delivery, broker_url)
+        total_sent += sent
+        total_failed += failed
+        if not sent or failed:
+            break
+    return {
+        "sent": total_sent,
+        "failed": total_failed,
+        "elapsed": round(time.perf_counter() - started, 4),
+    }
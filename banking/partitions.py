@@ -0,0 +1,457 @@
+"""
+Monthly partitions of the transaction table and their archive.
+
+On Postgres ``banking_transaction`` is partitioned by range of
+``created_at``, one partition per calendar month (UTC) and a default
+partition for anything outside them. Every partition has its own small
+indexes, a posting only touches the indexes of the current month and a
+history query only scans the months of its range. ``ensure_partitions`` keeps
+``TRANSACTION_PARTITIONS_AHEAD`` months of empty partitions ready.
+
+SQLite has no partitioning, there a month is the range of ``created_at`` on
+the (account, created_at) index of the one table. Routing works the same on
+both: ``history_rows`` sends the archived months of a range to their archive
+files and the rest to the live table.
+
+``archive_month`` writes a month older than ``TRANSACTION_ARCHIVE_MONTHS`` to
+a gzip CSV under ``TRANSACTION_ARCHIVE_ROOT`` with one gzip member per
+account, then detaches and drops its partition, or deletes its rows on
+SQLite. Per account totals of the month stay in ``ArchivedTotal`` for the
+reconciliation. Rows posted into a month after it was archived, with an
+explicit ``created_at``, land in the default partition or the live table;
+the month is then archivable again and archiving it merges them into a new
+file of the month.
+"""
+import csv
+import gzip
+import hashlib
+import io
+import itertools
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count, Max, Min, TextField
+from django.db.models.functions import Cast
+from django.utils import timezone as django_timezone
+
+from banking.exports import (
+    CHUNK_SIZE,
+    close_member,
+    export_values,
+    open_member,
+    transaction_rows,
+)
+from banking.models import (
+    Account,
+    ArchivedTotal,
+    Transaction,
+    TransactionArchive,
+)
+from BankingBackend.constant import CREDIT
+
+TABLE = Transaction._meta.db_table
+
+# Columns of an archive file, every column of the table.
+ARCHIVE_FIELDS = (
+    "id",
+    "transaction_id",
+    "transaction_type",
+    "amount",
+    "account_id",
+    "transaction_method",
+    "description_text",
+    "reference_number",
+    "created_at",
+    "updated_at",
+    "is_deleted",
+)
+
+
+def month_start(value):
+    """
+    First instant (UTC) of the month of the datetime or date ``value``.
+    """
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(month, months):
+    """
+    Start of the month ``months`` after the month starting at ``month``.
+    """
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def months_between(start, end):
+    """
+    Starts of the months from the month of ``start`` to that of ``end``.
+    """
+    month, last = month_start(start), month_start(end)
+    while month <= last:
+        yield month
+        month = add_months(month, 1)
+
+
+def partition_name(month, table=TABLE):
+    return f"{table}_p{month:%Y%m}"
+
+
+def is_partitioned(using="default", table=TABLE):
+    """
+    Whether ``table`` is a partitioned Postgres table.
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c "
+            "ON c.oid = p.partrelid WHERE c.relname = %s",
+            [table],
+        )
+        return cursor.fetchone() is not None
+
+
+def create_partition(cursor, month, table=TABLE):
+    """
+    Create the partition of ``table`` for the month starting at ``month``.
+    """
+    quote = cursor.db.ops.quote_name
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {quote(partition_name(month, table))} "
+        f"PARTITION OF {quote(table)} FOR VALUES FROM (%s) TO (%s)",
+        [month, add_months(month, 1)],
+    )
+
+
+def ensure_partitions(months_ahead=None, now=None, using="default"):
+    """
+    Create the partitions from the current month to ``months_ahead`` months
+    ahead, ``TRANSACTION_PARTITIONS_AHEAD`` by default. Returns the months
+    checked, none when the table is not partitioned.
+    """
+    if not is_partitioned(using):
+        return []
+    if months_ahead is None:
+        months_ahead = settings.TRANSACTION_PARTITIONS_AHEAD
+    first = month_start(now or django_timezone.now())
+    months = [add_months(first, i) for i in range(months_ahead + 1)]
+    with connections[using].cursor() as cursor:
+        for month in months:
+            create_partition(cursor, month)
+    return months
+
+
+def archive_cutoff(months=None, now=None):
+    """
+    Start of the oldest month that is not archived yet.
+    """
+    if months is None:
+        months = settings.TRANSACTION_ARCHIVE_MONTHS
+    return add_months(month_start(now or django_timezone.now()), -months)
+
+
+def archivable_months(months=None, now=None):
+    """
+    Months with live transactions that are older than the cutoff, archived
+    months with late rows included.
+    """
+    cutoff = archive_cutoff(months, now)
+    oldest = Transaction.objects.filter(created_at__lt=cutoff).aggregate(
+        oldest=Min("created_at")
+    )["oldest"]
+    if oldest is None:
+        return []
+    return [
+        month
+        for month in months_between(oldest, add_months(cutoff, -1))
+        if Transaction.objects.filter(
+            created_at__gte=month, created_at__lt=add_months(month, 1)
+        ).exists()
+    ]
+
+
+def archive_path(month, revised_at=None):
+    """
+    Path of the archive file of the month, a month archived again gets a new
+    file named after ``revised_at`` so the previous one stays valid until the
+    new archive is committed.
+    """
+    name = f"{month:%Y-%m}"
+    if revised_at is not None:
+        name += f".{revised_at:%Y%m%d%H%M%S%f}"
+    return os.path.join(settings.TRANSACTION_ARCHIVE_ROOT, f"{name}.csv.gz")
+
+
+def archive_row(row):
+    return [
+        value.isoformat() if isinstance(value, datetime) else value for value in row
+    ]
+
+
+def merged_rows(archive, live):
+    """
+    Rows of ``archive`` and the ``live`` rows of its month in account and
+    ``created_at`` order. Late rows are few, they are read into memory and
+    merged into the archived rows one account at a time.
+    """
+    late = defaultdict(list)
+    for row in live:
+        late[row[4]].append(archive_row(row))
+    with open(archive.path, "rb") as raw:
+        for account_id in sorted(set(archive.manifest) | set(late)):
+            rows = list(late.get(account_id, ()))
+            member = archive.manifest.get(account_id)
+            if member is not None:
+                rows += read_member(raw, member)
+            yield from sorted(rows, key=lambda row: datetime.fromisoformat(row[8]))
+
+
+def write_archive(month, path, previous=None):
+    """
+    Write the transactions of the month to ``path``, one gzip member per
+    account, merged with the rows of the ``previous`` archive of the month.
+    Returns ``(rows, manifest, totals)``.
+    """
+    end = add_months(month, 1)
+    rows = (
+        Transaction.objects.filter(created_at__gte=month, created_at__lt=end)
+        .order_by("account_id", "created_at")
+        .annotate(description_text=Cast("description", TextField()))
+        .values_list(*ARCHIVE_FIELDS)
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    if previous is not None:
+        rows = merged_rows(previous, rows)
+    manifest = {}
+    totals = defaultdict(lambda: [Decimal("0.000"), Decimal("0.000")])
+    count = 0
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = path + ".part"
+    with open(partial, "wb") as raw:
+        text, current = None, None
+        for row in rows:
+            account_id = row[4]
+            if account_id != current:
+                if text is not None:
+                    close_member(text)
+                    manifest[current][1] = raw.tell() - manifest[current][0]
+                manifest[account_id] = [raw.tell(), 0, 0]
+                text = open_member(raw)
+                writer = csv.writer(text)
+                current = account_id
+            writer.writerow(archive_row(row))
+            manifest[account_id][2] += 1
+            totals[account_id][0 if row[2] == CREDIT else 1] += Decimal(row[3])
+            count += 1
+        if text is not None:
+            close_member(text)
+            manifest[current][1] = raw.tell() - manifest[current][0]
+    os.replace(partial, path)
+    return count, manifest, totals
+
+
+def drop_month(month, using="default"):
+    """
+    Remove the live rows of the month: detach and drop its partition, or
+    delete them where the table is not partitioned.
+    """
+    end = add_months(month, 1)
+    connection = connections[using]
+    if is_partitioned(using):
+        quote = connection.ops.quote_name
+        name = partition_name(month)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass(%s)", [name])
+            if cursor.fetchone()[0] is not None:
+                cursor.execute(
+                    f"ALTER TABLE {quote(TABLE)} DETACH PARTITION {quote(name)}"
+                )
+                cursor.execute(f"DROP TABLE {quote(name)}")
+                return
+    Transaction.objects.filter(created_at__gte=month, created_at__lt=end).delete()
+
+
+def archive_month(month):
+    """
+    Archive the transactions of the month starting at ``month`` and remove
+    them from the live table. Returns the ``TransactionArchive``.
+
+    A month that is already archived is written again with its late rows,
+    its archive row and totals are replaced and the previous file removed.
+    """
+    month = month_start(month)
+    previous = TransactionArchive.objects.filter(month=month.date()).first()
+    now = django_timezone.now()
+    path = archive_path(month, None if previous is None else now)
+    count, manifest, totals = write_archive(month, path, previous)
+    archive = TransactionArchive(month=month.date()) if previous is None else previous
+    replaced = None if previous is None else previous.path
+    with transaction.atomic():
+        archive.path = path
+        archive.rows = count
+        archive.size = os.path.getsize(path)
+        archive.manifest = manifest
+        archive.created_at = now
+        archive.save()
+        ArchivedTotal.objects.filter(archive=archive).delete()
+        ArchivedTotal.objects.bulk_create(
+            (
+                ArchivedTotal(
+                    archive=archive, account_id=account_id, credits=c, debits=d
+                )
+                for account_id, (c, d) in totals.items()
+            ),
+            batch_size=1000,
+        )
+        drop_month(month)
+    if replaced is not None:
+        os.remove(replaced)
+    return archive
+
+
+def read_member(raw, member):
+    """
+    Rows of the ``[offset, length, rows]`` member of the open archive ``raw``.
+    """
+    offset, length, _ = member
+    raw.seek(offset)
+    text = io.TextIOWrapper(
+        gzip.GzipFile(fileobj=io.BytesIO(raw.read(length))),
+        encoding="utf-8",
+        newline="",
+    )
+    return csv.reader(text)
+
+
+def read_archive(archive, account_ids):
+    """
+    Archived rows of ``account_ids`` as tuples of ``ARCHIVE_FIELDS``.
+    """
+    with open(archive.path, "rb") as raw:
+        for account_id in account_ids:
+            member = archive.manifest.get(account_id)
+            if member is not None:
+                yield from read_member(raw, member)
+
+
+def archived_rows(archives, accounts, start_date, end_date, created_at=False):
+    """
+    Export rows (see ``banking.exports.EXPORT_FIELDS``) of the transactions
+    of ``accounts``, ``{account_id: account_number}``, in ``archives`` created
+    in the range, followed by their ``created_at`` with ``created_at``.
+    """
+    start, end = aware(start_date), aware(end_date)
+    for archive in archives:
+        for row in read_archive(archive, accounts):
+            created = datetime.fromisoformat(row[8])
+            if start <= created <= end:
+                values = (
+                    row[1],
+                    row[2],
+                    Decimal(row[3]),
+                    accounts[row[4]],
+                    row[5],
+                    row[6],
+                    row[7] or None,
+                )
+                yield values + (created,) if created_at else values
+
+
+def aware(value):
+    if django_timezone.is_naive(value):
+        return django_timezone.make_aware(value)
+    return value
+
+
+def history_sources(account_numbers, start_date, end_date):
+    """
+    ``(accounts, archives, live)`` of a history range: the accounts as
+    ``{account_id: account_number}``, the archives of its months and the
+    queryset of its rows in the live table.
+    """
+    accounts = dict(
+        Account.objects.filter(account_number__in=account_numbers).values_list(
+            "id", "account_number"
+        )
+    )
+    archives = list(
+        TransactionArchive.objects.filter(
+            month__gte=month_start(aware(start_date)).date(),
+            month__lte=month_start(aware(end_date)).date(),
+        ).order_by("month")
+    )
+    live = Transaction.objects.filter(
+        account_id__in=list(accounts),
+        created_at__gte=start_date,
+        created_at__lte=end_date,
+    )
+    return accounts, archives, live
+
+
+def history_rows(account_numbers, start_date, end_date, created_at=False):
+    """
+    Export rows of the transactions of ``account_numbers`` created in the
+    range, from the archives of archived months and then the live table.
+
+    With ``created_at`` every row is followed by its ``created_at`` and the
+    rows of every (account, month) come together, as the files of export jobs
+    are partitioned. Accounts and archives are looked up here, iterating the
+    rows only runs the query of the live table.
+    """
+    accounts, archives, live = history_sources(account_numbers, start_date, end_date)
+    if created_at:
+        live = export_values(
+            live.order_by("account_id", "created_at"), "created_at"
+        ).iterator(chunk_size=CHUNK_SIZE)
+    else:
+        live = transaction_rows(live)
+    return itertools.chain(
+        archived_rows(archives, accounts, start_date, end_date, created_at), live
+    )
+
+
+def export_cache_key(account_numbers, start_date, end_date):
+    """
+    Key identifying the rows an export of the range would contain.
+
+    The key uses the newest ``created_at`` and the row count of the live
+    table in the range instead of the end date, and the version of every
+    archive of its months: two ranges with the same start, newest row, count
+    and archives hold the same rows, and any new posting in the range or
+    archive of one of its months changes it.
+    """
+    _, archives, live = history_sources(account_numbers, start_date, end_date)
+    watermark = live.aggregate(last=Max("created_at"), rows=Count("id"))
+    key = json.dumps(
+        [
+            sorted(account_numbers),
+            start_date.isoformat(),
+            watermark["last"].isoformat() if watermark["last"] else None,
+            watermark["rows"],
+            [[archive.pk, archive.created_at.isoformat()] for archive in archives],
+        ]
+    )
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def archived_totals(account_ids):
+    """
+    ``{account_id: (credits, debits)}`` of the archived months.
+    """
+    totals = {}
+    rows = ArchivedTotal.objects.filter(account_id__in=account_ids).values_list(
+        "account_id", "credits", "debits"
+    )
+    for account_id, credits, debits in rows:
+        c, d = totals.get(account_id, (0, 0))
+        totals[account_id] = (c + credits, d + debits)
+    return totals
+
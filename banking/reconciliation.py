@@ -0,0 +1,199 @@
+"""
+Reconciliation of ``Account.balance`` with the transaction history, the
+shards of a sharded account count towards its balance.
+
+The expected balance of an account is its opening balance plus its Credits
+less its Debits, archived months included, read for a chunk of accounts at a
+time with one grouped aggregate query. Chunks are ranges of account ids, so
+memory stays bounded by the chunk size however many accounts and transactions
+there are, and ranges can be checked in parallel by a process pool.
+"""
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+import django
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from banking.models import Account, BalanceShard, ReconciliationRun, Transaction
+from banking.partitions import archived_totals
+from BankingBackend.constant import CREDIT, DEBIT
+
+Mismatch = namedtuple("Mismatch", "account_id account_number balance expected")
+ChunkResult = namedtuple("ChunkResult", "first last accounts mismatches seconds")
+
+
+def expected_balances(accounts):
+    """
+    ``(id, account_number, balance, expected)`` of every account in the
+    queryset from one grouped aggregate over their transactions.
+    """
+    rows = list(
+        accounts.order_by()
+        .annotate(
+            credits=Sum(
+                "account_transaction__amount",
+                filter=Q(account_transaction__transaction_type=CREDIT),
+            ),
+            debits=Sum(
+                "account_transaction__amount",
+                filter=Q(account_transaction__transaction_type=DEBIT),
+            ),
+        )
+        .values_list(
+            "id",
+            "account_number",
+            "balance",
+            "balance_shards",
+            "opening_balance",
+            "credits",
+            "debits",
+        )
+    )
+    shards = BalanceShard.objects.totals([row[0] for row in rows if row[3]])
+    archived = archived_totals([row[0] for row in rows])
+    for account_id, number, balance, _, opening, credits, debits in rows:
+        balance += shards.get(account_id, 0)
+        archived_credits, archived_debits = archived.get(account_id, (0, 0))
+        credits = Decimal(credits or 0) + archived_credits
+        debits = Decimal(debits or 0) + archived_debits
+        # SQLite sums decimals as floats, round back to the amount scale.
+        expected = opening + credits - debits
+        yield account_id, number, balance, expected.quantize(Decimal("0.001"))
+
+
+def reconcile_chunk(first=None, last=None, account_ids=None):
+    """
+    Check the accounts with ids in ``[first, last)``, or ``account_ids``.
+    """
+    started = time.perf_counter()
+    accounts = Account.objects.all()
+    if first is not None:
+        accounts = accounts.filter(id__gte=first)
+    if last is not None:
+        accounts = accounts.filter(id__lt=last)
+    if account_ids is not None:
+        accounts = accounts.filter(id__in=account_ids)
+    checked = 0
+    mismatches = []
+    for account_id, number, balance, expected in expected_balances(accounts):
+        checked += 1
+        if balance != expected:
+            mismatches.append(Mismatch(account_id, number, balance, expected))
+    return ChunkResult(
+        first, last, checked, mismatches, time.perf_counter() - started
+    )
+
+
+def id_ranges(chunk_size):
+    """
+    ``(first, last)`` account id ranges of ``chunk_size`` accounts each.
+
+    Only the ids are streamed from the primary key index, the open ended
+    first and last ranges also cover accounts created meanwhile.
+    """
+    ids = Account.objects.order_by("id").values_list("id", flat=True)
+    first = None
+    for position, account_id in enumerate(ids.iterator(chunk_size=chunk_size)):
+        if position and position % chunk_size == 0:
+            yield first, account_id
+            first = account_id
+    yield first, None
+
+
+def touched_since(watermark):
+    """
+    Sorted ids of the accounts opened or posted to since ``watermark``.
+    """
+    posted = (
+        Transaction.objects.filter(created_at__gte=watermark)
+        .order_by()
+        .values_list("account_id", flat=True)
+        .distinct()
+    )
+    opened = Account.objects.filter(created_at__gte=watermark).values_list(
+        "id", flat=True
+    )
+    return sorted({account_id for account_id in posted if account_id} | set(opened))
+
+
+def incremental_watermark(lag=None):
+    """
+    Where an incremental run starts, ``None`` before the first finished run.
+    """
+    if lag is None:
+        lag = settings.RECONCILE_WATERMARK_LAG
+    previous = (
+        ReconciliationRun.objects.filter(finished_at__isnull=False)
+        .order_by("-started_at")
+        .first()
+    )
+    return previous.started_at - timedelta(seconds=lag) if previous else None
+
+
+def chunks(watermark, chunk_size):
+    """
+    The ``reconcile_chunk`` arguments of a run from ``watermark``, of every
+    account when it is ``None``.
+    """
+    if watermark is None:
+        for first, last in id_ranges(chunk_size):
+            yield first, last, None
+        return
+    ids = touched_since(watermark)
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start : start + chunk_size]
+        yield chunk[0], None, chunk
+
+
+def setup_worker():
+    django.setup()
+
+
+def _reconcile_chunk(args):
+    return reconcile_chunk(*args)
+
+
+def reconcile(incremental=False, chunk_size=None, workers=1, on_chunk=None):
+    """
+    Reconcile every account, or with ``incremental`` only the accounts
+    touched since the previous run, and record the run.
+
+    ``workers`` above one checks chunks in that many processes.
+    ``on_chunk(result)`` is called with every ``ChunkResult`` as it finishes.
+    Returns the finished ``ReconciliationRun`` and the list of mismatches.
+    """
+    chunk_size = chunk_size or settings.RECONCILE_CHUNK_SIZE
+    watermark = incremental_watermark() if incremental else None
+    run = ReconciliationRun.objects.create(
+        incremental=watermark is not None, watermark=watermark
+    )
+    work = chunks(watermark, chunk_size)
+    if workers > 1:
+        # Forked workers must not share the connection of this process.
+        connections.close_all()
+        pool = ProcessPoolExecutor(workers, initializer=setup_worker)
+        results = pool.map(_reconcile_chunk, work)
+    else:
+        pool = None
+        results = (reconcile_chunk(*args) for args in work)
+
+    mismatches = []
+    try:
+        for result in results:
+            run.accounts += result.accounts
+            mismatches.extend(result.mismatches)
+            if on_chunk is not None:
+                on_chunk(result)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    run.mismatches = len(mismatches)
+    run.finished_at = timezone.now()
+    run.save(update_fields=["accounts", "mismatches", "finished_at"])
+    return run, mismatches
@@ -0,0 +1,257 @@
+"""
+Vectorized branch reports for bank managers.
+
+``report_rows`` reads five columns of the transactions of a branch and date
+range with ``values_list``: account number, type, method, the amount scaled
+to an integer number of thousandths in SQL, and the local day.
+
+``build_report`` takes the rows ``CHUNK_SIZE`` at a time and transposes every
+chunk into NumPy int64 columns: account number, day ordinal and method code,
+each doubled plus a Debit flag, and the amount. A sort and ``reduceat`` of
+every key column give the per chunk totals, which are kept as arrays and
+reduced the same way once all chunks are read; the amount histogram is a
+``searchsorted`` and ``bincount`` per chunk. Python only runs per row to
+transpose the chunk, memory depends on the chunk size and the number of
+accounts and days of the branch, not on the number of rows. Amounts stay
+integers, totals are exact while they fit an int64 of thousandths.
+
+Without NumPy the report is computed by ``loop_report``, one row at a time.
+Emulating the column operations with ``array`` buffers in pure Python was
+three times slower than the plain loop, so there is no such fallback.
+
+Reports cover the live table, months already archived are left out.
+``branch_report`` caches a finished report per (branch, range, top) for
+``BRANCH_REPORT_CACHE_TIMEOUT`` seconds.
+"""
+from bisect import bisect_right
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import BigIntegerField, F
+from django.db.models.functions import Cast, Round, TruncDate
+
+from banking.models import Transaction
+from banking.summaries import day_start
+from BankingBackend.constant import DEBIT, TRANSACTION_METHOD
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+CHUNK_SIZE = 100000
+
+# Amounts are reported in thousandths, the scale of the amount column.
+SCALE = 1000
+
+# Lower edges of the amount histogram bins, the last bin has no upper edge.
+HISTOGRAM_EDGES = (0, 100, 500, 1000, 5000, 10000, 50000, 100000, 500000)
+SCALED_EDGES = tuple(edge * SCALE for edge in HISTOGRAM_EDGES)
+
+METHODS = [method for method, _ in TRANSACTION_METHOD]
+METHOD_CODES = {method: code for code, method in enumerate(METHODS)}
+
+REPORT_FIELDS = (
+    "account__account_number",
+    "transaction_type",
+    "transaction_method",
+    "scaled_amount",
+    "day",
+)
+
+# Report groups and the code of a row in each.
+GROUPS = ("days", "methods", "accounts")
+
+
+def report_rows(ifsc_code, start_date, end_date, chunk_size=CHUNK_SIZE):
+    """
+    ``REPORT_FIELDS`` of the transactions of the branch created on the days
+    ``[start_date, end_date]``.
+    """
+    return (
+        Transaction.objects.filter(
+            account__customer__branch__ifsc_code=ifsc_code,
+            created_at__gte=day_start(start_date),
+            created_at__lt=day_start(end_date + timedelta(days=1)),
+        )
+        .annotate(
+            day=TruncDate("created_at"),
+            scaled_amount=Cast(Round(F("amount") * SCALE), BigIntegerField()),
+        )
+        .order_by()
+        .values_list(*REPORT_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def to_amount(scaled):
+    return str(Decimal(scaled).scaleb(-3))
+
+
+def column(values):
+    return numpy.array(values, dtype=numpy.int64)
+
+
+def group_sums(keys, *values):
+    """
+    Distinct ``keys`` and the sum of every array of ``values`` per key.
+    """
+    order = numpy.argsort(keys)
+    keys = keys[order]
+    starts = numpy.flatnonzero(numpy.r_[True, keys[1:] != keys[:-1]])
+    return (keys[starts],) + tuple(
+        numpy.add.reduceat(value[order], starts) for value in values
+    )
+
+
+def reduce_chunk(chunk, partials):
+    """
+    Append the per key totals of a list of ``REPORT_FIELDS`` rows to
+    ``partials`` and add its amounts to the histogram.
+    """
+    debits = column([row[1] == DEBIT for row in chunk])
+    amounts = column([row[3] for row in chunk])
+    ones = numpy.ones(len(chunk), dtype=numpy.int64)
+    for name, codes in zip(
+        GROUPS,
+        (
+            [row[4].toordinal() for row in chunk],
+            [METHOD_CODES[row[2]] for row in chunk],
+            [row[0] for row in chunk],
+        ),
+    ):
+        keys = column(codes) * 2 + debits
+        partials[name].append(group_sums(keys, amounts, ones))
+    bins = numpy.searchsorted(SCALED_EDGES, amounts, side="right") - 1
+    partials["histogram"] += numpy.bincount(bins, minlength=len(SCALED_EDGES))
+
+
+def merge_totals(chunks):
+    """
+    ``{code: [credits, debits, credit count, debit count]}`` of the per chunk
+    totals of a group.
+    """
+    merged = {}
+    if not chunks:
+        return merged
+    keys, amounts, counts = (numpy.concatenate(part) for part in zip(*chunks))
+    keys, amounts, counts = group_sums(keys, amounts, counts)
+    for key, amount, count in zip(keys.tolist(), amounts.tolist(), counts.tolist()):
+        entry = merged.setdefault(key >> 1, [0, 0, 0, 0])
+        entry[key & 1] = amount
+        entry[2 + (key & 1)] = count
+    return merged
+
+
+def build_report(rows, top=10, chunk_size=CHUNK_SIZE):
+    """
+    Report of ``REPORT_FIELDS`` rows, reduced ``chunk_size`` rows at a time.
+    """
+    if numpy is None:
+        return loop_report(rows, top)
+    rows = iter(rows)
+    partials = {name: [] for name in GROUPS}
+    partials["histogram"] = numpy.zeros(len(SCALED_EDGES), dtype=numpy.int64)
+    for chunk in iter(lambda: list(islice(rows, chunk_size)), []):
+        reduce_chunk(chunk, partials)
+    return finish(
+        {name: merge_totals(partials[name]) for name in GROUPS},
+        partials["histogram"].tolist(),
+        top,
+    )
+
+
+def loop_report(rows, top=10):
+    """
+    The report of ``build_report`` computed one row at a time, the fallback
+    without NumPy and the baseline of the benchmark.
+    """
+    groups = {name: {} for name in GROUPS}
+    histogram = [0] * len(SCALED_EDGES)
+    for account, transaction_type, method, amount, day in rows:
+        is_debit = int(transaction_type == DEBIT)
+        for name, code in (
+            ("days", day.toordinal()),
+            ("methods", METHOD_CODES[method]),
+            ("accounts", account),
+        ):
+            entry = groups[name].get(code)
+            if entry is None:
+                entry = groups[name][code] = [0, 0, 0, 0]
+            entry[is_debit] += amount
+            entry[2 + is_debit] += 1
+        histogram[bisect_right(SCALED_EDGES, amount) - 1] += 1
+    return finish(groups, histogram, top)
+
+
+def day_label(code):
+    return date.fromordinal(code).isoformat()
+
+
+def group_rows(name, totals, label):
+    return [
+        {
+            name: label(code),
+            "credits": to_amount(credits),
+            "debits": to_amount(debits),
+            "credit_count": credit_count,
+            "debit_count": debit_count,
+        }
+        for code, (credits, debits, credit_count, debit_count) in totals
+    ]
+
+
+def finish(groups, histogram, top):
+    """
+    Report of the merged group totals with the ``top`` accounts by flow,
+    Credits plus Debits.
+    """
+    accounts = sorted(
+        groups["accounts"].items(),
+        key=lambda item: (-(item[1][0] + item[1][1]), item[0]),
+    )[:top]
+    edges = SCALED_EDGES + (None,)
+    return {
+        "transactions": sum(histogram),
+        "daily": group_rows("day", sorted(groups["days"].items()), day_label),
+        "methods": group_rows(
+            "method", sorted(groups["methods"].items()), METHODS.__getitem__
+        ),
+        "top_accounts": [
+            dict(
+                row,
+                flow=to_amount(credits + debits),
+                net=to_amount(credits - debits),
+            )
+            for row, (_, (credits, debits, _, _)) in zip(
+                group_rows("account_number", accounts, int), accounts
+            )
+        ],
+        "histogram": [
+            {
+                "from": to_amount(low),
+                "to": None if high is None else to_amount(high),
+                "count": count,
+            }
+            for low, high, count in zip(edges, edges[1:], histogram)
+        ],
+    }
+
+
+def report_cache_key(ifsc_code, start_date, end_date, top):
+    return f"report:branch:{ifsc_code}:{start_date}:{end_date}:{top}"
+
+
+def branch_report(ifsc_code, start_date, end_date, top=10):
+    """
+    Report of the branch over the days ``[start_date, end_date]``, cached.
+    """
+    key = report_cache_key(ifsc_code, start_date, end_date, top)
+    report = cache.get(key)
+    if report is None:
+        report = build_report(report_rows(ifsc_code, start_date, end_date), top)
+        cache.set(key, report, settings.BRANCH_REPORT_CACHE_TIMEOUT)
+    return report
@@ -0,0 +1,401 @@
+"""
+Bulk generation of sample data for performance testing.
+
+Rows are written with ``bulk_create`` in batches and never go through
+``Model.save``, so seeding sends no email, writes no outbox message and the
+password of every seeded user is hashed once. Transactions per account follow
+a Pareto distribution, a few hot accounts carry most of the volume, and their
+timestamps lean towards recent days.
+
+Seeded data still reconciles: every balance is the opening balance plus the
+Credits less the Debits of the account, a Debit that would overdraw is posted
+as a Credit, and the ledger lines of every posting are written alongside.
+
+Accounts are split between workers and every worker draws from its own
+``(seed, worker)`` random generator, so a seed and worker count always give
+the same customers, amounts and dates whatever order the workers run in.
+"""
+import random
+import string
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+import django
+from django.db import connection, transaction
+from faker import Faker
+
+from accounts.models import User
+from banking.ids import SnowflakeAllocator
+from banking.models import (
+    Account,
+    Branch,
+    Customer,
+    LedgerLine,
+    Transaction,
+    uuid_str,
+)
+from BankingBackend.constant import (
+    ACTIVE,
+    ATM,
+    BANK_BOOK,
+    BANK_MANAGER,
+    BLOCKED,
+    CASH,
+    CREDIT,
+    CURRENT,
+    CUSTOMER,
+    CUSTOMER_BOOK,
+    DEBIT,
+    EMPLOYEE,
+    HOLD,
+    IMPS,
+    INACTIVE,
+    NEFT,
+    POS,
+    RTGS,
+    SALARY,
+    SAVING,
+    UPI,
+    WITHDRAW,
+)
+
+SEED_BATCH_SIZE = 5000
+SEED_PASSWORD = "admin"
+ACCOUNTS_PER_BRANCH = 2000
+CREDIT_SHARE = 0.55
+
+TRANSACTION_COLUMNS = (
+    "id",
+    "transaction_id",
+    "transaction_type",
+    "amount",
+    "account",
+    "transaction_method",
+    "description",
+    "reference_number",
+    "created_at",
+    "updated_at",
+    "is_deleted",
+)
+LEDGER_COLUMNS = ("id", "entry_id", "account", "book", "amount", "posted_at")
+
+METHOD_WEIGHTS = (
+    (UPI, 40),
+    (POS, 15),
+    (IMPS, 12),
+    (ATM, 12),
+    (NEFT, 10),
+    (CASH, 5),
+    (WITHDRAW, 4),
+    (RTGS, 2),
+)
+ACCOUNT_TYPE_WEIGHTS = ((SAVING, 70), (SALARY, 15), (CURRENT, 15))
+STATUS_WEIGHTS = ((ACTIVE, 94), (INACTIVE, 3), (HOLD, 2), (BLOCKED, 1))
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """
+    Let ``bulk_create`` keep the ``created_at``/``updated_at`` of the rows
+    instead of stamping them with the current time.
+    """
+    fields = [
+        field
+        for model in models
+        for field in model._meta.concrete_fields
+        if getattr(field, "auto_now_add", False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def split(total, parts):
+    """
+    ``total`` split into ``parts`` near equal shares.
+    """
+    return [total // parts + (part < total % parts) for part in range(parts)]
+
+
+def transaction_counts(rng, accounts, transactions, skew):
+    """
+    Transactions of every account, Pareto distributed with shape ``skew``
+    and summing to ``transactions``.
+    """
+    weights = [rng.paretovariate(skew) for _ in range(accounts)]
+    scale = transactions / sum(weights) if weights else 0
+    counts = [int(weight * scale) for weight in weights]
+    # Hand the rounding remainder to the first accounts.
+    for i in range(transactions - sum(counts)):
+        counts[i % accounts] += 1
+    return counts
+
+
+def weighted(rng, weights):
+    """
+    A function drawing from the ``(choice, weight)`` pairs.
+    """
+    choices, cum_weights = zip(*weights)
+    cum_weights = list(accumulate(cum_weights))
+    return lambda: rng.choices(choices, cum_weights=cum_weights)[0]
+
+
+def amount(rng, mu=4.0, sigma=1.2):
+    """
+    Log-normal amount, mostly tens to hundreds with a long tail.
+    """
+    return Decimal(f"{min(rng.lognormvariate(mu, sigma), 10 ** 6):.3f}")
+
+
+def create_branches(count, now, password):
+    """
+    Create ``count`` branches, each with a manager and an employee login.
+
+    Returns the branch ids.
+    """
+    offset = Branch.objects.count()
+    branches, staff = [], []
+    for number in range(offset, offset + count):
+        branches.append(
+            Branch(
+                name=f"Branch {number}",
+                city=f"City {number % 97}",
+                ifsc_code=f"SEED{number:07d}",
+                micr_code=f"{number:09d}",
+                state=f"State {number % 29}",
+                address=f"{number} Main Road",
+                created_at=now,
+                updated_at=now,
+            )
+        )
+        for user_type, role in ((BANK_MANAGER, "manager"), (EMPLOYEE, "employee")):
+            staff.append(
+                User(
+                    username=f"{role}{number}",
+                    email=f"{role}{number}@example.com",
+                    password=password,
+                    user_type=user_type,
+                    first_name=role.title(),
+                    last_name=str(number),
+                )
+            )
+    with transaction.atomic(), explicit_timestamps(Branch):
+        Branch.objects.bulk_create(branches)
+        User.objects.bulk_create(staff)
+    return [branch.pk for branch in branches]
+
+
+def insert_rows(model, columns, rows):
+    """
+    Insert ``rows``, tuples of the ``columns`` fields of ``model`` with values
+    ready for the database, with one executemany.
+
+    Skips building a model instance and preparing every field value, which
+    is most of the cost of ``bulk_create`` for millions of rows.
+    """
+    if not rows:
+        return
+    quote = connection.ops.quote_name
+    names = ", ".join(quote(model._meta.get_field(name).column) for name in columns)
+    placeholders = ", ".join(["%s"] * len(columns))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {quote(model._meta.db_table)} ({names}) "
+            f"VALUES ({placeholders})",
+            rows,
+        )
+
+
+def user_ids(usernames, chunk_size=900):
+    """
+    Primary keys of freshly bulk created users, for backends that do not
+    return them from the insert.
+    """
+    ids = {}
+    for start in range(0, len(usernames), chunk_size):
+        ids.update(
+            User.objects.filter(
+                username__in=usernames[start : start + chunk_size]
+            ).values_list("username", "pk")
+        )
+    return ids
+
+
+def tune_connection():
+    """
+    Trade durability of this connection for insert speed on SQLite: a seed
+    interrupted by a crash is rerun anyway. Also wait for the write lock
+    held by other workers instead of failing.
+    """
+    if connection.vendor != "sqlite" or connection.in_atomic_block:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA synchronous = OFF")
+        cursor.execute("PRAGMA cache_size = -262144")
+        cursor.execute("PRAGMA busy_timeout = 600000")
+
+
+def seed_worker(job):
+    """
+    Seed the accounts of one worker, ``job`` is a dict of the worker number
+    and the ``seed`` options. Returns the number of rows written per table.
+    """
+    tune_connection()
+    rng = random.Random(f"{job['seed']}:{job['worker']}")
+    fake = Faker()
+    fake.seed_instance(rng.getrandbits(32))
+    first_names = [fake.first_name() for _ in range(500)]
+    last_names = [fake.last_name() for _ in range(500)]
+    jobs = [fake.job()[:200] for _ in range(200)]
+    cities = [fake.city() for _ in range(200)]
+    method = weighted(rng, METHOD_WEIGHTS)
+    account_type = weighted(rng, ACCOUNT_TYPE_WEIGHTS)
+    account_status = weighted(rng, STATUS_WEIGHTS)
+    allocator = SnowflakeAllocator(worker_id=job["worker"])
+
+    now = job["now"]
+    span = job["days"] * 24 * 60 * 60
+    batch_size = job["batch_size"]
+    counts = transaction_counts(rng, job["accounts"], job["transactions"], job["skew"])
+    adapt_datetime = connection.ops.adapt_datetimefield_value
+    written = {"users": 0, "accounts": 0, "transactions": 0, "ledger_lines": 0}
+    pending = []
+
+    lines = []
+
+    def flush():
+        with transaction.atomic():
+            insert_rows(Transaction, TRANSACTION_COLUMNS, pending)
+            insert_rows(LedgerLine, LEDGER_COLUMNS, lines)
+        written["transactions"] += len(pending)
+        written["ledger_lines"] += len(lines)
+        pending.clear()
+        lines.clear()
+
+    for block in range(0, job["accounts"], batch_size):
+        block_counts = counts[block : block + batch_size]
+        users, customers, accounts = [], [], []
+        for offset, count in enumerate(block_counts):
+            customer_id = job["customer_start"] + block + offset
+            first_name = rng.choice(first_names)
+            last_name = rng.choice(last_names)
+            users.append(
+                User(
+                    username=f"customer{customer_id}",
+                    email=f"customer{customer_id}@example.com",
+                    password=job["password"],
+                    user_type=CUSTOMER,
+                    first_name=first_name,
+                    last_name=last_name,
+                    contact_number=f"9{rng.randrange(10 ** 9):09d}",
+                )
+            )
+            opened_at = now - timedelta(seconds=span * rng.random() ** 0.5)
+            customers.append(
+                Customer(
+                    customer_id=customer_id,
+                    date_of_birth=(now - timedelta(days=rng.randint(18, 85) * 365)).date(),
+                    pan_card_number="".join(rng.choices(string.ascii_uppercase, k=5))
+                    + f"{rng.randrange(10 ** 4):04d}"
+                    + rng.choice(string.ascii_uppercase),
+                    aadhar_card_number=rng.randrange(10 ** 9, 2 ** 31 - 1),
+                    occupation=rng.choice(jobs),
+                    branch_id=rng.choice(job["branch_ids"]),
+                    address=f"{rng.randint(1, 999)} {rng.choice(cities)}",
+                    created_at=opened_at,
+                    updated_at=opened_at,
+                )
+            )
+            opening = amount(rng, mu=7.0) if rng.random() < 0.8 else Decimal("0.000")
+            accounts.append(
+                Account(
+                    account_number=allocator.next_id(),
+                    balance=opening,
+                    opening_balance=opening,
+                    account_type=account_type(),
+                    status=account_status(),
+                    created_at=opened_at,
+                    updated_at=opened_at,
+                )
+            )
+
+        with transaction.atomic(), explicit_timestamps(Customer, Account):
+            User.objects.bulk_create(users, batch_size=batch_size)
+            ids = user_ids([user.username for user in users])
+            for user, customer, account in zip(users, customers, accounts):
+                customer.user_id = user.pk or ids[user.username]
+                account.customer_id = customer.pk
+            Customer.objects.bulk_create(customers, batch_size=batch_size)
+            Account.objects.bulk_create(accounts, batch_size=batch_size)
+            if job["ledger"]:
+                written["ledger_lines"] += len(LedgerLine.objects.open(accounts))
+        written["users"] += len(users)
+        written["accounts"] += len(accounts)
+
+        deltas = {}
+        for account, count in zip(accounts, block_counts):
+            # Posting times lean towards now.
+            opened_for = (now - account.created_at).total_seconds()
+            history = sorted(
+                now - timedelta(seconds=opened_for * rng.random() ** 2)
+                for _ in range(count)
+            )
+            balance = account.opening_balance
+            for posted_at in history:
+                value = amount(rng)
+                if rng.random() < CREDIT_SHARE or value > balance:
+                    transaction_type = CREDIT
+                    balance += value
+                else:
+                    transaction_type = DEBIT
+                    balance -= value
+                transaction_id = f"txn{allocator.next_id()}"
+                timestamp = adapt_datetime(posted_at)
+                pending.append(
+                    (
+                        uuid_str(),
+                        transaction_id,
+                        transaction_type,
+                        str(value),
+                        account.pk,
+                        method(),
+                        "{}",
+                        f"{rng.getrandbits(40):010x}",
+                        timestamp,
+                        timestamp,
+                        False,
+                    )
+                )
+                if job["ledger"]:
+                    # The two lines LedgerLine.objects.record writes.
+                    signed = value if transaction_type == CREDIT else -value
+                    lines.append(
+                        (
+                            uuid_str(),
+                            transaction_id,
+                            account.pk,
+                            CUSTOMER_BOOK,
+                            str(signed),
+                            timestamp,
+                        )
+                    )
+                    lines.append(
+                        (uuid_str(), transaction_id, None, BANK_BOOK, str(-signed), timestamp)
+                    )
+                if len(pending) >= batch_size:
+                    flush()
+            deltas[account.pk] = balance - account.opening_balance
+        if pending:
+            flush()
+        Account.objects.post_deltas(deltas)
+    return written
+
+
+def setup_worker():
+    django.setup()
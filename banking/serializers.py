@@ -1,15 +1,26 @@
 from datetime import datetime
 from dateutil import parser
+from django.utils import timezone
 from rest_framework import routers, serializers, viewsets
 from rest_framework import status
 
-from banking.models import Account, Beneficiary, Transaction
+from banking.instrumentation import TimedSerializerMixin
+from banking.models import (
+    Account,
+    Beneficiary,
+    Branch,
+    ExportJob,
+    Transaction,
+)
 
-from BankingBackend.constant import ACTIVE
-from django.db import transaction
+from banking.summaries import GROUPS
+from banking.transfers import TransferRejected, execute_transfer
+from BankingBackend.constant import ACTIVE, TRANSACTION_METHOD
 
 
-class CreditDebitTransactionSerializer(serializers.ModelSerializer):
+class CreditDebitTransactionSerializer(
+    TimedSerializerMixin, serializers.ModelSerializer
+):
     """
     Credit and Debit Transaction
     """
@@ -27,6 +38,7 @@ class CreditDebitTransactionSerializer(serializers.ModelSerializer):
             "source",
             "customer_name",
             "amount",
+            "reference_number",
         )
 
     def validate(self, data):
@@ -47,11 +59,14 @@ class CreditDebitTransactionSerializer(serializers.ModelSerializer):
         return data
 
 
-class AccountSerializer(serializers.ModelSerializer):
+class AccountSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Account Serializer
     """
 
+    balance = serializers.DecimalField(
+        max_digits=20, decimal_places=3, source="current_balance", read_only=True
+    )
     pan_card = serializers.SerializerMethodField()
     adhar_card = serializers.SerializerMethodField()
     ifsc_code = serializers.SerializerMethodField()
@@ -72,7 +87,7 @@ class AccountSerializer(serializers.ModelSerializer):
         ]
 
     def get_pan_card(self, obj):
-        return f"""XXX-XXX-{obj.customer.pan_card_number[-4:]}"""
+        return f"""XXX-XXX-{(obj.customer.pan_card_number or "")[-4:]}"""
 
     def get_adhar_card(self, obj):
         return f"""xxxx-xxxx-{str(obj.customer.aadhar_card_number)[-4:]}"""
@@ -87,7 +102,7 @@ class AccountSerializer(serializers.ModelSerializer):
         return obj.customer.customer_id
 
 
-class TransactionCSVSerializer(serializers.Serializer):
+class TransactionCSVSerializer(TimedSerializerMixin, serializers.Serializer):
     """
     Make serializer to generate CSV.
     """
@@ -106,7 +121,9 @@ class TransactionCSVSerializer(serializers.Serializer):
             end_date = parser.parse(end_date)
 
         if not (start_date := self.initial_data.get("start_date")):
-            start_date = datetime.now().replace(day=1)
+            start_date = datetime.now().replace(
+                day=1, hour=0, minute=0, second=0, microsecond=0
+            )
         else:
             start_date = parser.parse(start_date)
         if end_date < start_date:
@@ -118,7 +135,92 @@ class TransactionCSVSerializer(serializers.Serializer):
         return data
 
 
-class TransactionHistorySerializer(serializers.ModelSerializer):
+class BalanceAtSerializer(TimedSerializerMixin, serializers.Serializer):
+    """
+    Account and time of a point-in-time balance request, ``at`` defaults to now.
+    """
+
+    account_number = serializers.IntegerField()
+    at = serializers.DateTimeField(required=False)
+
+    def validate(self, data):
+        try:
+            data["account"] = Account.objects.only("id", "account_number").get(
+                account_number=data["account_number"]
+            )
+        except Account.DoesNotExist:
+            raise serializers.ValidationError("Account number not found")
+        data.setdefault("at", timezone.now())
+        return data
+
+
+class TransactionSummarySerializer(TimedSerializerMixin, serializers.Serializer):
+    """
+    Date range, grouping and filters of a transaction summary request.
+    """
+
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    group_by = serializers.ChoiceField(choices=list(GROUPS), default="account")
+    ifsc_code = serializers.CharField(required=False)
+    account_number = serializers.IntegerField(required=False)
+    transaction_method = serializers.ChoiceField(
+        choices=TRANSACTION_METHOD, required=False
+    )
+
+    def validate(self, data):
+        if data["end_date"] < data["start_date"]:
+            raise serializers.ValidationError(
+                "End Date can not be less then Start Date"
+            )
+        return data
+
+
+class BranchReportSerializer(TimedSerializerMixin, serializers.Serializer):
+    """
+    Branch and date range of a branch report request.
+    """
+
+    ifsc_code = serializers.CharField()
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    top = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+    def validate(self, data):
+        if data["end_date"] < data["start_date"]:
+            raise serializers.ValidationError(
+                "End Date can not be less then Start Date"
+            )
+        if not Branch.objects.filter(ifsc_code=data["ifsc_code"]).exists():
+            raise serializers.ValidationError("Branch not found")
+        return data
+
+
+class ExportJobSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """
+    Status of a transaction history export job.
+    """
+
+    acc_ids = serializers.JSONField()
+    manifest = serializers.JSONField()
+
+    class Meta:
+        model = ExportJob
+        fields = [
+            "id",
+            "status",
+            "acc_ids",
+            "start_date",
+            "end_date",
+            "rows",
+            "size",
+            "manifest",
+            "error",
+            "created_at",
+        ]
+
+
+class TransactionHistorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Returns seriallized transaction history of the transaction object.
     """
@@ -141,12 +243,14 @@ class TransactionHistorySerializer(serializers.ModelSerializer):
         return obj.account.account_number
 
 
-class TransferSerializer(serializers.Serializer):
+class TransferSerializer(TimedSerializerMixin, serializers.Serializer):
     """
     Create custom Transfer Serializer, it will promise customer to send money to another customer.
     """
 
     account_number = serializers.IntegerField()
+    # Account to send from, only needed when the customer holds more than one
+    from_account_number = serializers.IntegerField(required=False)
     amount = serializers.DecimalField(max_digits=35, decimal_places=3)
     account_holder_name = serializers.CharField()
     contact_number = serializers.CharField()
@@ -159,14 +263,14 @@ class TransferSerializer(serializers.Serializer):
         Add validation
         """
         self.user = self.context["request"].user
-        self.sender_account = Account.objects.get(customer__user=self.user)
+        self.sender_account = self.get_sender_account(data.get("from_account_number"))
         self.reciever_account = Account.objects.filter(
             account_number=data["account_number"]
         )
         if self.sender_account.status != ACTIVE:
             raise serializers.ValidationError("Your account is not Active")
 
-        if self.sender_account.balance < data["amount"]:
+        if self.sender_account.current_balance < data["amount"]:
             raise serializers.ValidationError("Insufficient account balance")
 
         if not self.reciever_account:
@@ -190,38 +294,50 @@ class TransferSerializer(serializers.Serializer):
 
         return data
 
+    def get_sender_account(self, account_number):
+        """
+        The customer's account numbered ``account_number``, or their only
+        account when no number is given.
+        """
+        accounts = Account.objects.filter(customer__user=self.user)
+        if account_number is not None:
+            accounts = accounts.filter(account_number=account_number)
+        accounts = list(accounts[:2])
+        if not accounts:
+            raise serializers.ValidationError("Your account is not found")
+        if len(accounts) > 1:
+            raise serializers.ValidationError(
+                "You hold more than one account, send from_account_number"
+            )
+        return accounts[0]
+
     def create(self, validated_data):
         """
         Customize create method to promises to deduct account balance and send it to target account
+
+        The checks of ``validate`` are repeated by the executor with both
+        accounts locked, they are only authoritative there.
         """
-        with transaction.atomic():
-            # Debit amount from sender account
-            debit_transact = Transaction()
-            debit_transact.transaction_type = "Debit"
-            debit_transact.amount = validated_data["amount"]
-            debit_transact.account = self.sender_account
-            debit_transact.transaction_method = validated_data["source"]
-            debit_transact.description = {
-                "remarks": validated_data["remarks"],
-                "trasferred_to": {
-                    "account_number": validated_data["account_number"],
-                    "ifsc": validated_data["ifsc_code"],
+        try:
+            debit_transact, _ = execute_transfer(
+                self.sender_account.pk,
+                self.reciever_account[0].pk,
+                validated_data["amount"],
+                validated_data["source"],
+                debit_description={
+                    "remarks": validated_data["remarks"],
+                    "trasferred_to": {
+                        "account_number": validated_data["account_number"],
+                        "ifsc": validated_data["ifsc_code"],
+                    },
                 },
-            }
-            debit_transact.save()
-
-            # Credit amount from receiver account
-            credit_transact = Transaction()
-            credit_transact.transaction_type = "Credit"
-            credit_transact.amount = validated_data["amount"]
-            credit_transact.account = self.reciever_account[0]
-            credit_transact.transaction_method = validated_data["source"]
-            credit_transact.description = {
-                "remarks": validated_data["remarks"],
-                "trasferred_from": {
-                    "account_number": str(self.sender_account.account_number)[-6:]
+                credit_description={
+                    "remarks": validated_data["remarks"],
+                    "trasferred_from": {
+                        "account_number": str(self.sender_account.account_number)[-6:]
+                    },
                 },
-            }
-            credit_transact.save()
-
-            return debit_transact
+            )
+        except TransferRejected as e:
+            raise serializers.ValidationError(str(e))
+        return debit_transact
@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent after the transaction that changed account balances commits, with the
+# ``account_ids`` whose balance changed.
+balance_changed = Signal()
@@ -0,0 +1,185 @@
+"""
+Credit and Debit summaries over date ranges for branch managers.
+
+Every posting adds itself to the ``DailyTotal`` of its (account, day, method,
+type) in its own transaction, so a summary over any range reads at most one
+row per account, day, method and type instead of every transaction.
+
+``backfill`` rebuilds the totals of a range of days from the transactions and
+``check`` compares the two. Months already archived have no transactions
+left, both skip them. Only backfill days that are no longer posted to, a
+posting racing a backfill of its day can be counted twice or not at all.
+"""
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from banking.models import DailyTotal, Transaction, TransactionArchive
+from banking.partitions import add_months, month_start, months_between
+from BankingBackend.constant import CREDIT, DEBIT
+
+# Summary groups and the DailyTotal field of each.
+GROUPS = {
+    "account": "account__account_number",
+    "branch": "account__customer__branch__ifsc_code",
+    "method": "transaction_method",
+    "day": "day",
+}
+
+TotalMismatch = namedtuple(
+    "TotalMismatch", "account_id day transaction_method transaction_type stored raw"
+)
+
+
+def to_amount(value):
+    # SQLite sums decimals as floats, round back to the amount scale.
+    return Decimal(value or 0).quantize(Decimal("0.001"))
+
+
+def summary(
+    start_date,
+    end_date,
+    group_by,
+    ifsc_code=None,
+    account_number=None,
+    transaction_method=None,
+):
+    """
+    Credits and Debits, amounts and counts, of every ``group_by`` group in
+    ``[start_date, end_date]``.
+    """
+    field = GROUPS[group_by]
+    totals = DailyTotal.objects.filter(day__gte=start_date, day__lte=end_date)
+    if ifsc_code:
+        totals = totals.filter(account__customer__branch__ifsc_code=ifsc_code)
+    if account_number:
+        totals = totals.filter(account__account_number=account_number)
+    if transaction_method:
+        totals = totals.filter(transaction_method=transaction_method)
+    credit, debit = Q(transaction_type=CREDIT), Q(transaction_type=DEBIT)
+    rows = (
+        totals.order_by(field)
+        .values(field)
+        .annotate(
+            credits=Sum("amount", filter=credit),
+            debits=Sum("amount", filter=debit),
+            credit_count=Sum("count", filter=credit),
+            debit_count=Sum("count", filter=debit),
+        )
+    )
+    return [
+        {
+            group_by: row[field],
+            "credits": str(to_amount(row["credits"])),
+            "debits": str(to_amount(row["debits"])),
+            "credit_count": row["credit_count"] or 0,
+            "debit_count": row["debit_count"] or 0,
+        }
+        for row in rows
+    ]
+
+
+def live_ranges(start_date, end_date):
+    """
+    ``(first_day, last_day)`` of every month of the range that is not
+    archived, clamped to the range.
+    """
+    archived = set(
+        TransactionArchive.objects.filter(
+            month__gte=month_start(start_date).date(), month__lte=end_date
+        ).values_list("month", flat=True)
+    )
+    for month in months_between(start_date, end_date):
+        if month.date() in archived:
+            continue
+        last = add_months(month, 1).date() - timedelta(days=1)
+        yield max(month.date(), start_date), min(last, end_date)
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time()))
+
+
+def raw_totals(first_day, last_day):
+    """
+    ``{key: (amount, count)}`` of the transactions created on the days.
+    """
+    rows = (
+        Transaction.objects.filter(
+            created_at__gte=day_start(first_day),
+            created_at__lt=day_start(last_day + timedelta(days=1)),
+        )
+        .annotate(day=TruncDate("created_at"))
+        .order_by()
+        .values_list("account_id", "day", "transaction_method", "transaction_type")
+        .annotate(total=Sum("amount"), rows=Count("id"))
+    )
+    return {
+        (account_id, day, method, transaction_type): (to_amount(total), rows)
+        for account_id, day, method, transaction_type, total, rows in rows
+    }
+
+
+def stored_totals(first_day, last_day):
+    """
+    ``{key: (amount, count)}`` of the stored totals of the days.
+    """
+    rows = DailyTotal.objects.filter(
+        day__gte=first_day, day__lte=last_day
+    ).values_list(
+        "account_id", "day", "transaction_method", "transaction_type", "amount", "count"
+    )
+    return {
+        (account_id, day, method, transaction_type): (amount, count)
+        for account_id, day, method, transaction_type, amount, count in rows
+    }
+
+
+def backfill(start_date, end_date):
+    """
+    Replace the totals of the live days of the range with totals of their
+    transactions, one month per transaction. Returns the rows written.
+    """
+    written = 0
+    for first_day, last_day in live_ranges(start_date, end_date):
+        raw = raw_totals(first_day, last_day)
+        with transaction.atomic():
+            DailyTotal.objects.filter(day__gte=first_day, day__lte=last_day).delete()
+            DailyTotal.objects.bulk_create(
+                (
+                    DailyTotal(
+                        account_id=key[0],
+                        day=key[1],
+                        transaction_method=key[2],
+                        transaction_type=key[3],
+                        amount=amount,
+                        count=count,
+                    )
+                    for key, (amount, count) in raw.items()
+                ),
+                batch_size=1000,
+            )
+        written += len(raw)
+    return written
+
+
+def check(start_date, end_date):
+    """
+    ``TotalMismatch`` of every key of the live days of the range whose total
+    differs from its transactions.
+    """
+    mismatches = []
+    for first_day, last_day in live_ranges(start_date, end_date):
+        raw = raw_totals(first_day, last_day)
+        stored = stored_totals(first_day, last_day)
+        for key in sorted(set(raw) | set(stored)):
+            expected = raw.get(key, (Decimal("0.000"), 0))
+            found = stored.get(key, (Decimal("0.000"), 0))
+            if expected != found:
+                mismatches.append(TotalMismatch(*key, found, expected))
+    return mismatches
@@ -0,0 +1,100 @@
+import os
+from datetime import timedelta
+
+from celery.decorators import task
+from django.utils import timezone
+
+from banking.exports import write_export
+from banking.ledger import snapshot_day
+from banking.models import BalanceShard, ExportJob, IdempotencyKey
+from banking.outbox import drain
+from banking.partitions import (
+    archivable_months,
+    archive_month,
+    ensure_partitions,
+    history_rows,
+)
+from banking.reconciliation import reconcile
+from BankingBackend.constant import DONE, FAILED, RUNNING
+
+
+@task(name="run_export_job")
+def run_export_job(job_id):
+    """
+    Write the file of a pending ExportJob.
+    """
+    job = ExportJob.objects.get(pk=job_id)
+    ExportJob.objects.filter(pk=job_id).update(status=RUNNING)
+    try:
+        path, rows, manifest = write_export(
+            job,
+            history_rows(job.acc_ids, job.start_date, job.end_date, created_at=True),
+        )
+    except Exception as e:
+        ExportJob.objects.filter(pk=job_id).update(status=FAILED, error=str(e))
+        raise
+    ExportJob.objects.filter(pk=job_id).update(
+        status=DONE,
+        file_path=path,
+        rows=rows,
+        size=os.path.getsize(path),
+        manifest=manifest,
+    )
+
+
+@task(name="relay_outbox")
+def relay_outbox():
+    """
+    Drain the notification outbox, run periodically by celery beat.
+    """
+    return drain()
+
+
+@task(name="purge_idempotency_keys")
+def purge_idempotency_keys():
+    """
+    Delete the stored responses of expired idempotency keys.
+    """
+    deleted, _ = IdempotencyKey.objects.expired().delete()
+    return deleted
+
+
+@task(name="snapshot_balances")
+def snapshot_balances():
+    """
+    Snapshot yesterday's ledger balances, run daily by celery beat.
+    """
+    return snapshot_day(timezone.localdate() - timedelta(days=1))
+
+
+@task(name="reconcile_balances")
+def reconcile_balances():
+    """
+    Reconcile the balances of accounts touched since the previous run.
+    """
+    run, mismatches = reconcile(incremental=True)
+    return {"accounts": run.accounts, "mismatches": len(mismatches)}
+
+
+@task(name="compact_balance_shards")
+def compact_balance_shards():
+    """
+    Fold the shards of sharded accounts back into their balance.
+    """
+    return BalanceShard.objects.compact()
+
+
+@task(name="create_transaction_partitions")
+def create_transaction_partitions():
+    """
+    Keep the transaction partitions of the next months ready.
+    """
+    return len(ensure_partitions())
+
+
+@task(name="archive_transactions")
+def archive_transactions():
+    """
+    Archive the months of transactions older than TRANSACTION_ARCHIVE_MONTHS.
+    """
+    return [archive_month(month).rows for month in archivable_months()]
@@ -0,0 +1,141 @@
+import asyncio
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from banking.models import Account
+from banking.tests.test_data import create_customer_account
+from BankingBackend.constant import CASH, EMPLOYEE
+
+
+class AsyncViewsTestCase(TransactionTestCase):
+    """
+    Test case for the async enquiry, posting and transfer endpoints.
+
+    The async views query from their own threads, which only see committed
+    rows.
+    """
+
+    def setUp(self):
+        self.sender = create_customer_account(balance=Decimal("100.000"))
+        self.receiver = create_customer_account(balance=Decimal("5.000"))
+        self.employee = create_customer_account(user_type=EMPLOYEE).customer.user
+        self.tokens = {
+            name: f"Token {Token.objects.create(user=user).key}"
+            for name, user in [
+                ("sender", self.sender.customer.user),
+                ("employee", self.employee),
+            ]
+        }
+
+    def balance(self, account):
+        return Account.objects.get(pk=account.pk).balance
+
+    def posting(self, account, amount):
+        return {
+            "account": account.account_number,
+            "transaction_method": CASH,
+            "amount": amount,
+            "source": "test",
+            "customer_name": account.customer.user.get_full_name(),
+        }
+
+    async def test_enquiry_matches_sync_view(self):
+        auth = self.tokens["sender"]
+        # AsyncClient takes raw header names.
+        response = await self.async_client.get(
+            reverse("async_enquiry"), authorization=auth
+        )
+        expected = await sync_to_async(self.client.get)(
+            reverse("enquiry"), HTTP_AUTHORIZATION=auth
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), expected.json())
+        self.assertEqual(response.json()["content"]["balance"], "100.000")
+        self.assertIn("db;dur=", response["Server-Timing"])
+
+    async def test_concurrent_enquiries(self):
+        responses = await asyncio.gather(
+            *(
+                self.async_client.get(
+                    reverse("async_enquiry"), authorization=self.tokens["sender"]
+                )
+                for _ in range(20)
+            )
+        )
+        self.assertEqual({response.status_code for response in responses}, {200})
+
+    def test_credit_and_debit(self):
+        auth = self.tokens["employee"]
+        for name, amount in [
+            ("async_credit_amount", "10.000"),
+            ("async_debit_amount", "25.000"),
+        ]:
+            response = self.client.post(
+                reverse(name),
+                self.posting(self.sender, amount),
+                content_type="application/json",
+                HTTP_AUTHORIZATION=auth,
+                HTTP_IDEMPOTENCY_KEY=name,
+            )
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertEqual(response.json()["status"], "Success")
+        self.assertEqual(self.balance(self.sender), Decimal("85.000"))
+
+        retry = self.client.post(
+            reverse("async_debit_amount"),
+            self.posting(self.sender, "25.000"),
+            content_type="application/json",
+            HTTP_AUTHORIZATION=auth,
+            HTTP_IDEMPOTENCY_KEY="async_debit_amount",
+        )
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(self.balance(self.sender), Decimal("85.000"))
+
+    def test_transfer(self):
+        user = self.receiver.customer.user
+        response = self.client.post(
+            reverse("async_transfer"),
+            {
+                "account_number": self.receiver.account_number,
+                "amount": "30.000",
+                "account_holder_name": user.get_full_name(),
+                "contact_number": user.contact_number,
+                "remarks": "rent",
+                "source": "test",
+                "ifsc_code": self.receiver.customer.branch.ifsc_code,
+            },
+            content_type="application/json",
+            HTTP_AUTHORIZATION=self.tokens["sender"],
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.balance(self.sender), Decimal("70.000"))
+        self.assertEqual(self.balance(self.receiver), Decimal("35.000"))
+
+    def test_authentication(self):
+        url = reverse("async_credit_amount")
+        body = self.posting(self.sender, "1.000")
+        cases = [
+            ({}, 401, "Authentication credentials were not provided."),
+            ({"HTTP_AUTHORIZATION": "Token nope"}, 401, "Invalid token."),
+            ({"HTTP_AUTHORIZATION": self.tokens["sender"]}, 403, None),
+        ]
+        for headers, code, detail in cases:
+            response = self.client.post(
+                url, body, content_type="application/json", **headers
+            )
+            self.assertEqual(response.status_code, code)
+            if detail is not None:
+                self.assertEqual(response.json(), {"detail": detail})
+                self.assertEqual(response["WWW-Authenticate"], "Token")
+        self.assertEqual(self.balance(self.sender), Decimal("100.000"))
+        validation = self.client.post(
+            url,
+            {**body, "transaction_method": "Cheque"},
+            content_type="application/json",
+            HTTP_AUTHORIZATION=self.tokens["employee"],
+        )
+        self.assertEqual(validation.status_code, 400)
@@ -0,0 +1,90 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from banking.authentication import CachedTokenAuthentication, shared_key, tokens
+from banking.tests.test_data import create_customer_account
+from BankingBackend.constant import CUSTOMER, EMPLOYEE
+
+
+class CachedTokenAuthenticationTestCase(TestCase):
+    """
+    Test case for the cached token authentication backend.
+    """
+
+    def setUp(self):
+        cache.clear()
+        tokens.clear()
+        self.account = create_customer_account()
+        self.user = self.account.customer.user
+        self.token = Token.objects.create(user=self.user)
+        self.key = self.token.key
+        self.authentication = CachedTokenAuthentication()
+
+    def authenticate(self):
+        return self.authentication.authenticate_credentials(self.key)
+
+    @override_settings(AUTH_TOKEN_SHARED_CACHE=True)
+    def test_cached_after_first_request(self):
+        with self.assertNumQueries(1):
+            user, token = self.authenticate()
+        self.assertEqual((user.pk, user.user_type), (self.user.pk, CUSTOMER))
+        self.assertEqual(token.key, self.key)
+        with self.assertNumQueries(0):
+            self.authenticate()
+        # The shared tier still answers once the LRU of the process is gone.
+        tokens.clear()
+        with self.assertNumQueries(0):
+            user, _ = self.authenticate()
+        self.assertIsNotNone(self.authentication.authenticate_local(self.key))
+        # Fields that are not cached are loaded on first use.
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, self.user.email)
+
+    @override_settings(AUTH_TOKEN_SHARED_CACHE=False)
+    def test_no_shared_tier_without_shared_cache(self):
+        self.authenticate()
+        self.assertIsNone(cache.get(shared_key(self.key)))
+        with self.assertNumQueries(0):
+            self.authenticate()
+        # Once the LRU of the process expires the token is read again.
+        tokens.clear()
+        with self.assertNumQueries(1):
+            self.authenticate()
+
+    def test_invalid_token(self):
+        with self.assertRaisesMessage(AuthenticationFailed, "Invalid token."):
+            self.authentication.authenticate_credentials("nope")
+
+    def test_token_deleted(self):
+        self.authenticate()
+        self.token.delete()
+        with self.assertRaisesMessage(AuthenticationFailed, "Invalid token."):
+            self.authenticate()
+
+    def test_user_deactivated(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaisesMessage(
+            AuthenticationFailed, "User inactive or deleted."
+        ):
+            self.authenticate()
+
+    def test_user_type_changed(self):
+        url = reverse("enquiry")
+        auth = f"Token {self.key}"
+        response = self.client.get(url, HTTP_AUTHORIZATION=auth)
+        self.assertEqual(response.status_code, 200)
+        self.user.user_type = EMPLOYEE
+        self.user.save()
+        response = self.client.get(url, HTTP_AUTHORIZATION=auth)
+        self.assertEqual(response.status_code, 403)
+
+    def test_unrelated_update_keeps_entry(self):
+        self.authenticate()
+        self.user.save(update_fields=["last_login"])
+        with self.assertNumQueries(0):
+            self.authenticate()
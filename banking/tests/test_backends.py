@@ -0,0 +1,64 @@
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from banking.models import Account
+
+
+class DatabaseBackendTestCase(TransactionTestCase):
+    """
+    Test case for the health checks and SQLite options of the database
+    backends.
+    """
+
+    def setUp(self):
+        self.options = dict(connection.settings_dict["OPTIONS"])
+        self.health_checks = connection.settings_dict.get("CONN_HEALTH_CHECKS")
+
+    def tearDown(self):
+        connection.settings_dict["OPTIONS"] = self.options
+        connection.settings_dict["CONN_HEALTH_CHECKS"] = self.health_checks
+
+    def test_immediate_transactions(self):
+        connection.settings_dict["OPTIONS"]["transaction_mode"] = "immediate"
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                Account.objects.count()
+        self.assertEqual(queries[0]["sql"], "BEGIN IMMEDIATE")
+
+        del connection.settings_dict["OPTIONS"]["transaction_mode"]
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                Account.objects.count()
+        self.assertEqual(queries[0]["sql"], "BEGIN")
+
+        connection.settings_dict["OPTIONS"]["transaction_mode"] = "eventually"
+        with self.assertRaises(ImproperlyConfigured):
+            with transaction.atomic():
+                pass
+
+    def test_options_are_not_connect_arguments(self):
+        params = connection.get_connection_params()
+        self.assertNotIn("transaction_mode", params)
+        self.assertNotIn("init_command", params)
+
+    def test_health_check_once_per_request(self):
+        connection.settings_dict["CONN_HEALTH_CHECKS"] = True
+        connection.ensure_connection()
+        with mock.patch.object(
+            connection, "is_usable", return_value=False
+        ) as is_usable, mock.patch.object(connection, "close") as close:
+            # Request boundaries reset the check.
+            connection.close_if_unusable_or_obsolete()
+            Account.objects.count()
+            Account.objects.count()
+            self.assertEqual(is_usable.call_count, 1)
+            self.assertEqual(close.call_count, 1)
+
+            connection.close_if_unusable_or_obsolete()
+            connection.settings_dict["CONN_HEALTH_CHECKS"] = False
+            Account.objects.count()
+            self.assertEqual(is_usable.call_count, 1)
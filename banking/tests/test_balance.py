@@ -0,0 +1,55 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from banking.models import Account, InsufficientBalance
+from banking.tests.test_data import create_customer_account
+from BankingBackend.constant import CREDIT, DEBIT
+
+
+class PostAmountTestCase(TestCase):
+    """
+    Test case for the balance posting engine.
+    """
+
+    def setUp(self):
+        self.account = create_customer_account(balance=Decimal("100.000"))
+
+    def test_credit_and_debit(self):
+        balance = Account.objects.post_amount(self.account.id, CREDIT, Decimal("25.500"))
+        self.assertEqual(balance, Decimal("125.500"))
+        balance = Account.objects.post_amount(self.account.id, DEBIT, Decimal("0.500"))
+        self.assertEqual(balance, Decimal("125.000"))
+
+    def test_stale_instance_does_not_lose_updates(self):
+        """
+        Postings made through two stale copies of the account both land.
+        """
+        first = Account.objects.get(pk=self.account.id)
+        second = Account.objects.get(pk=self.account.id)
+        Account.objects.post_amount(first.id, CREDIT, Decimal("10.000"))
+        Account.objects.post_amount(second.id, CREDIT, Decimal("10.000"))
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal("120.000"))
+
+    def test_debit_with_check_balance(self):
+        with self.assertRaises(InsufficientBalance):
+            Account.objects.post_amount(
+                self.account.id, DEBIT, Decimal("100.001"), check_balance=True
+            )
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal("100.000"))
+
+    def test_only_balance_column_is_written(self):
+        with CaptureQueriesContext(connection) as queries:
+            Account.objects.post_amount(self.account.id, CREDIT, Decimal("1.000"))
+        updates = [q["sql"] for q in queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('SET "balance"', updates[0])
+        self.assertNotIn('"status"', updates[0])
+
+    def test_unknown_account(self):
+        with self.assertRaises(Account.DoesNotExist):
+            Account.objects.post_amount("missing", CREDIT, Decimal("1.000"))
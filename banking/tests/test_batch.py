@@ -0,0 +1,143 @@
+import io
+import json
+from decimal import Decimal
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from banking.batch import CSV, JSONL, BatchPosting, read_postings
+from banking.models import OutboxMessage, Transaction
+from banking.tests.test_data import create_customer_account
+
+
+class BatchPostingTestCase(TestCase):
+    """
+    Test case for the batch posting pipeline.
+    """
+
+    def setUp(self):
+        self.first = create_customer_account(balance=Decimal("100.000"))
+        self.second = create_customer_account(balance=Decimal("50.000"))
+
+    def posting(self, holder, transaction_type, amount, **extra):
+        posting = {
+            "account": holder.account_number,
+            "transaction_type": transaction_type,
+            "transaction_method": "NEFT",
+            "amount": amount,
+            "source": "settlement",
+            "customer_name": holder.customer.user.get_full_name(),
+        }
+        posting.update(extra)
+        return posting
+
+    def jsonl(self, postings):
+        return io.StringIO("\n".join(json.dumps(p) for p in postings))
+
+    def test_net_deltas_and_row_errors(self):
+        postings = [
+            self.posting(self.first, "Credit", "10.500"),
+            self.posting(self.first, "Debit", "0.500"),
+            self.posting(self.second, "Credit", "5", reference_number="REF1"),
+            self.posting(self.second, "Credit", "5", transaction_method="CHEQUE"),
+            self.posting(self.second, "Credit", "5", customer_name="Someone Else"),
+            self.posting(self.second, "Credit", "5", account=1),
+        ]
+        batch = BatchPosting(chunk_size=2, notify=False)
+        report = batch.run(read_postings(self.jsonl(postings), JSONL))
+
+        self.assertEqual(report["posted"], 3)
+        self.assertEqual([error["row"] for error in report["errors"]], [4, 5, 6])
+        self.assertIn("transaction_method", report["errors"][0]["errors"])
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual(self.first.balance, Decimal("110.000"))
+        self.assertEqual(self.second.balance, Decimal("55.000"))
+        self.assertEqual(
+            Transaction.objects.filter(description__contains=batch.batch_id).count(), 3
+        )
+
+    def test_holder_without_last_name(self):
+        user = self.first.customer.user
+        user.last_name = ""
+        user.save()
+        posting = self.posting(self.first, "Credit", "1", customer_name=user.first_name)
+        report = BatchPosting(notify=False).run(
+            read_postings(self.jsonl([posting]), JSONL)
+        )
+        self.assertEqual((report["posted"], report["errors"]), (1, []))
+
+        # The single posting endpoints accept the same row.
+        client = APIClient()
+        client.force_authenticate(create_customer_account(user_type="EM").customer.user)
+        response = client.post(reverse("credit_amount"), posting, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.balance, Decimal("102.000"))
+
+    def test_atomic_posts_nothing_on_error(self):
+        postings = [
+            self.posting(self.first, "Credit", "10"),
+            self.posting(self.first, "Credit", "-"),
+        ]
+        report = BatchPosting(atomic=True, notify=False).run(
+            read_postings(self.jsonl(postings), JSONL)
+        )
+        self.assertEqual(report["posted"], 0)
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.balance, Decimal("100.000"))
+
+    def test_csv(self):
+        stream = io.StringIO(
+            "account,transaction_type,transaction_method,amount,source,customer_name\n"
+            f"{self.first.account_number},Debit,ATM,25,atm,"
+            f"{self.first.customer.user.get_full_name()}\n"
+        )
+        report = BatchPosting(notify=False).run(read_postings(stream, CSV))
+        self.assertEqual(report["posted"], 1)
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.balance, Decimal("75.000"))
+
+
+class BatchPostingAPITestCase(TestCase):
+    """
+    Test case for uploading a file of postings.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("batch_postings")
+        self.account = create_customer_account(balance=Decimal("10.000"))
+        self.employee = create_customer_account(user_type="EM").customer.user
+        self.client.force_authenticate(user=self.employee)
+
+    def upload(self, content, name="postings.jsonl"):
+        return self.client.post(
+            self.url, {"file": SimpleUploadedFile(name, content.encode())}
+        )
+
+    def test_upload(self):
+        posting = {
+            "account": self.account.account_number,
+            "transaction_type": "Credit",
+            "transaction_method": "CASH",
+            "amount": "1.000",
+            "source": "branch",
+            "customer_name": self.account.customer.user.get_full_name(),
+        }
+        request = self.upload(json.dumps(posting) + "\nnot json\n")
+        self.assertEqual(request.status_code, 200)
+        content = json.loads(request.content)
+        self.assertEqual(content["status"], "Partial")
+        self.assertEqual(content["content"]["errors"][0]["row"], 2)
+        self.assertEqual(OutboxMessage.objects.filter(account=self.account).count(), 1)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal("11.000"))
+
+    def test_customer_can_not_upload(self):
+        self.employee.user_type = "CU"
+        self.employee.save()
+        request = self.upload("")
+        self.assertEqual(request.status_code, 403)
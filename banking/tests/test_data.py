@@ -97,3 +97,47 @@ class TransactionFactory(DjangoModelFactory):
     reference_number = fake.pystr()
     class Meta:
         model = "banking.Transaction"
+
+
+def create_customer_account(user_type="CU", balance=None, status="AC"):
+    """
+    Create a user, branch, customer and account with fresh fake values.
+    """
+    from accounts.models import User
+    from banking.models import Account, Branch, Customer
+
+    user = User.objects.create(
+        email=fake.unique.email(),
+        user_type=user_type,
+        contact_number=fake.phone_number(),
+        first_name=fake.first_name(),
+        last_name=fake.last_name(),
+        username=fake.unique.user_name(),
+    )
+    branch = Branch.objects.create(
+        name=fake.unique.pystr(max_chars=20),
+        city=fake.city(),
+        ifsc_code=fake.unique.pystr(max_chars=11),
+        micr_code=fake.unique.pystr(max_chars=9),
+        state=fake.pystr(),
+        address=fake.pystr(),
+    )
+    customer = Customer.objects.create(
+        user=user,
+        customer_id=fake.unique.pyint(max_value=10 ** 8),
+        date_of_birth=fake.date_time(),
+        pan_card_number=fake.pystr(max_chars=10),
+        aadhar_card_number=fake.pyint(),
+        occupation=fake.job()[:200],
+        branch=branch,
+        address=fake.address(),
+    )
+    account = Account.objects.create(
+        balance=balance if balance is not None else fake.pydecimal(
+            left_digits=5, right_digits=3, positive=True
+        ),
+        customer=customer,
+        account_type=random.choice(account_type),
+        status=status,
+    )
+    return account
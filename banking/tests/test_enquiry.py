@@ -0,0 +1,126 @@
+import json
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from banking.batch import BatchPosting
+from banking.models import Account
+from banking.tests.test_data import create_customer_account
+from BankingBackend.constant import ACTIVE, CREDIT, SAVING
+
+
+class CustomerEnquiryQueryTestCase(TestCase):
+    """
+    Test case for the query budget of the balance enquiry.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = reverse("enquiry")
+        self.account = create_customer_account(balance=Decimal("42.000"))
+        self.customer = self.account.customer
+        self.client.force_authenticate(user=self.customer.user)
+
+    @override_settings(ENQUIRY_CACHE_ENABLED=False)
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            request = self.client.get(self.url)
+        content = json.loads(request.content)["content"]
+        self.assertEqual(content["balance"], "42.000")
+        self.assertEqual(content["name"], self.customer.user.get_full_name())
+        self.assertEqual(content["ifsc_code"], self.customer.branch.ifsc_code)
+        self.assertEqual(content["customer_id"], self.customer.customer_id)
+
+    def test_cache_off_without_shared_cache(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+    @override_settings(ENQUIRY_CACHE_ENABLED=True)
+    def test_cold_cache_single_query(self):
+        with self.assertNumQueries(1):
+            request = self.client.get(self.url)
+        self.assertEqual(json.loads(request.content)["content"]["balance"], "42.000")
+
+    def test_multiple_accounts(self):
+        second = Account.objects.create(
+            customer=self.customer, account_type=SAVING, status=ACTIVE
+        )
+        with self.assertNumQueries(1):
+            request = self.client.get(self.url)
+        content = json.loads(request.content)["content"]
+        self.assertEqual(
+            sorted(account["account_number"] for account in content),
+            sorted([self.account.account_number, second.account_number]),
+        )
+
+        request = self.client.get(self.url, {"account_number": second.account_number})
+        content = json.loads(request.content)["content"]
+        self.assertEqual(content["account_number"], second.account_number)
+
+    def test_no_account(self):
+        request = self.client.get(self.url, {"account_number": "x"})
+        self.assertEqual(request.status_code, 404)
+
+
+@override_settings(ENQUIRY_CACHE_ENABLED=True)
+class EnquiryCacheTestCase(TestCase):
+    """
+    Test case for the read-through enquiry cache.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = reverse("enquiry")
+        self.account = create_customer_account(balance=Decimal("10.000"))
+        self.client.force_authenticate(user=self.account.customer.user)
+        self.client.get(self.url)
+        self.client.get(self.url)
+
+    def balance(self):
+        return json.loads(self.client.get(self.url).content)["content"]["balance"]
+
+    def test_hit_without_queries(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.balance(), "10.000")
+
+    def test_posting_invalidates(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Account.objects.post_amount(self.account.id, CREDIT, Decimal("5.000"))
+        self.assertEqual(self.balance(), "15.000")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.balance(), "15.000")
+
+    def test_batch_posting_invalidates(self):
+        posting = {
+            "account": self.account.account_number,
+            "transaction_type": "Debit",
+            "transaction_method": "ATM",
+            "amount": "2",
+            "source": "atm",
+            "customer_name": self.account.customer.user.get_full_name(),
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            BatchPosting(notify=False).run([(1, posting)])
+        self.assertEqual(self.balance(), "8.000")
+
+    def test_other_customer_account_not_served(self):
+        """
+        An account moved to another customer drops out of the cached list.
+        """
+        other = create_customer_account()
+        self.account.customer = other.customer
+        self.account.save()
+        request = self.client.get(self.url)
+        self.assertEqual(request.status_code, 404)
+
+    def test_stats(self):
+        manager = create_customer_account(user_type="BM").customer.user
+        self.client.force_authenticate(user=manager)
+        content = json.loads(self.client.get(reverse("enquiry_cache_stats")).content)
+        self.assertGreaterEqual(content["content"]["hits"], 1)
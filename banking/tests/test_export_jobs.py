@@ -0,0 +1,126 @@
+import csv
+import gzip
+import io
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from banking.benchmark import seed_transactions
+from banking.exports import EXPORT_HEADER
+from banking.models import ExportJob
+from banking.tasks import run_export_job
+from banking.tests.test_data import create_customer_account
+from BankingBackend.constant import DONE, FAILED, RUNNING
+
+
+class ExportJobTestCase(TestCase):
+    """
+    Test case for background transaction history exports.
+    """
+
+    def setUp(self):
+        self.export_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.export_root)
+        settings = override_settings(EXPORT_ROOT=self.export_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.client = APIClient()
+        self.manager = create_customer_account(user_type="BM").customer.user
+        self.client.force_authenticate(user=self.manager)
+        self.first = create_customer_account()
+        self.second = create_customer_account()
+        seed_transactions(self.first, 4, description={"source": "x", "added_by": 3})
+        seed_transactions(self.second, 2)
+        self.data = {
+            "acc_ids": [self.first.account_number, self.second.account_number]
+        }
+
+    @mock.patch("banking.views.run_export_job")
+    def start(self, task):
+        request = self.client.post(reverse("export"), self.data, format="json")
+        return request, task
+
+    def test_export_and_download(self):
+        request, task = self.start()
+        self.assertEqual(request.status_code, 202)
+        job_id = json.loads(request.content)["content"]["id"]
+        task.delay.assert_called_once_with(job_id)
+        run_export_job(job_id)
+
+        request = self.client.get(reverse("export_job", args=[job_id]))
+        content = json.loads(request.content)["content"]
+        self.assertEqual(content["status"], DONE)
+        self.assertEqual(content["rows"], 6)
+        self.assertEqual(
+            sorted((p["account_number"], p["rows"]) for p in content["manifest"]),
+            sorted(
+                [(self.first.account_number, 4), (self.second.account_number, 2)]
+            ),
+        )
+
+        download = reverse("export_download", args=[job_id])
+        request = self.client.get(download)
+        self.assertEqual(request.status_code, 200)
+        body = b"".join(request.streaming_content)
+        self.assertEqual(len(body), content["size"])
+        rows = list(csv.reader(io.StringIO(gzip.decompress(body).decode())))
+        self.assertEqual(rows[0], EXPORT_HEADER)
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(
+            {row[5] for row in rows[1:]}, {"{'source': 'x', 'added_by': 3}", "{}"}
+        )
+
+        # Resume from the second partition using the manifest offsets.
+        partition = content["manifest"][1]
+        request = self.client.get(download, HTTP_RANGE=f"bytes={partition['offset']}-")
+        self.assertEqual(request.status_code, 206)
+        self.assertEqual(
+            request["Content-Range"],
+            f"bytes {partition['offset']}-{len(body) - 1}/{len(body)}",
+        )
+        rows = gzip.decompress(b"".join(request.streaming_content)).splitlines()
+        self.assertEqual(len(rows), partition["rows"])
+
+        request = self.client.get(download, HTTP_RANGE=f"bytes={len(body)}-")
+        self.assertEqual(request.status_code, 416)
+
+    def test_identical_request_reuses_job(self):
+        request, _ = self.start()
+        job_id = json.loads(request.content)["content"]["id"]
+        run_export_job(job_id)
+        request, task = self.start()
+        self.assertEqual(request.status_code, 200)
+        self.assertEqual(json.loads(request.content)["content"]["id"], job_id)
+        task.delay.assert_not_called()
+
+        seed_transactions(self.first, 1)
+        request, task = self.start()
+        self.assertNotEqual(json.loads(request.content)["content"]["id"], job_id)
+        self.assertEqual(ExportJob.objects.count(), 2)
+
+    def test_stale_job_is_replaced(self):
+        request, _ = self.start()
+        job_id = json.loads(request.content)["content"]["id"]
+        ExportJob.objects.filter(pk=job_id).update(status=RUNNING)
+        request, task = self.start()
+        self.assertEqual(json.loads(request.content)["content"]["id"], job_id)
+        task.delay.assert_not_called()
+
+        with self.settings(EXPORT_JOB_TIMEOUT=60):
+            ExportJob.objects.filter(pk=job_id).update(
+                created_at=timezone.now() - timedelta(seconds=61)
+            )
+            request, task = self.start()
+        self.assertEqual(request.status_code, 202)
+        new_id = json.loads(request.content)["content"]["id"]
+        self.assertNotEqual(new_id, job_id)
+        task.delay.assert_called_once_with(new_id)
+        self.assertEqual(ExportJob.objects.get(pk=job_id).status, FAILED)
@@ -0,0 +1,208 @@
+import csv
+import io
+import json
+from decimal import Decimal
+
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from banking.benchmark import seed_transactions
+from banking.exports import (
+    COLUMNAR_TYPE,
+    CSV_TYPE,
+    EXPORT_HEADER,
+    NDJSON_TYPE,
+    negotiate_export,
+    read_columnar,
+    stream_columnar,
+    stream_csv,
+)
+from banking.models import Transaction
+from banking.tests.test_data import create_customer_account
+
+
+class TransactionHistoryCsvTestCase(TestCase):
+    """
+    Test case for the streaming transaction history export.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("history")
+        self.manager = create_customer_account(user_type="BM").customer.user
+        self.client.force_authenticate(user=self.manager)
+        self.account = create_customer_account()
+        self.other = create_customer_account()
+        seed_transactions(
+            self.account,
+            5,
+            amount=Decimal("12.5"),
+            description={"source": "branch", "added_by": 3},
+            reference_number="REF",
+        )
+        seed_transactions(self.other, 3)
+
+    def test_export_rows(self):
+        request = self.client.post(
+            self.url, {"acc_ids": [self.account.account_number]}, format="json"
+        )
+        self.assertEqual(request.status_code, 200)
+        with self.assertNumQueries(1):
+            content = b"".join(request.streaming_content).decode()
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[0], EXPORT_HEADER)
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(
+            rows[1][1:],
+            [
+                "Credit",
+                "12.500",
+                str(self.account.account_number),
+                "UPI",
+                "{'source': 'branch', 'added_by': 3}",
+                "REF",
+            ],
+        )
+
+    def test_negotiated_formats(self):
+        data = {"acc_ids": [self.account.account_number]}
+        request = self.client.post(
+            self.url, data, format="json", HTTP_ACCEPT=f"{NDJSON_TYPE}, */*;q=0.1"
+        )
+        self.assertEqual(request["Content-Type"], NDJSON_TYPE)
+        self.assertIn(".ndjson", request["Content-Disposition"])
+        with self.assertNumQueries(1):
+            content = b"".join(request.streaming_content).decode()
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(
+            {key: value for key, value in rows[0].items() if key != "transaction_id"},
+            {
+                "transaction_type": "Credit",
+                "amount": 12500,
+                "account_number": self.account.account_number,
+                "transaction_method": "UPI",
+                "description": {"source": "branch", "added_by": 3},
+                "reference_number": "REF",
+            },
+        )
+
+        request = self.client.post(
+            self.url, data, format="json", HTTP_ACCEPT=COLUMNAR_TYPE
+        )
+        self.assertEqual(request["Content-Type"], COLUMNAR_TYPE)
+        content = b"".join(request.streaming_content)
+        blocks = list(read_columnar(io.BytesIO(content)))
+        self.assertEqual(len(blocks), 1)
+        self.assertEqual(blocks[0]["amount"], [12500] * 5)
+        self.assertEqual(blocks[0]["transaction_method"], ["UPI"] * 5)
+        self.assertEqual(
+            [row["transaction_id"] for row in rows], blocks[0]["transaction_id"]
+        )
+
+    def test_customer_can_not_export(self):
+        self.manager.user_type = "CU"
+        self.manager.save()
+        request = self.client.post(
+            self.url, {"acc_ids": [self.account.account_number]}, format="json"
+        )
+        self.assertEqual(request.status_code, 403)
+        request = self.client.post(
+            self.url,
+            {"acc_ids": [self.account.account_number]},
+            format="json",
+            HTTP_ACCEPT=COLUMNAR_TYPE,
+        )
+        self.assertEqual(request.status_code, 403)
+        self.assertEqual(request["Content-Type"], "application/json")
+
+
+class TransactionHistoryQueryTestCase(TestCase):
+    """
+    Test case for the account and date range history lookup.
+    """
+
+    def test_history(self):
+        account = create_customer_account()
+        other = create_customer_account()
+        seed_transactions(account, 2)
+        seed_transactions(other, 1)
+        old = Transaction.objects.filter(account=account).first()
+        Transaction.objects.filter(pk=old.pk).update(
+            created_at=timezone.now() - timedelta(days=10)
+        )
+        end = timezone.now()
+        with self.assertNumQueries(2):
+            rows = list(
+                Transaction.objects.history(
+                    [account.account_number], end - timedelta(days=1), end
+                )
+            )
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0].account_id, account.id)
+
+
+class StreamCsvTestCase(TestCase):
+    """
+    Test case for the buffered CSV formatter.
+    """
+
+    def test_header_first_and_buffered(self):
+        rows = (["x" * 10, i] for i in range(1000))
+        chunks = list(stream_csv(rows, header=["a", "b"], buffer_size=1024))
+        self.assertEqual(chunks[0], "a,b\r\n")
+        self.assertTrue(all(len(chunk) < 1100 for chunk in chunks))
+        self.assertEqual(len("".join(chunks).splitlines()), 1001)
+
+
+class ExportFormatTestCase(TestCase):
+    """
+    Test case for the negotiated export formats.
+    """
+
+    def test_negotiate(self):
+        self.assertEqual(negotiate_export(None), CSV_TYPE)
+        self.assertEqual(negotiate_export("application/json"), CSV_TYPE)
+        self.assertEqual(
+            negotiate_export(f"text/csv;q=0.5, {NDJSON_TYPE}"), NDJSON_TYPE
+        )
+        self.assertEqual(
+            negotiate_export(f"{COLUMNAR_TYPE};q=0.9, {NDJSON_TYPE};q=0"),
+            COLUMNAR_TYPE,
+        )
+
+    def test_columnar_blocks(self):
+        rows = [
+            (
+                f"t{i}",
+                "Debit" if i % 2 else "Credit",
+                Decimal("1.005") * i,
+                10 ** 12 + i,
+                "NEFT",
+                '{"note": "caf\u00e9"}' if i % 3 else None,
+                None if i % 4 else "R\u00e9f",
+            )
+            for i in range(25)
+        ]
+        chunks = list(stream_columnar(rows, block_rows=10))
+        self.assertEqual(len(chunks), 5)
+        blocks = list(read_columnar(io.BytesIO(b"".join(chunks))))
+        self.assertEqual([len(block["amount"]) for block in blocks], [10, 10, 5])
+        decoded = [
+            row
+            for block in blocks
+            for row in zip(*(block[name] for name in block))
+        ]
+        self.assertEqual(
+            decoded,
+            [
+                (t, kind, int(amount * 1000), number, method, description, ref)
+                for t, kind, amount, number, method, description, ref in rows
+            ],
+        )
+        with self.assertRaises(ValueError):
+            list(read_columnar(io.BytesIO(b"".join(chunks)[:-10])))
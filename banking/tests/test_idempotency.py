@@ -0,0 +1,144 @@
+import json
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from banking.models import Account, IdempotencyKey, Transaction
+from banking.tests.test_data import create_customer_account
+
+
+class IdempotencyTestCase(TestCase):
+    """
+    Test case for idempotency keys on the posting endpoints.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("credit_amount")
+        self.account = create_customer_account(balance=Decimal("10.000"))
+        self.employee = create_customer_account(user_type="EM").customer.user
+        self.client.force_authenticate(user=self.employee)
+        self.data = {
+            "account": self.account.account_number,
+            "transaction_method": "CASH",
+            "amount": "5.000",
+            "source": "branch",
+            "customer_name": self.account.customer.user.get_full_name(),
+        }
+
+    def credit(self, key=None, **data):
+        headers = {"HTTP_IDEMPOTENCY_KEY": key} if key else {}
+        return self.client.post(
+            self.url, dict(self.data, **data), format="json", **headers
+        )
+
+    def balance(self):
+        return Account.objects.get(pk=self.account.pk).balance
+
+    def test_retry_replays_without_posting(self):
+        first = self.credit("key-1")
+        with self.assertNumQueries(1):
+            retry = self.credit("key-1")
+        self.assertEqual(retry.status_code, first.status_code)
+        self.assertEqual(json.loads(retry.content), json.loads(first.content))
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(self.balance(), Decimal("15.000"))
+        self.assertEqual(Transaction.objects.filter(account=self.account).count(), 1)
+
+    def test_reference_number_is_the_key(self):
+        self.credit(reference_number="UTR123")
+        self.credit(reference_number="UTR123")
+        self.credit(reference_number="UTR124")
+        self.assertEqual(self.balance(), Decimal("20.000"))
+        self.assertEqual(
+            Transaction.objects.get(reference_number="UTR123").amount,
+            Decimal("5.000"),
+        )
+
+    def test_key_reused_with_other_body(self):
+        self.credit("key-1")
+        request = self.credit("key-1", amount="6.000")
+        self.assertEqual(request.status_code, 422)
+        self.assertEqual(self.balance(), Decimal("15.000"))
+
+    def test_invalid_request_not_stored(self):
+        request = self.credit("key-1", customer_name="Someone Else")
+        self.assertEqual(request.status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_expired_key_posts_again(self):
+        self.credit("key-1")
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.credit("key-1")
+        self.assertEqual(self.balance(), Decimal("20.000"))
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+    def test_keys_are_per_endpoint(self):
+        self.credit("key-1")
+        self.client.post(
+            reverse("debit_amount"), self.data, format="json", HTTP_IDEMPOTENCY_KEY="key-1"
+        )
+        self.assertEqual(self.balance(), Decimal("10.000"))
+
+    def test_in_progress(self):
+        self.credit("key-1")
+        IdempotencyKey.objects.update(status_code=None)
+        self.assertEqual(self.credit("key-1").status_code, 409)
+
+    def test_failed_posting_is_retried(self):
+        with mock.patch.object(Transaction, "save", side_effect=RuntimeError):
+            self.assertEqual(self.credit("key-1").status_code, 500)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.balance(), Decimal("10.000"))
+
+        posted = self.credit("key-1")
+        self.assertEqual(posted.status_code, 200)
+        self.assertNotIn("Idempotent-Replayed", posted)
+        self.assertEqual(self.balance(), Decimal("15.000"))
+
+    def test_debit_beyond_balance(self):
+        def debit(amount):
+            return self.client.post(
+                reverse("debit_amount"),
+                dict(self.data, amount=amount),
+                format="json",
+                HTTP_IDEMPOTENCY_KEY="debit-1",
+            )
+
+        refused = debit("15.000")
+        self.assertEqual(refused.status_code, 409)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertFalse(Transaction.objects.filter(account=self.account).exists())
+        self.assertEqual(self.balance(), Decimal("10.000"))
+
+        self.credit("key-1")
+        posted = debit("15.000")
+        self.assertEqual(posted.status_code, 200)
+        self.assertNotIn("Idempotent-Replayed", posted)
+        self.assertEqual(self.balance(), Decimal("0.000"))
+
+    def test_transfer_replay(self):
+        receiver = create_customer_account()
+        self.client.force_authenticate(user=self.account.customer.user)
+        data = {
+            "account_number": receiver.account_number,
+            "amount": "4.000",
+            "account_holder_name": receiver.customer.user.get_full_name(),
+            "contact_number": "9999999999",
+            "ifsc_code": receiver.customer.branch.ifsc_code,
+            "remarks": "rent",
+            "source": "UPI",
+        }
+        responses = [
+            self.client.post(
+                reverse("transfer"), data, format="json", HTTP_IDEMPOTENCY_KEY="t-1"
+            )
+            for _ in range(3)
+        ]
+        self.assertEqual(len({response.content for response in responses}), 1)
+        self.assertEqual(self.balance(), Decimal("6.000"))
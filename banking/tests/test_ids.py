@@ -0,0 +1,104 @@
+import threading
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from banking.ids import (
+    MAX_SEQUENCE,
+    MAX_WORKER_ID,
+    SEQUENCE_BITS,
+    SnowflakeAllocator,
+    WorkerIdsExhausted,
+    lease_key,
+)
+from banking.models import Transaction
+from banking.tests.test_data import create_customer_account
+
+
+class SnowflakeAllocatorTestCase(SimpleTestCase):
+    """
+    Test case for the Snowflake ID allocator.
+    """
+
+    def test_unique_and_sorted_across_threads(self):
+        allocator = SnowflakeAllocator(worker_id=7)
+        results = [[] for _ in range(8)]
+
+        def allocate(ids):
+            for _ in range(5000):
+                ids.append(allocator.next_id())
+
+        threads = [threading.Thread(target=allocate, args=(ids,)) for ids in results]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        all_ids = [i for ids in results for i in ids]
+        self.assertEqual(len(set(all_ids)), len(all_ids))
+        for ids in results:
+            self.assertEqual(ids, sorted(ids))
+        self.assertTrue(all((i >> SEQUENCE_BITS) & 0x3FF == 7 for i in all_ids))
+
+    def test_sequence_overflow_and_clock_going_back(self):
+        allocator = SnowflakeAllocator(worker_id=1)
+        with mock.patch("banking.ids.time.time", return_value=1700000000.0):
+            ids = [allocator.next_id() for _ in range(MAX_SEQUENCE + 10)]
+        with mock.patch("banking.ids.time.time", return_value=1600000000.0):
+            ids.append(allocator.next_id())
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual(ids, sorted(ids))
+
+
+class WorkerLeaseTestCase(SimpleTestCase):
+    """
+    Test case for worker ids leased in the cache.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def worker_id(self, allocator):
+        return (allocator.next_id() >> SEQUENCE_BITS) & MAX_WORKER_ID
+
+    def test_processes_lease_distinct_ids(self):
+        allocators = [SnowflakeAllocator() for _ in range(3)]
+        with mock.patch("banking.ids.os.getpid", return_value=MAX_WORKER_ID):
+            worker_ids = [self.worker_id(allocator) for allocator in allocators]
+        self.assertEqual(worker_ids, [MAX_WORKER_ID, 0, 1])
+        self.assertEqual(cache.get(lease_key(0)), allocators[1].holder)
+
+        # An explicit worker id takes no lease.
+        self.assertEqual(self.worker_id(SnowflakeAllocator(worker_id=0)), 0)
+
+    def test_lost_lease_is_replaced(self):
+        allocator = SnowflakeAllocator()
+        first = self.worker_id(allocator)
+        cache.set(lease_key(first), "another process")
+        # Renewal is not due yet.
+        self.assertEqual(self.worker_id(allocator), first)
+
+        with mock.patch("banking.ids.time.monotonic", return_value=allocator.renew_at):
+            second = self.worker_id(allocator)
+        self.assertNotEqual(second, first)
+        self.assertEqual(cache.get(lease_key(second)), allocator.holder)
+
+    def test_exhausted(self):
+        with mock.patch("banking.ids.cache.add", return_value=False):
+            with self.assertRaises(WorkerIdsExhausted):
+                SnowflakeAllocator().next_id()
+
+
+class GeneratedIdTestCase(TestCase):
+    """
+    Test case for account numbers and transaction IDs issued by the allocator.
+    """
+
+    def test_no_lookup_queries(self):
+        account = create_customer_account()
+        with self.assertNumQueries(0):
+            transaction = Transaction(account=account)
+        self.assertTrue(transaction.transaction_id.startswith("txn"))
+        self.assertGreater(account.account_number, 10 ** 12)
@@ -0,0 +1,100 @@
+import re
+from decimal import Decimal
+
+from celery.signals import after_task_publish, before_task_publish
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import ResolverMatch, reverse
+from rest_framework.test import APIClient
+
+from banking.instrumentation import (
+    QUERY_BUCKETS,
+    Histogram,
+    InstrumentationMiddleware,
+    metrics,
+)
+from banking.tests.test_data import create_customer_account
+
+
+class InstrumentationTestCase(TestCase):
+    """
+    Test case for the request instrumentation middleware and /metrics.
+    """
+
+    def setUp(self):
+        metrics.reset()
+        self.account = create_customer_account(balance=Decimal("10.000"))
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.account.customer.user)
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse("enquiry"))
+        self.assertEqual(response.status_code, 200)
+        timing = response["Server-Timing"]
+        self.assertRegex(
+            timing,
+            r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", '
+            r"serializer;dur=[\d.]+, celery;dur=[\d.]+$",
+        )
+        queries = int(re.search(r'"(\d+) queries"', timing).group(1))
+        self.assertGreater(queries, 0)
+        serializer = float(re.search(r"serializer;dur=([\d.]+)", timing).group(1))
+        self.assertGreater(serializer, 0)
+
+    @override_settings(METRICS_TOKEN="scrape-secret")
+    def test_metrics_endpoint(self):
+        self.client.get(reverse("enquiry"))
+        self.client.get(reverse("enquiry"))
+        response = self.client.get(
+            reverse("metrics"), HTTP_AUTHORIZATION="Bearer scrape-secret"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        text = response.content.decode()
+        self.assertIn(
+            'banking_requests_total{view="CustomerEnquiry",status="200"} 2', text
+        )
+        self.assertIn(
+            'banking_request_duration_seconds_bucket{view="CustomerEnquiry",'
+            'le="+Inf"} 2',
+            text,
+        )
+        self.assertIn('banking_db_queries_count{view="CustomerEnquiry"} 2', text)
+
+    def test_metrics_needs_token(self):
+        url = reverse("metrics")
+        # Closed until a token is configured, whoever asks.
+        manager = create_customer_account(user_type="BM").customer.user
+        self.client.force_authenticate(user=manager)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        with self.settings(METRICS_TOKEN="scrape-secret"):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(response["WWW-Authenticate"], 'Bearer realm="metrics"')
+            for header in ("Bearer wrong", "Token scrape-secret", "scrape-secret"):
+                response = self.client.get(url, HTTP_AUTHORIZATION=header)
+                self.assertEqual(response.status_code, 401)
+            self.assertNotIn(b"banking_requests_total", response.content)
+
+    def test_celery_publish_time(self):
+        def view(request):
+            before_task_publish.send(sender="task")
+            after_task_publish.send(sender="task")
+            return HttpResponse()
+
+        middleware = InstrumentationMiddleware(view)
+        request = RequestFactory().get("/")
+        request.resolver_match = ResolverMatch(view, (), {})
+        response = middleware(request)
+        self.assertIn("celery;dur=", response["Server-Timing"])
+        publish = metrics.views["view"][4]
+        self.assertEqual(publish.count, 1)
+        self.assertGreater(publish.sum, 0)
+
+    def test_histogram_buckets(self):
+        histogram = Histogram(QUERY_BUCKETS)
+        for value in (0, 3, 5, 500):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [1, 0, 0, 2, 0, 0, 0, 0, 0, 1])
+        self.assertEqual((histogram.sum, histogram.count), (508, 4))
@@ -0,0 +1,137 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Sum
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from banking.ledger import balance_at, day_bounds, full_balance_at, snapshot_day
+from banking.models import BalanceSnapshot, ImmutableLedger, LedgerLine, Transaction
+from banking.tests.test_data import create_customer_account
+from BankingBackend.constant import BANK_BOOK, CREDIT, CUSTOMER_BOOK, DEBIT, UPI
+
+
+class LedgerTestCase(TestCase):
+    """
+    Test case for the append-only ledger and point-in-time balances.
+    """
+
+    def setUp(self):
+        self.account = create_customer_account(balance=Decimal("0.000"))
+
+    def line(self, amount, posted_at):
+        return LedgerLine.objects.create(
+            entry_id=f"entry-{posted_at.isoformat()}",
+            account=self.account,
+            book=CUSTOMER_BOOK,
+            amount=Decimal(amount),
+            posted_at=posted_at,
+        )
+
+    def test_posting_writes_balanced_entry(self):
+        for transaction_type in (CREDIT, DEBIT):
+            Transaction(
+                account=self.account,
+                transaction_type=transaction_type,
+                transaction_method=UPI,
+                amount=Decimal("4.000"),
+            ).save()
+        lines = LedgerLine.objects.order_by("posted_at", "book")
+        self.assertEqual(lines.count(), 4)
+        self.assertEqual(
+            [(line.book, line.amount) for line in lines],
+            [
+                (BANK_BOOK, Decimal("-4.000")),
+                (CUSTOMER_BOOK, Decimal("4.000")),
+                (BANK_BOOK, Decimal("4.000")),
+                (CUSTOMER_BOOK, Decimal("-4.000")),
+            ],
+        )
+        totals = lines.order_by().values("entry_id").annotate(total=Sum("amount"))
+        self.assertEqual({row["total"] for row in totals}, {Decimal("0")})
+
+    def test_lines_are_immutable(self):
+        line = self.line("1.000", timezone.now())
+        line.amount = Decimal("2.000")
+        with self.assertRaises(ImmutableLedger):
+            line.save()
+        with self.assertRaises(ImmutableLedger):
+            line.delete()
+        with self.assertRaises(ImmutableLedger):
+            LedgerLine.objects.update(amount=Decimal("0"))
+        with self.assertRaises(ImmutableLedger):
+            LedgerLine.objects.filter(pk=line.pk).delete()
+        self.assertEqual(LedgerLine.objects.get().amount, Decimal("1.000"))
+
+    def test_purge(self):
+        line = self.line("1.000", timezone.now())
+        self.line("2.000", timezone.now())
+        self.assertEqual(LedgerLine.objects.filter(pk=line.pk).purge(), 1)
+        self.assertEqual(LedgerLine.objects.get().amount, Decimal("2.000"))
+
+    def test_balance_at_from_snapshot(self):
+        day = timezone.now().date() - timedelta(days=3)
+        start, end = day_bounds(day)
+        self.line("10.000", start)
+        self.line("5.500", end - timedelta(microseconds=1))
+        self.line("2.250", end)
+        self.line("1.000", end + timedelta(hours=5))
+        self.assertEqual(snapshot_day(day), 1)
+        self.assertEqual(snapshot_day(day), 1)
+        self.assertEqual(BalanceSnapshot.objects.get().balance, Decimal("15.500"))
+
+        for at, expected in (
+            (start - timedelta(seconds=1), "0.000"),
+            (start + timedelta(hours=1), "10.000"),
+            (end, "17.750"),
+            (end + timedelta(hours=6), "18.750"),
+        ):
+            balance, snapshot = balance_at(self.account.pk, at)
+            self.assertEqual(balance, Decimal(expected))
+            self.assertEqual(balance, full_balance_at(self.account.pk, at))
+            self.assertEqual(snapshot is not None, at >= end)
+
+    def test_balance_at_with_opening_balance(self):
+        account = create_customer_account(balance=Decimal("100.000"))
+        Transaction(
+            account=account,
+            transaction_type=CREDIT,
+            transaction_method=UPI,
+            amount=Decimal("5.000"),
+        ).save()
+        account.refresh_from_db()
+        self.assertEqual(account.balance, Decimal("105.000"))
+        balance, _ = balance_at(account.pk, timezone.now())
+        self.assertEqual(balance, account.balance)
+        opening = LedgerLine.objects.filter(entry_id=f"opening-{account.pk}")
+        self.assertEqual(opening.aggregate(total=Sum("amount"))["total"], 0)
+
+        # Saving the account again does not open it twice.
+        account.save()
+        self.assertEqual(opening.count(), 2)
+
+    def test_balance_at_api(self):
+        self.line("10.000", timezone.now() - timedelta(hours=1))
+        client = APIClient()
+        url = reverse("balance_at")
+        client.force_authenticate(user=self.account.customer.user)
+        response = client.get(url, {"account_number": self.account.account_number})
+        self.assertEqual(response.status_code, 403)
+
+        employee = create_customer_account(user_type="EM").customer.user
+        client.force_authenticate(user=employee)
+        response = client.get(url, {"account_number": self.account.account_number})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["content"]["balance"], "10.000")
+        response = client.get(
+            url,
+            {
+                "account_number": self.account.account_number,
+                "at": (timezone.now() - timedelta(days=1)).isoformat(),
+            },
+        )
+        self.assertEqual(response.json()["content"]["balance"], "0.000")
+        response = client.get(url, {"account_number": "missing"})
+        self.assertEqual(response.status_code, 400)
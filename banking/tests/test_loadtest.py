@@ -0,0 +1,93 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TransactionTestCase, override_settings
+
+from banking.loadtest import (
+    AMOUNT,
+    ENDPOINTS,
+    ClientTransport,
+    Fixture,
+    compare,
+    run,
+    run_slow_clients,
+    scenarios,
+    server,
+)
+from banking.models import Account
+
+
+class LoadTestTestCase(TransactionTestCase):
+    """
+    Test case for the endpoint load test.
+    """
+
+    def setUp(self):
+        call_command(
+            "createsamplerecords", "8", transactions=80, seed=1, stdout=StringIO()
+        )
+        Account.objects.update(balance=Decimal("5000.000"))
+
+    def total(self):
+        return Account.objects.aggregate(total=Sum("balance"))["total"]
+
+    def test_every_endpoint(self):
+        before = self.total()
+        results = run(
+            ClientTransport(Fixture(customers=4)),
+            requests=4,
+            threads=1,
+            query_samples=1,
+        )
+        self.assertEqual(list(results["endpoints"]), list(ENDPOINTS))
+        for name, result in results["endpoints"].items():
+            self.assertEqual(result["errors"], 0, result.get("first_error"))
+            self.assertEqual(result["count"], 4)
+            self.assertGreater(result["queries"], 0)
+        self.assertEqual(results["meta"]["transport"], "client")
+        # Credits and debits cancel out, transfers move money around.
+        self.assertEqual(self.total(), before)
+
+    @override_settings(ALLOWED_HOSTS=["127.0.0.1"])
+    def test_slow_clients(self):
+        fixture = Fixture(customers=4)
+        before = self.total()
+        # Concurrent writes lock the shared in-memory test database.
+        runs = [("customer-enquiry", 3), ("credit-amount", 1)]
+        for asynchronous in (False, True):
+            builds = scenarios(fixture, asynchronous=asynchronous)
+            with server("local") as url:
+                for name, connections in runs:
+                    result = run_slow_clients(
+                        fixture, url, builds[name], connections, requests=2, delay=0
+                    )
+                    self.assertEqual(result["errors"], 0, result.get("first_error"))
+                    self.assertEqual(result["count"], connections * 2)
+        self.assertEqual(self.total(), before + 4 * AMOUNT)
+
+    def test_compare_with_baseline(self):
+        def results(p95, throughput, queries):
+            return {
+                "endpoints": {
+                    "transfer": {
+                        "p50_ms": 1.0,
+                        "p95_ms": p95,
+                        "p99_ms": 3.0,
+                        "throughput": throughput,
+                        "queries": queries,
+                    }
+                }
+            }
+
+        baseline = results(2.0, 100.0, 14)
+        self.assertEqual(compare(results(2.3, 85.0, 14), baseline, 0.2), [])
+        self.assertEqual(
+            compare(results(2.5, 70.0, 15), baseline, 0.2),
+            [
+                "transfer p95_ms 2.5 > baseline 2.0",
+                "transfer throughput 70.0 < baseline 100.0",
+                "transfer queries 15 > baseline 14",
+            ],
+        )
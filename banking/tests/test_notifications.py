@@ -0,0 +1,71 @@
+from unittest import mock
+
+from django.core import mail
+from django.test import TestCase
+
+from banking.notifications import DIGEST_SUBJECT, RateLimiter, coalesce, deliver
+from BankingBackend.constant import CREDIT, DEBIT
+
+
+def payload(email, transaction_type=CREDIT, amount="1.000"):
+    return {
+        "email": [email],
+        "transaction_type": transaction_type,
+        "account_number": 123456789,
+        "amount": amount,
+    }
+
+
+class NotificationTestCase(TestCase):
+    """
+    Test case for batched and coalesced notification emails.
+    """
+
+    def test_coalesce_per_recipient(self):
+        messages, errors = coalesce(
+            [
+                payload("a@example.com"),
+                payload("b@example.com", DEBIT),
+                payload("a@example.com", DEBIT, "2.000"),
+                payload("c@example.com", "Refund"),
+            ]
+        )
+        self.assertEqual(list(errors), [3])
+        self.assertEqual(
+            [message.to for message in messages], [["a@example.com"], ["b@example.com"]]
+        )
+        self.assertEqual(messages[0].subject, DIGEST_SUBJECT)
+        self.assertIn(
+            "XXXXXX6789 has been Debited with amount 2.000", messages[0].body
+        )
+        self.assertEqual(messages[1].subject, "Amount Debited")
+
+    def test_deliver_over_one_connection(self):
+        payloads = [payload(f"{i}@example.com") for i in range(5)]
+        with mock.patch(
+            "django.core.mail.backends.locmem.EmailBackend.open"
+        ) as open_connection:
+            sent, errors = deliver(payloads, batch_size=2)
+        self.assertEqual((sent, errors), (5, {}))
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(open_connection.call_count, 1)
+
+    def test_rate_limit(self):
+        backend = "django.core.mail.backends.locmem.EmailBackend"
+        with self.settings(EMAIL_RATE_LIMITS={backend: 2}), mock.patch(
+            "banking.notifications.RateLimiter.acquire"
+        ) as acquire:
+            deliver([payload(f"{i}@example.com") for i in range(3)], batch_size=2)
+        self.assertEqual([c.args for c in acquire.call_args_list], [(2,), (1,)])
+
+    @mock.patch("banking.notifications.time.sleep")
+    @mock.patch("banking.notifications.time.monotonic", return_value=100.0)
+    def test_rate_limiter_waits(self, monotonic, sleep):
+        limiter = RateLimiter(rate=10)
+        limiter.acquire(10)
+        sleep.assert_not_called()
+        limiter.acquire(5)
+        sleep.assert_called_once_with(0.5)
+        monotonic.return_value = 101.0
+        limiter.acquire(5)
+        self.assertEqual(sleep.call_count, 1)
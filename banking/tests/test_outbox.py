@@ -0,0 +1,200 @@
+from datetime import timedelta
+from decimal import Decimal
+from smtplib import SMTPException
+from unittest import mock
+
+from django.core import mail
+from django.db import transaction
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.utils import timezone
+
+from banking.batch import BatchPosting
+from banking.models import OutboxMessage, Transaction, transaction_email
+from banking.outbox import MAIL, drain, relay_batch, send
+from banking.tests.test_data import create_customer_account
+from BankingBackend.constant import CREDIT, DONE, FAILED, PENDING, RUNNING, UPI
+from BankingBackend.tasks.celery import send_email_batch
+
+
+@override_settings(NOTIFICATION_COALESCE_WINDOW=0)
+class OutboxTestCase(TestCase):
+    """
+    Test case for the transactional notification outbox.
+    """
+
+    def setUp(self):
+        self.account = create_customer_account(balance=Decimal("10.000"))
+
+    def post(self, amount="1.000"):
+        Transaction(
+            account=self.account,
+            transaction_type=CREDIT,
+            transaction_method=UPI,
+            amount=Decimal(amount),
+        ).save()
+
+    def test_posting_writes_message(self):
+        self.post()
+        message = OutboxMessage.objects.get(account=self.account)
+        self.assertEqual(message.status, PENDING)
+        self.assertEqual(
+            message.payload,
+            {
+                "email": [self.account.customer.user.email],
+                "transaction_type": CREDIT,
+                "account_number": self.account.account_number,
+                "amount": "1.000",
+            },
+        )
+
+    def test_rollback_drops_message(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.post()
+                raise RuntimeError
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_batch_posting_writes_messages(self):
+        posting = {
+            "account": self.account.account_number,
+            "transaction_type": CREDIT,
+            "transaction_method": UPI,
+            "amount": "2",
+            "source": "settlement",
+            "customer_name": self.account.customer.user.get_full_name(),
+        }
+        BatchPosting().run([(1, posting), (2, posting)])
+        self.assertEqual(OutboxMessage.objects.filter(account=self.account).count(), 2)
+
+    def test_relay_to_mail_backend(self):
+        self.post()
+        self.post("2.000")
+        other = create_customer_account()
+        OutboxMessage.objects.enqueue(
+            other, transaction_email(other.customer.user.email, CREDIT, 1, "3")
+        )
+        report = drain(delivery=MAIL)
+        self.assertEqual(report["sent"], 3)
+        # The two postings of the first customer are sent as one digest.
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].to, [self.account.customer.user.email])
+        self.assertEqual(len(mail.outbox[0].body.splitlines()), 3)
+        self.assertFalse(OutboxMessage.objects.ready().exists())
+        self.assertEqual(OutboxMessage.objects.filter(status=DONE).count(), 3)
+
+    def test_failed_message_backs_off(self):
+        message = OutboxMessage.objects.enqueue(
+            self.account, transaction_email("a@example.com", "Refund", 1, "1")
+        )
+        self.assertEqual(relay_batch(delivery=MAIL), (0, 1))
+        message.refresh_from_db()
+        self.assertEqual(message.attempts, 1)
+        self.assertEqual(message.status, PENDING)
+        self.assertEqual(relay_batch(delivery=MAIL), (0, 0))
+
+        with self.settings(OUTBOX_MAX_ATTEMPTS=2):
+            OutboxMessage.objects.filter(pk=message.pk).update(
+                available_at=message.created_at
+            )
+            relay_batch(delivery=MAIL)
+        message.refresh_from_db()
+        self.assertEqual(message.status, FAILED)
+
+    def test_window_holds_recent_messages(self):
+        self.post()
+        with self.settings(NOTIFICATION_COALESCE_WINDOW=60):
+            self.assertEqual(relay_batch(delivery=MAIL), (0, 0))
+        self.assertEqual(relay_batch(delivery=MAIL), (1, 0))
+
+    def test_expired_claim_is_relayed_again(self):
+        self.post()
+        message = OutboxMessage.objects.get()
+        OutboxMessage.objects.filter(pk=message.pk).update(
+            status=RUNNING, available_at=timezone.now() + timedelta(minutes=1)
+        )
+        # Claimed by a relay still delivering it.
+        self.assertEqual(relay_batch(delivery=MAIL), (0, 0))
+
+        OutboxMessage.objects.filter(pk=message.pk).update(
+            available_at=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(relay_batch(delivery=MAIL), (1, 0))
+        message.refresh_from_db()
+        self.assertEqual(message.status, DONE)
+
+
+@override_settings(NOTIFICATION_COALESCE_WINDOW=0)
+class OutboxRelayTransactionTestCase(TransactionTestCase):
+    """
+    Test case for delivering outbox messages outside a database transaction.
+    """
+
+    def test_delivers_outside_transaction(self):
+        account = create_customer_account(balance=Decimal("10.000"))
+        Transaction(
+            account=account,
+            transaction_type=CREDIT,
+            transaction_method=UPI,
+            amount=Decimal("1.000"),
+        ).save()
+        seen = []
+
+        def deliver(messages):
+            seen.append(
+                (
+                    transaction.get_connection().in_atomic_block,
+                    list(OutboxMessage.objects.values_list("status", flat=True)),
+                )
+            )
+            return send(messages)
+
+        with mock.patch("banking.outbox.send", deliver):
+            self.assertEqual(relay_batch(delivery=MAIL), (1, 0))
+        self.assertEqual(seen, [(False, [RUNNING])])
+        self.assertEqual(OutboxMessage.objects.get().status, DONE)
+
+
+@override_settings(EMAIL_MAX_RETRIES=2, EMAIL_RETRY_DELAY=0)
+class SendEmailBatchTestCase(SimpleTestCase):
+    """
+    Test case for retries of the Celery email batch task.
+    """
+
+    payloads = [
+        transaction_email("a@example.com", CREDIT, 1234567, "1.000"),
+        transaction_email("b@example.com", CREDIT, 1234567, "2.000"),
+    ]
+
+    def test_connection_failure_is_retried(self):
+        with mock.patch(
+            "BankingBackend.tasks.celery.deliver",
+            side_effect=[SMTPException("down"), (2, {})],
+        ) as deliver:
+            result = send_email_batch.apply(args=(self.payloads,))
+        self.assertEqual(result.get(), {"sent": 2, "failed": 0})
+        self.assertEqual(
+            [call.args[0] for call in deliver.call_args_list],
+            [self.payloads, self.payloads],
+        )
+
+    def test_only_failed_payloads_are_retried(self):
+        with mock.patch(
+            "BankingBackend.tasks.celery.deliver",
+            side_effect=[(1, {1: SMTPException("refused")}), (1, {})],
+        ) as deliver:
+            send_email_batch.apply(args=(self.payloads,)).get()
+        self.assertEqual(deliver.call_args_list[1].args[0], self.payloads[1:])
+
+    def test_fails_once_retries_run_out(self):
+        with mock.patch(
+            "BankingBackend.tasks.celery.deliver", side_effect=SMTPException("down")
+        ) as deliver:
+            result = send_email_batch.apply(args=(self.payloads,))
+        self.assertTrue(result.failed())
+        self.assertIsInstance(result.result, SMTPException)
+        self.assertEqual(deliver.call_count, 3)
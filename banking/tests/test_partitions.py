@@ -0,0 +1,201 @@
+import csv
+import gzip
+import io
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from banking.models import ArchivedTotal, ExportJob, Transaction, TransactionArchive
+from banking.partitions import (
+    add_months,
+    archivable_months,
+    archive_month,
+    ensure_partitions,
+    export_cache_key,
+    history_rows,
+    month_start,
+)
+from banking.reconciliation import reconcile
+from banking.tasks import run_export_job
+from banking.tests.test_data import create_customer_account
+from BankingBackend.constant import CREDIT, DEBIT, DONE, UPI
+
+NOW = datetime(2024, 6, 15, 12, tzinfo=timezone.utc)
+
+
+class TransactionPartitionTestCase(TestCase):
+    """
+    Test case for the monthly archive of transactions.
+    """
+
+    def setUp(self):
+        self.archive_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_root)
+        settings = override_settings(
+            TRANSACTION_ARCHIVE_ROOT=self.archive_root,
+            TRANSACTION_ARCHIVE_MONTHS=3,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.account = create_customer_account(balance=Decimal("100.000"))
+        self.other = create_customer_account(balance=Decimal("100.000"))
+        for account, day, transaction_type, amount in (
+            (self.account, datetime(2024, 1, 10, tzinfo=timezone.utc), CREDIT, "5"),
+            (self.account, datetime(2024, 1, 20, tzinfo=timezone.utc), DEBIT, "2"),
+            (self.other, datetime(2024, 1, 31, 23, tzinfo=timezone.utc), CREDIT, "7"),
+            (self.account, datetime(2024, 2, 1, tzinfo=timezone.utc), CREDIT, "1"),
+            (self.account, datetime(2024, 6, 1, tzinfo=timezone.utc), DEBIT, "3"),
+        ):
+            self.post(account, day, transaction_type, amount)
+
+    def post(self, account, day, transaction_type, amount):
+        transact = Transaction(
+            account=account,
+            transaction_type=transaction_type,
+            transaction_method=UPI,
+            amount=Decimal(amount),
+            reference_number="REF",
+        )
+        transact.save()
+        Transaction.objects.filter(pk=transact.pk).update(created_at=day)
+
+    def test_months(self):
+        self.assertEqual(month_start(NOW), datetime(2024, 6, 1, tzinfo=timezone.utc))
+        self.assertEqual(
+            add_months(month_start(NOW), -6),
+            datetime(2023, 12, 1, tzinfo=timezone.utc),
+        )
+        self.assertEqual(
+            archivable_months(now=NOW),
+            [
+                datetime(2024, 1, 1, tzinfo=timezone.utc),
+                datetime(2024, 2, 1, tzinfo=timezone.utc),
+            ],
+        )
+        # Only Postgres tables are partitioned.
+        self.assertEqual(ensure_partitions(now=NOW), [])
+
+    def test_archive_month(self):
+        archive = archive_month(datetime(2024, 1, 1, tzinfo=timezone.utc))
+        self.assertEqual((archive.rows, archive.month.isoformat()), (3, "2024-01-01"))
+        self.assertTrue(os.path.exists(archive.path))
+        self.assertEqual(set(archive.manifest), {self.account.pk, self.other.pk})
+        self.assertEqual(Transaction.objects.count(), 2)
+        self.assertEqual(
+            dict(ArchivedTotal.objects.values_list("account_id", "credits")),
+            {self.account.pk: Decimal("5.000"), self.other.pk: Decimal("7.000")},
+        )
+        self.assertEqual(reconcile()[1], [])
+        self.assertNotIn(
+            datetime(2024, 1, 1, tzinfo=timezone.utc), archivable_months(now=NOW)
+        )
+
+    def test_late_rows_are_archived_again(self):
+        january = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        first = archive_month(january)
+        self.post(self.account, datetime(2024, 1, 5, tzinfo=timezone.utc), CREDIT, "4")
+        self.assertIn(january, archivable_months(now=NOW))
+
+        archive = archive_month(january)
+        self.assertEqual(archive.pk, first.pk)
+        self.assertEqual(archive.rows, 4)
+        self.assertFalse(os.path.exists(first.path))
+        self.assertEqual(
+            Transaction.objects.filter(created_at__lt=add_months(january, 1)).count(),
+            0,
+        )
+        self.assertEqual(
+            ArchivedTotal.objects.get(account=self.account).credits, Decimal("9.000")
+        )
+        self.assertEqual(reconcile()[1], [])
+        rows = list(
+            history_rows(
+                [self.account.account_number],
+                january,
+                datetime(2024, 1, 31, tzinfo=timezone.utc),
+            )
+        )
+        self.assertEqual(
+            [row[2] for row in rows],
+            [Decimal("4.000"), Decimal("5.000"), Decimal("2.000")],
+        )
+
+    def test_export_job_reads_archives(self):
+        export_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, export_root)
+        numbers = [self.account.account_number, self.other.account_number]
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        end = datetime(2024, 12, 31, tzinfo=timezone.utc)
+        key = export_cache_key(numbers, start, end)
+        archive_month(start)
+        self.assertNotEqual(export_cache_key(numbers, start, end), key)
+
+        job = ExportJob.objects.create(
+            requested_by=create_customer_account(user_type="BM").customer.user,
+            cache_key=key,
+            acc_ids=numbers,
+            start_date=start,
+            end_date=end,
+        )
+        with self.settings(EXPORT_ROOT=export_root):
+            run_export_job(job.id)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows), (DONE, 5))
+        self.assertEqual(
+            [(p["month"], p["rows"]) for p in job.manifest if p["month"] == "2024-01"],
+            [("2024-01", 2), ("2024-01", 1)],
+        )
+        with open(job.file_path, "rb") as raw:
+            rows = list(csv.reader(io.StringIO(gzip.decompress(raw.read()).decode())))
+        self.assertEqual(len(rows), 6)
+
+    def test_history_reads_archives(self):
+        archive_month(datetime(2024, 1, 1, tzinfo=timezone.utc))
+        start = datetime(2024, 1, 15, tzinfo=timezone.utc)
+        end = datetime(2024, 12, 31, tzinfo=timezone.utc)
+        rows = list(history_rows([self.account.account_number], start, end))
+        self.assertEqual(
+            [row[1:3] for row in rows],
+            [
+                (DEBIT, Decimal("2.000")),
+                (CREDIT, Decimal("1.000")),
+                (DEBIT, Decimal("3.000")),
+            ],
+        )
+        self.assertEqual(rows[0][3:], (self.account.account_number, UPI, "{}", "REF"))
+
+        client = APIClient()
+        manager = create_customer_account(user_type="BM").customer.user
+        client.force_authenticate(user=manager)
+        response = client.post(
+            reverse("history"),
+            {
+                "acc_ids": [self.account.account_number, self.other.account_number],
+                "start_date": "2024-01-01",
+                "end_date": "2024-12-31",
+            },
+            format="json",
+        )
+        content = b"".join(response.streaming_content).decode()
+        self.assertEqual(len(list(csv.reader(io.StringIO(content)))), 6)
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command("archivetransactions", "--months", "1", "--dry-run", stdout=out)
+        self.assertIn("2024-01: would be archived", out.getvalue())
+        self.assertFalse(TransactionArchive.objects.exists())
+        call_command("archivetransactions", "--months", "1", stdout=io.StringIO())
+        # Every month before the current one, June included.
+        self.assertEqual(
+            sorted(TransactionArchive.objects.values_list("rows", flat=True)),
+            [1, 1, 3],
+        )
+        self.assertFalse(Transaction.objects.exists())
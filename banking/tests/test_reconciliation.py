@@ -0,0 +1,81 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+
+from banking.models import Account, ReconciliationRun, Transaction
+from banking.reconciliation import reconcile
+from banking.tests.test_data import create_customer_account
+from BankingBackend.constant import CREDIT, DEBIT, UPI
+
+
+class ReconciliationTestCase(TestCase):
+    """
+    Test case for reconciling balances with the transaction history.
+    """
+
+    def setUp(self):
+        self.accounts = [
+            create_customer_account(balance=Decimal("10.000")) for _ in range(5)
+        ]
+        for account in self.accounts:
+            for transaction_type, amount in ((CREDIT, "7.125"), (DEBIT, "2.000")):
+                Transaction(
+                    account=account,
+                    transaction_type=transaction_type,
+                    transaction_method=UPI,
+                    amount=Decimal(amount),
+                ).save()
+
+    def drift(self, account, amount):
+        Account.objects.filter(pk=account.pk).update(balance=Decimal(amount))
+
+    def test_opening_balance(self):
+        account = Account.objects.get(pk=self.accounts[0].pk)
+        self.assertEqual(account.opening_balance, Decimal("10.000"))
+        self.assertEqual(account.balance, Decimal("15.125"))
+
+    def test_reports_drift(self):
+        run, mismatches = reconcile()
+        self.assertEqual((run.accounts, mismatches), (5, []))
+
+        self.drift(self.accounts[2], "15.120")
+        for chunk_size in (1, 2, 1000):
+            chunks = []
+            run, mismatches = reconcile(chunk_size=chunk_size, on_chunk=chunks.append)
+            self.assertEqual(run.accounts, 5)
+            self.assertEqual(sum(chunk.accounts for chunk in chunks), 5)
+            self.assertEqual(
+                [(m.account_id, m.balance, m.expected) for m in mismatches],
+                [(self.accounts[2].pk, Decimal("15.120"), Decimal("15.125"))],
+            )
+        self.assertEqual(
+            ReconciliationRun.objects.filter(finished_at__isnull=False).count(), 4
+        )
+
+    def test_incremental_checks_touched_accounts(self):
+        run, _ = reconcile(incremental=True)
+        self.assertFalse(run.incremental)
+        self.assertEqual(run.accounts, 5)
+
+        # Everything so far happened well before the previous run.
+        ReconciliationRun.objects.update(started_at=run.started_at - timedelta(hours=1))
+        earlier = run.started_at - timedelta(days=1)
+        Transaction.objects.update(created_at=earlier)
+        Account.objects.update(created_at=earlier)
+        self.drift(self.accounts[0], "0.000")
+        Transaction(
+            account=self.accounts[1],
+            transaction_type=CREDIT,
+            transaction_method=UPI,
+            amount=Decimal("1.000"),
+        ).save()
+        self.drift(self.accounts[1], "1.000")
+
+        run, mismatches = reconcile(incremental=True)
+        self.assertTrue(run.incremental)
+        self.assertEqual(run.accounts, 1)
+        self.assertEqual([m.account_id for m in mismatches], [self.accounts[1].pk])
+
+        run, mismatches = reconcile()
+        self.assertEqual(len(mismatches), 2)
@@ -0,0 +1,145 @@
+import random
+import unittest
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from banking import reports
+from banking.models import Transaction
+from banking.reports import (
+    METHODS,
+    branch_report,
+    build_report,
+    loop_report,
+)
+from banking.tests.test_data import create_customer_account
+from BankingBackend.constant import CREDIT, DEBIT, NEFT, UPI
+
+
+class BranchReportTestCase(TestCase):
+    """
+    Test case for the vectorized branch reports.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        self.account = create_customer_account(balance=Decimal("10000.000"))
+        self.branch = self.account.customer.branch
+        self.other = create_customer_account(balance=Decimal("10000.000"))
+        # A second account of the same branch.
+        self.other.customer.branch = self.branch
+        self.other.customer.save()
+        self.elsewhere = create_customer_account(balance=Decimal("10000.000"))
+        for account, transaction_type, method, amount in (
+            (self.account, CREDIT, UPI, "150.250"),
+            (self.account, DEBIT, NEFT, "20.000"),
+            (self.other, CREDIT, UPI, "9.999"),
+            (self.elsewhere, CREDIT, UPI, "5000.000"),
+        ):
+            Transaction(
+                account=account,
+                transaction_type=transaction_type,
+                transaction_method=method,
+                amount=Decimal(amount),
+            ).save()
+
+    def test_report(self):
+        report = branch_report(self.branch.ifsc_code, self.today, self.today, top=1)
+        self.assertEqual(report["transactions"], 3)
+        self.assertEqual(
+            report["daily"],
+            [
+                {
+                    "day": self.today.isoformat(),
+                    "credits": "160.249",
+                    "debits": "20.000",
+                    "credit_count": 2,
+                    "debit_count": 1,
+                }
+            ],
+        )
+        methods = [
+            (row["method"], row["credits"], row["debits"]) for row in report["methods"]
+        ]
+        self.assertEqual(
+            methods, [(UPI, "160.249", "0.000"), (NEFT, "0.000", "20.000")]
+        )
+        self.assertEqual(len(report["top_accounts"]), 1)
+        top = report["top_accounts"][0]
+        self.assertEqual(top["account_number"], self.account.account_number)
+        self.assertEqual((top["flow"], top["net"]), ("170.250", "130.250"))
+        self.assertEqual(
+            [row["count"] for row in report["histogram"]],
+            [2, 1, 0, 0, 0, 0, 0, 0, 0],
+        )
+        self.assertIsNone(report["histogram"][-1]["to"])
+
+        # Cached per branch and range until it expires.
+        Transaction(
+            account=self.account,
+            transaction_type=CREDIT,
+            transaction_method=UPI,
+            amount=Decimal("1.000"),
+        ).save()
+        with self.assertNumQueries(0):
+            cached = branch_report(self.branch.ifsc_code, self.today, self.today, top=1)
+        self.assertEqual(cached, report)
+        yesterday = self.today - timedelta(days=1)
+        self.assertEqual(
+            branch_report(self.branch.ifsc_code, yesterday, yesterday)["daily"], []
+        )
+
+    def test_loop_fallback_without_numpy(self):
+        rows = reports.report_rows(self.branch.ifsc_code, self.today, self.today)
+        expected = loop_report(rows)
+        with mock.patch("banking.reports.numpy", None):
+            report = build_report(
+                reports.report_rows(self.branch.ifsc_code, self.today, self.today)
+            )
+        self.assertEqual(report, expected)
+        self.assertEqual(report["transactions"], 3)
+
+    @unittest.skipIf(reports.numpy is None, "NumPy is not installed")
+    def test_vectorized_matches_loop(self):
+        rng = random.Random(1)
+        rows = [
+            (
+                rng.randrange(50),
+                rng.choice((CREDIT, DEBIT)),
+                rng.choice(METHODS),
+                rng.randrange(10 ** 9),
+                date(2024, 1, 1) + timedelta(days=rng.randrange(40)),
+            )
+            for _ in range(5000)
+        ]
+        self.assertEqual(
+            build_report(rows, top=5, chunk_size=700), loop_report(rows, top=5)
+        )
+
+    def test_endpoint(self):
+        client = APIClient()
+        url = reverse("branch_report")
+        params = {
+            "ifsc_code": self.branch.ifsc_code,
+            "start_date": self.today.isoformat(),
+            "end_date": self.today.isoformat(),
+        }
+        client.force_authenticate(user=self.account.customer.user)
+        self.assertEqual(client.get(url, params).status_code, 403)
+
+        client.force_authenticate(create_customer_account(user_type="BM").customer.user)
+        response = client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["content"]["transactions"], 3)
+
+        self.assertEqual(
+            client.get(url, dict(params, ifsc_code="missing")).status_code, 400
+        )
+        self.assertEqual(client.get(url, dict(params, top=0)).status_code, 400)
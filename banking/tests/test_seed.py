@@ -0,0 +1,68 @@
+import random
+from collections import Counter
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TestCase
+
+from accounts.models import User
+from banking.models import Account, LedgerLine, OutboxMessage, Transaction
+from banking.reconciliation import reconcile
+from banking.seed import transaction_counts
+
+
+class SeedTestCase(TestCase):
+    """
+    Test case for the bulk sample data generator.
+    """
+
+    def seed(self, **options):
+        options = dict(transactions=400, batch_size=7, seed=3, **options)
+        call_command("createsamplerecords", "12", stdout=StringIO(), **options)
+
+    def test_seeded_data_reconciles(self):
+        self.seed()
+        self.assertEqual(Account.objects.count(), 12)
+        self.assertEqual(Transaction.objects.count(), 400)
+        self.assertEqual(User.objects.filter(user_type="CU").count(), 12)
+        self.assertEqual(User.objects.exclude(user_type="CU").count(), 2)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+        run, mismatches = reconcile()
+        self.assertEqual((run.accounts, mismatches), (12, []))
+        self.assertFalse(Account.objects.filter(balance__lt=0).exists())
+        entries = LedgerLine.objects.order_by().values("entry_id").annotate(
+            total=Sum("amount")
+        )
+        self.assertEqual({row["total"] for row in entries}, {0})
+        for account in Account.objects.all():
+            posted = LedgerLine.objects.filter(account=account).aggregate(
+                total=Sum("amount")
+            )["total"]
+            self.assertEqual(round(posted or 0, 3), account.balance)
+        oldest = Transaction.objects.order_by("created_at").first()
+        self.assertGreaterEqual(oldest.created_at, oldest.account.created_at)
+
+    def test_same_seed_same_data(self):
+        def history():
+            return Counter(
+                Transaction.objects.exclude(pk__in=seen).values_list(
+                    "amount", "transaction_type", "transaction_method"
+                )
+            )
+
+        seen = []
+        self.seed()
+        first = history()
+        seen = list(Transaction.objects.values_list("pk", flat=True))
+        lines = LedgerLine.objects.count()
+        self.seed(no_ledger=True)
+        self.assertEqual(history(), first)
+        self.assertEqual(LedgerLine.objects.count(), lines)
+
+    def test_counts_are_skewed(self):
+        counts = transaction_counts(random.Random(1), 1000, 100000, 1.2)
+        self.assertEqual(sum(counts), 100000)
+        top = sum(sorted(counts, reverse=True)[:100])
+        self.assertGreater(top, 40000)
@@ -0,0 +1,110 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from banking.models import (
+    Account,
+    BalanceShard,
+    InsufficientBalance,
+    Transaction,
+    choose_shard,
+)
+from banking.reconciliation import reconcile
+from banking.tests.test_data import create_customer_account
+from banking.transfers import TransferRejected, execute_transfer
+from BankingBackend.constant import CREDIT, DEBIT, UPI
+
+
+class BalanceShardTestCase(TestCase):
+    """
+    Test case for the sharded balances of hot accounts.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.account = create_customer_account(balance=Decimal("10.000"))
+        Account.objects.set_balance_shards(self.account.pk, 4)
+
+    def post(self, transaction_type, amount, check_balance=False):
+        transact = Transaction(
+            account=self.account,
+            transaction_type=transaction_type,
+            transaction_method=UPI,
+            amount=Decimal(amount),
+        )
+        transact.save(check_balance=check_balance)
+        return transact
+
+    def state(self):
+        account = Account.objects.get(pk=self.account.pk)
+        shards = list(
+            BalanceShard.objects.filter(account=account)
+            .order_by("shard")
+            .values_list("balance", flat=True)
+        )
+        return account.balance, shards
+
+    def test_credits_spread_over_shards(self):
+        for _ in range(8):
+            self.post(CREDIT, "1.500")
+        balance, shards = self.state()
+        self.assertEqual(balance, Decimal("10.000"))
+        self.assertEqual(shards, [Decimal("3.000")] * 4)
+        self.assertEqual(self.account.balance, Decimal("22.000"))
+        self.assertEqual(
+            Account.objects.get(pk=self.account.pk).current_balance,
+            Decimal("22.000"),
+        )
+
+        token = Token.objects.create(user=self.account.customer.user)
+        response = self.client.get(
+            reverse("enquiry"), HTTP_AUTHORIZATION=f"Token {token.key}"
+        )
+        self.assertEqual(response.json()["content"]["balance"], "22.000")
+
+    @override_settings(BALANCE_SHARD_STRATEGY="hash")
+    def test_hash_strategy(self):
+        transact = self.post(CREDIT, "2.000")
+        shard = choose_shard(4, transact.transaction_id)
+        self.assertEqual(shard, choose_shard(4, transact.transaction_id))
+        _, shards = self.state()
+        self.assertEqual(shards[shard], Decimal("2.000"))
+
+    def test_debits_never_overdraw(self):
+        self.post(CREDIT, "5.000")
+        # The balance with its shards covers the debit, the balance alone
+        # does not.
+        self.post(DEBIT, "12.000", check_balance=True)
+        self.assertEqual(self.account.balance, Decimal("3.000"))
+        with self.assertRaises(InsufficientBalance):
+            self.post(DEBIT, "3.001", check_balance=True)
+        balance, shards = self.state()
+        self.assertEqual(balance + sum(shards), Decimal("3.000"))
+        self.assertEqual(reconcile()[1], [])
+
+    def test_transfer_from_sharded_account(self):
+        receiver = create_customer_account()
+        self.post(CREDIT, "5.000")
+        execute_transfer(self.account.pk, receiver.pk, Decimal("15.000"), UPI)
+        self.assertEqual(
+            Account.objects.get(pk=self.account.pk).current_balance, Decimal("0")
+        )
+        with self.assertRaisesMessage(TransferRejected, "Insufficient"):
+            execute_transfer(self.account.pk, receiver.pk, Decimal("0.001"), UPI)
+
+    def test_compaction(self):
+        for _ in range(6):
+            self.post(CREDIT, "1.000")
+        self.assertEqual(BalanceShard.objects.compact(), 1)
+        self.assertEqual(self.state(), (Decimal("16.000"), [Decimal("0.000")] * 4))
+        self.assertEqual(BalanceShard.objects.compact(), 0)
+
+        self.post(CREDIT, "1.000")
+        Account.objects.set_balance_shards(self.account.pk, 0)
+        self.assertEqual(self.state(), (Decimal("17.000"), []))
+        self.post(CREDIT, "1.000")
+        self.assertEqual(self.state(), (Decimal("18.000"), []))
+        self.assertEqual(reconcile()[1], [])
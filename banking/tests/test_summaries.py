@@ -0,0 +1,164 @@
+import io
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from banking.batch import BatchPosting
+from banking.models import DailyTotal, Transaction
+from banking.summaries import backfill, check, summary
+from banking.tests.test_data import create_customer_account
+from banking.transfers import execute_transfer
+from BankingBackend.constant import CREDIT, DEBIT, NEFT, UPI
+
+
+class DailyTotalTestCase(TestCase):
+    """
+    Test case for the daily totals kept by the postings and their summaries.
+    """
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.account = create_customer_account(balance=Decimal("100.000"))
+        self.other = create_customer_account(balance=Decimal("100.000"))
+        for account, transaction_type, method, amount in (
+            (self.account, CREDIT, UPI, "10.500"),
+            (self.account, CREDIT, UPI, "4.500"),
+            (self.account, DEBIT, NEFT, "3.000"),
+            (self.other, CREDIT, NEFT, "7.000"),
+        ):
+            Transaction(
+                account=account,
+                transaction_type=transaction_type,
+                transaction_method=method,
+                amount=Decimal(amount),
+            ).save()
+
+    def totals(self):
+        return {
+            (total.account_id, total.transaction_method, total.transaction_type): (
+                total.amount,
+                total.count,
+            )
+            for total in DailyTotal.objects.filter(day=self.today)
+        }
+
+    def test_postings_update_totals(self):
+        self.assertEqual(
+            self.totals(),
+            {
+                (self.account.pk, UPI, CREDIT): (Decimal("15.000"), 2),
+                (self.account.pk, NEFT, DEBIT): (Decimal("3.000"), 1),
+                (self.other.pk, NEFT, CREDIT): (Decimal("7.000"), 1),
+            },
+        )
+        execute_transfer(self.account.pk, self.other.pk, Decimal("1.000"), UPI)
+        totals = self.totals()
+        self.assertEqual(totals[(self.account.pk, UPI, DEBIT)], (Decimal("1.000"), 1))
+        self.assertEqual(totals[(self.other.pk, UPI, CREDIT)], (Decimal("1.000"), 1))
+        self.assertEqual(check(self.today, self.today), [])
+
+    def test_batch_postings(self):
+        batch = BatchPosting(added_by=None, notify=False)
+        batch.post(
+            [
+                (
+                    {
+                        "transaction_type": CREDIT,
+                        "amount": Decimal("2.000"),
+                        "transaction_method": UPI,
+                        "source": "batch",
+                        "reference_number": None,
+                        "account": self.other.account_number,
+                    },
+                    (self.other.pk, "", ""),
+                )
+            ]
+            * 3
+        )
+        self.assertEqual(
+            self.totals()[(self.other.pk, UPI, CREDIT)], (Decimal("6.000"), 3)
+        )
+
+    def test_summary(self):
+        by_method = summary(self.today, self.today, "method")
+        self.assertEqual(
+            by_method,
+            [
+                {
+                    "method": NEFT,
+                    "credits": "7.000",
+                    "debits": "3.000",
+                    "credit_count": 1,
+                    "debit_count": 1,
+                },
+                {
+                    "method": UPI,
+                    "credits": "15.000",
+                    "debits": "0.000",
+                    "credit_count": 2,
+                    "debit_count": 0,
+                },
+            ],
+        )
+        rows = summary(
+            self.today,
+            self.today,
+            "account",
+            account_number=self.account.account_number,
+        )
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["credits"], "15.000")
+        yesterday = self.today - timedelta(days=1)
+        self.assertEqual(summary(yesterday, yesterday, "day"), [])
+
+    def test_endpoint(self):
+        client = APIClient()
+        url = reverse("summary")
+        params = {
+            "start_date": self.today.isoformat(),
+            "end_date": self.today.isoformat(),
+            "group_by": "branch",
+        }
+        client.force_authenticate(user=self.account.customer.user)
+        self.assertEqual(client.get(url, params).status_code, 403)
+
+        client.force_authenticate(create_customer_account(user_type="BM").customer.user)
+        response = client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        branches = {row["branch"]: row for row in response.json()["content"]}
+        branch = self.account.customer.branch.ifsc_code
+        self.assertEqual(branches[branch]["debits"], "3.000")
+
+        params["end_date"] = (self.today - timedelta(days=1)).isoformat()
+        self.assertEqual(client.get(url, params).status_code, 400)
+
+    def test_check_and_backfill(self):
+        DailyTotal.objects.filter(account=self.other).delete()
+        DailyTotal.objects.filter(account=self.account, transaction_type=CREDIT).update(
+            amount=Decimal("1.000")
+        )
+        mismatches = check(self.today, self.today)
+        self.assertEqual(
+            sorted((m.account_id, m.stored, m.raw) for m in mismatches),
+            sorted(
+                [
+                    (self.account.pk, (Decimal("1.000"), 2), (Decimal("15.000"), 2)),
+                    (self.other.pk, (Decimal("0.000"), 0), (Decimal("7.000"), 1)),
+                ]
+            ),
+        )
+        day = self.today.isoformat()
+        with self.assertRaisesMessage(CommandError, "2 daily totals differ"):
+            call_command(
+                "checkdailytotals", "--start", day, "--end", day, stdout=io.StringIO()
+            )
+        self.assertEqual(backfill(self.today, self.today), 3)
+        self.assertEqual(check(self.today, self.today), [])
+        call_command(
+            "checkdailytotals", "--start", day, "--end", day, stdout=io.StringIO()
+        )
@@ -0,0 +1,168 @@
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from banking.models import Account, DailyTotal, LedgerLine, OutboxMessage, Transaction
+from banking.reconciliation import reconcile
+from banking.tests.test_data import create_customer_account
+from banking.transfers import TransferRejected, execute_transfer
+from BankingBackend.constant import ACTIVE, CREDIT, DEBIT, INACTIVE, SAVING, UPI
+
+
+class TransferExecutorTestCase(TestCase):
+    """
+    Test case for the lock ordered transfer executor.
+    """
+
+    def setUp(self):
+        self.sender = create_customer_account(balance=Decimal("100.000"))
+        self.receiver = create_customer_account(balance=Decimal("5.000"))
+
+    def balances(self):
+        return [
+            Account.objects.get(pk=account.pk).balance
+            for account in (self.sender, self.receiver)
+        ]
+
+    def test_transfer(self):
+        debit, credit = execute_transfer(
+            self.sender.pk, self.receiver.pk, Decimal("30.000"), UPI
+        )
+        self.assertEqual(self.balances(), [Decimal("70.000"), Decimal("35.000")])
+        self.assertEqual(
+            list(
+                Transaction.objects.order_by("transaction_type").values_list(
+                    "transaction_type", "account_id"
+                )
+            ),
+            [(CREDIT, self.receiver.pk), (DEBIT, self.sender.pk)],
+        )
+        self.assertEqual(OutboxMessage.objects.count(), 2)
+
+    def test_rejections_change_nothing(self):
+        cases = [
+            (self.sender.pk, Decimal("100.001"), "Insufficient account balance"),
+            (self.receiver.pk, Decimal("1"), "Can not transfer to the same account"),
+        ]
+        for sender, amount, message in cases:
+            with self.assertRaisesMessage(TransferRejected, message):
+                execute_transfer(sender, self.receiver.pk, amount, UPI)
+        Account.objects.filter(pk=self.receiver.pk).update(status=INACTIVE)
+        with self.assertRaisesMessage(
+            TransferRejected, "Receiver account is not Active"
+        ):
+            execute_transfer(self.sender.pk, self.receiver.pk, Decimal("1"), UPI)
+        self.assertEqual(self.balances(), [Decimal("100.000"), Decimal("5.000")])
+        self.assertFalse(Transaction.objects.exists())
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_locks_in_primary_key_order(self):
+        # The first transfer of the day also inserts both daily totals.
+        execute_transfer(self.receiver.pk, self.sender.pk, Decimal("1"), UPI)
+        with self.assertNumQueries(11) as queries:
+            execute_transfer(self.receiver.pk, self.sender.pk, Decimal("1"), UPI)
+        lock = queries.captured_queries[1]["sql"]
+        self.assertIn('ORDER BY "banking_account"."id" ASC', lock)
+
+    @mock.patch("banking.transfers.time.sleep")
+    @mock.patch(
+        "banking.transfers.post_transfer",
+        side_effect=OperationalError("database is locked"),
+    )
+    def test_bounded_retries(self, post_transfer, sleep):
+        with self.assertRaises(OperationalError):
+            execute_transfer(
+                self.sender.pk, self.receiver.pk, Decimal("1"), UPI, max_retries=2
+            )
+        self.assertEqual(post_transfer.call_count, 3)
+
+    @mock.patch("banking.transfers.post_transfer")
+    def test_other_errors_not_retried(self, post_transfer):
+        post_transfer.side_effect = OperationalError("no such table")
+        with self.assertRaises(OperationalError):
+            execute_transfer(self.sender.pk, self.receiver.pk, Decimal("1"), UPI)
+        self.assertEqual(post_transfer.call_count, 1)
+
+
+class TransferAPITestCase(TestCase):
+    """
+    Test case for picking the account a customer transfers from.
+    """
+
+    def setUp(self):
+        self.sender = create_customer_account(balance=Decimal("100.000"))
+        self.receiver = create_customer_account(balance=Decimal("5.000"))
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.sender.customer.user)
+        self.data = {
+            "account_number": self.receiver.account_number,
+            "amount": "10.000",
+            "account_holder_name": self.receiver.customer.user.get_full_name(),
+            "contact_number": "9999999999",
+            "ifsc_code": self.receiver.customer.branch.ifsc_code,
+            "remarks": "rent",
+            "source": UPI,
+        }
+
+    def transfer(self, **data):
+        return self.client.post(
+            reverse("transfer"), dict(self.data, **data), format="json"
+        )
+
+    def balance(self, account):
+        return Account.objects.get(pk=account.pk).balance
+
+    def test_single_account(self):
+        self.assertEqual(self.transfer().status_code, 200)
+        self.assertEqual(self.balance(self.sender), Decimal("90.000"))
+
+    def test_from_account_number(self):
+        second = Account.objects.create(
+            customer=self.sender.customer,
+            account_type=SAVING,
+            status=ACTIVE,
+            balance=Decimal("50.000"),
+        )
+        response = self.transfer()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("from_account_number", response.content.decode())
+
+        response = self.transfer(from_account_number=second.account_number)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.balance(second), Decimal("40.000"))
+        self.assertEqual(self.balance(self.sender), Decimal("100.000"))
+
+        # Someone else's account is not found.
+        response = self.transfer(from_account_number=self.receiver.account_number)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.balance(self.receiver), Decimal("15.000"))
+
+
+class StressTransfersCommandTestCase(TransactionTestCase):
+    """
+    Test case for the stresstransfers benchmark and its cleanup.
+    """
+
+    def test_cleans_up_every_row(self):
+        call_command(
+            "stresstransfers",
+            "--transfers",
+            "30",
+            "--accounts",
+            "3",
+            # The in-memory test database locks tables across threads.
+            "--threads",
+            "1",
+            stdout=StringIO(),
+        )
+        self.assertFalse(Account.objects.exists())
+        self.assertFalse(Transaction.objects.exists())
+        self.assertFalse(DailyTotal.objects.exists())
+        self.assertFalse(LedgerLine.objects.exists())
+        self.assertEqual(reconcile()[1], [])
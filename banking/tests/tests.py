@@ -197,6 +197,8 @@ class CreditAmountTestCase(TestCase):
         self.customer.save()
         self.account = AccountFactory()
         self.account.customer = self.customer
+        # Enough for any debit of the test, the balance is checked.
+        self.account.balance = 100
         self.account.save()
 
         self.data = {
@@ -0,0 +1,164 @@
+"""
+Transfer executor.
+
+Both accounts of a transfer are locked with ``select_for_update`` in primary
+key order, so two opposing transfers always queue on the same row first
+instead of deadlocking. Status and balance are checked again under the lock
+and the two legs are posted with conditional UPDATEs, a failed condition
+rolls the whole transfer back.
+
+A transfer that loses a serialization conflict or deadlock on Postgres, or
+finds the database locked on SQLite, is retried at most
+``TRANSFER_MAX_RETRIES`` times.
+"""
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.db.models import F
+
+from banking.models import (
+    Account,
+    DailyTotal,
+    LedgerLine,
+    OutboxMessage,
+    Transaction,
+    notify_balance_changed,
+    transaction_email,
+)
+from BankingBackend.constant import ACTIVE, CREDIT, DEBIT
+
+# serialization_failure and deadlock_detected
+RETRYABLE_PGCODES = ("40001", "40P01")
+
+
+class TransferRejected(Exception):
+    """
+    Raised when a transfer is refused, with the reason as message.
+    """
+
+
+def is_retryable(error):
+    """
+    Whether ``error`` is a conflict with a concurrent transaction.
+    """
+    if getattr(error.__cause__, "pgcode", None) in RETRYABLE_PGCODES:
+        return True
+    return "database is locked" in str(error)
+
+
+def execute_transfer(
+    sender_id,
+    receiver_id,
+    amount,
+    transaction_method,
+    debit_description=None,
+    credit_description=None,
+    max_retries=None,
+):
+    """
+    Move ``amount`` from the ``sender_id`` account to ``receiver_id``.
+
+    Returns the ``(debit, credit)`` transactions, raises ``TransferRejected``
+    when an account is not active or the sender balance does not cover it.
+    """
+    if max_retries is None:
+        max_retries = settings.TRANSFER_MAX_RETRIES
+    attempt = 0
+    while True:
+        try:
+            with transaction.atomic():
+                return post_transfer(
+                    sender_id,
+                    receiver_id,
+                    amount,
+                    transaction_method,
+                    debit_description or {},
+                    credit_description or {},
+                )
+        except OperationalError as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            attempt += 1
+            time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+
+
+def post_transfer(
+    sender_id,
+    receiver_id,
+    amount,
+    transaction_method,
+    debit_description,
+    credit_description,
+):
+    """
+    Post both legs of a transfer, must run inside a transaction.
+    """
+    if sender_id == receiver_id:
+        raise TransferRejected("Can not transfer to the same account")
+
+    locked = {
+        account.pk: account
+        for account in Account.objects.select_for_update()
+        .filter(pk__in=[sender_id, receiver_id])
+        .order_by("pk")
+        .only("pk", "status", "balance", "balance_shards")
+    }
+    sender, receiver = locked.get(sender_id), locked.get(receiver_id)
+    if sender is None or receiver is None:
+        raise TransferRejected("Account Number not found")
+    if sender.status != ACTIVE:
+        raise TransferRejected("Your account is not Active")
+    if receiver.status != ACTIVE:
+        raise TransferRejected("Receiver account is not Active")
+    if sender.current_balance < amount:
+        raise TransferRejected("Insufficient account balance")
+
+    # The rows are locked, the conditions only fail on a database that
+    # ignores FOR UPDATE and are then treated as a lost race. The balance of
+    # a sharded sender may go below zero, its shards cover the difference.
+    senders = Account.objects.filter(pk=sender_id, status=ACTIVE)
+    if not sender.balance_shards:
+        senders = senders.filter(balance__gte=amount)
+    debited = senders.update(balance=F("balance") - amount)
+    credited = Account.objects.filter(pk=receiver_id, status=ACTIVE).update(
+        balance=F("balance") + amount
+    )
+    if not debited:
+        raise TransferRejected("Insufficient account balance")
+    if not credited:
+        raise TransferRejected("Receiver account is not Active")
+
+    debit = Transaction(
+        transaction_type=DEBIT,
+        amount=amount,
+        account_id=sender_id,
+        transaction_method=transaction_method,
+        description=debit_description,
+    )
+    credit = Transaction(
+        transaction_type=CREDIT,
+        amount=amount,
+        account_id=receiver_id,
+        transaction_method=transaction_method,
+        description=credit_description,
+    )
+    # The balances are already posted, bulk_create skips Transaction.save.
+    Transaction.objects.bulk_create([debit, credit])
+    LedgerLine.objects.record([debit, credit])
+    DailyTotal.objects.record([debit, credit])
+
+    accounts = Account.objects.filter(pk__in=[sender_id, receiver_id]).values_list(
+        "pk", "account_number", "customer__user__email"
+    )
+    emails = {pk: (number, email) for pk, number, email in accounts}
+    messages = []
+    for leg in (debit, credit):
+        number, email = emails[leg.account_id]
+        if email:
+            payload = transaction_email(email, leg.transaction_type, number, amount)
+            messages.append((leg.account_id, payload))
+    OutboxMessage.objects.enqueue_many(messages)
+    notify_balance_changed([sender_id, receiver_id])
+    return debit, credit
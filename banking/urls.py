@@ -1,14 +1,32 @@
 from django.urls import path
 from rest_framework.authtoken.views import obtain_auth_token
 
-from banking.views import (DebitAmount, CreditAmount, CustomerEnquiry,
-                           TransactionHistoryCsv, TransferAPI)
+from banking.async_views import (AsyncCreditAmount, AsyncCustomerEnquiry,
+                                 AsyncDebitAmount, AsyncTransferAPI)
+from banking.views import (BalanceAtAPI, BatchPostingAPI, DebitAmount, CreditAmount,
+                           BranchReportAPI, CustomerEnquiry, EnquiryCacheStats,
+                           ExportJobAPI, ExportJobDownload,
+                           TransactionExportAPI, TransactionHistoryCsv,
+                           TransactionSummaryAPI, TransferAPI)
 
 urlpatterns = [
     path("obtain-token/", obtain_auth_token, name='token'),
     path("credit-amount/", CreditAmount.as_view(), name= 'credit_amount'),
     path("debit-amount/", DebitAmount.as_view(), name= 'debit_amount'),
     path("customer-enquiry/", CustomerEnquiry.as_view(),name='enquiry'),
+    path("enquiry-cache-stats/", EnquiryCacheStats.as_view(), name='enquiry_cache_stats'),
+    path("balance-at/", BalanceAtAPI.as_view(), name='balance_at'),
     path("transaction-csv/", TransactionHistoryCsv.as_view(),name='history'),
+    path("transaction-summary/", TransactionSummaryAPI.as_view(), name='summary'),
+    path("branch-report/", BranchReportAPI.as_view(), name='branch_report'),
+    path("transaction-export/", TransactionExportAPI.as_view(), name='export'),
+    path("transaction-export/<str:job_id>/", ExportJobAPI.as_view(), name='export_job'),
+    path("transaction-export/<str:job_id>/download/", ExportJobDownload.as_view(),
+         name='export_download'),
     path("transfer/", TransferAPI.as_view(), name='transfer'),
+    path("batch-postings/", BatchPostingAPI.as_view(), name='batch_postings'),
+    path("async/credit-amount/", AsyncCreditAmount, name='async_credit_amount'),
+    path("async/debit-amount/", AsyncDebitAmount, name='async_debit_amount'),
+    path("async/customer-enquiry/", AsyncCustomerEnquiry, name='async_enquiry'),
+    path("async/transfer/", AsyncTransferAPI, name='async_transfer'),
 ]
@@ -1,33 +1,72 @@
-import csv
-from datetime import datetime
+import codecs
+import hmac
+from datetime import datetime, timedelta
 
-from django.http import StreamingHttpResponse
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from rest_framework import generics, status
-from rest_framework.authentication import TokenAuthentication
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from banking.models import Transaction, Account
+from banking.authentication import CachedTokenAuthentication
+from banking.batch import FORMATS, BatchPosting, format_from_name, read_postings
+from banking.cache import account_enquiry, stats
+from banking.exports import (
+    EXPORT_FORMATS,
+    ExportContentNegotiation,
+    negotiate_export,
+    ranged_file_response,
+)
+from banking.idempotency import idempotent
+from banking.instrumentation import render_metrics
+from banking.ledger import balance_at
+from banking.models import ExportJob, InsufficientBalance, Transaction
+from banking.partitions import export_cache_key, history_rows
 from banking.permissions import IsBankManager, IsCustomer, IsEmployee
+from banking.reports import branch_report
+from banking.summaries import summary
+from banking.tasks import run_export_job
+from BankingBackend.constant import DONE, FAILED, PENDING, RUNNING
 from banking.serializers import (
-    AccountSerializer,
+    BalanceAtSerializer,
+    BranchReportSerializer,
     CreditDebitTransactionSerializer,
+    ExportJobSerializer,
     TransactionCSVSerializer,
-    TransactionHistorySerializer,
+    TransactionSummarySerializer,
     TransferSerializer,
 )
 
 
+def posting_failed(transaction_type, error):
+    """
+    Response to a Credit or Debit that could not be posted: 409 when the
+    account can not cover a Debit, 500 otherwise. Neither is stored for
+    retries of the same idempotency key.
+    """
+    if isinstance(error, InsufficientBalance):
+        code = status.HTTP_409_CONFLICT
+    else:
+        code = status.HTTP_500_INTERNAL_SERVER_ERROR
+    return Response(
+        {"status": f"Unable to create {transaction_type} transaction"}, status=code
+    )
+
+
 class DebitAmount(generics.CreateAPIView):
     """"""
 
     queryset = Transaction.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = (IsEmployee,)
     http_method_names = [
         "post",
     ]
 
+    @idempotent("debit")
     def post(self, request, *args, **kwargs):
         data = request.data
         data["action"] = "Debit"
@@ -45,10 +84,10 @@ class DebitAmount(generics.CreateAPIView):
                 transact.transaction_type = "Debit"
                 transact.amount = data["amount"]
                 transact.account_id = data["account"]
-                transact.save()
+                transact.save(check_balance=True)
 
             except Exception as e:
-                return Response({"status": "Unable to create Credit transaction"})
+                return posting_failed("Debit", e)
             return Response(
                 {
                     "status": "Success",
@@ -61,12 +100,13 @@ class CreditAmount(generics.CreateAPIView):
     """"""
 
     queryset = Transaction.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = (IsEmployee,)
     http_method_names = [
         "post",
     ]
 
+    @idempotent("credit")
     def post(self, request, *args, **kwargs):
         data = request.data
         data["action"] = "Debit"
@@ -87,7 +127,7 @@ class CreditAmount(generics.CreateAPIView):
                 transact.save()
 
             except Exception as e:
-                return Response({"status": "Unable to create Credit transaction"})
+                return posting_failed("Credit", e)
             return Response(
                 {
                     "status": "Success",
@@ -98,66 +138,235 @@ class CreditAmount(generics.CreateAPIView):
 
 class CustomerEnquiry(APIView):
 
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [
         IsCustomer,
     ]
 
     def get(self, request, *args, **kwargs):
+        """
+        Return the customer's account, or a list when the customer holds more
+        than one and no ``account_number`` query parameter picks one.
+        """
+        accounts = account_enquiry(request.user.id)
+        account_number = request.query_params.get("account_number")
+        if account_number is not None:
+            accounts = [
+                account
+                for account in accounts
+                if str(account["account_number"]) == account_number
+            ]
+        if not accounts:
+            return Response(
+                {"message": "Account not found", "status": status.HTTP_404_NOT_FOUND},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        content = accounts[0] if len(accounts) == 1 else accounts
+        return Response({"content": content, "status": status.HTTP_200_OK})
 
-        account = Account.objects.get(customer__user=request.user)
-        serialize = AccountSerializer(account)
-        return Response({"content": serialize.data, "status": status.HTTP_200_OK})
 
+class EnquiryCacheStats(APIView):
+    """
+    Hit rate and latency of the enquiry cache in this process for only BankManager
+    """
 
-class CsvWrite:
-    """"""
+    http_method_names = ["get"]
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsBankManager]
+
+    def get(self, request, *args, **kwargs):
+        return Response({"content": stats.snapshot(), "status": status.HTTP_200_OK})
+
+
+class BalanceAtAPI(APIView):
+    """
+    Balance of an account at a point in time for Employee and BankManager
+    """
+
+    http_method_names = ["get"]
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsEmployee]
+
+    def get(self, request, *args, **kwargs):
+        serializer = BalanceAtSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        account = serializer.validated_data["account"]
+        at = serializer.validated_data["at"]
+        balance, snapshot = balance_at(account.id, at)
+        return Response(
+            {
+                "content": {
+                    "account_number": account.account_number,
+                    "at": at,
+                    "balance": str(balance),
+                    "snapshot": snapshot.as_of if snapshot else None,
+                },
+                "status": status.HTTP_200_OK,
+            }
+        )
+
+
+class TransactionSummaryAPI(APIView):
+    """
+    Credit and Debit totals per account, branch, method or day over a date
+    range for only BankManager, read from the daily totals.
+    """
 
-    def write(self, value):
-        """Write the value by returning it, instead of storing in a buffer."""
-        return value
+    http_method_names = ["get"]
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsBankManager]
+
+    def get(self, request, *args, **kwargs):
+        serializer = TransactionSummarySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response(
+            {
+                "content": summary(**serializer.validated_data),
+                "status": status.HTTP_200_OK,
+            }
+        )
+
+
+class BranchReportAPI(APIView):
+    """
+    Daily volumes, method totals, top accounts and amount histogram of a
+    branch over a date range for only BankManager.
+    """
+
+    http_method_names = ["get"]
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsBankManager]
+
+    def get(self, request, *args, **kwargs):
+        serializer = BranchReportSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response(
+            {
+                "content": branch_report(**serializer.validated_data),
+                "status": status.HTTP_200_OK,
+            }
+        )
 
 
 class TransactionHistoryCsv(APIView):
     """
-    Transcion history download api for only BankManager
+    Transcion history download api for only BankManager, as CSV, NDJSON or
+    the binary columnar format picked by the Accept header.
     """
 
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsBankManager]
+    content_negotiation_class = ExportContentNegotiation
 
     def post(self, request, *args, **kwargs):
         serializer = TransactionCSVSerializer(data=request.data)
         if serializer.is_valid(raise_exception=True):
             data = serializer.validated_data
-            rows_data = [
-                [
-                    "Transaction ID",
-                    "Transaction Type",
-                    "Amount",
-                    "Account Number",
-                    "Transaction Method",
-                    "Description",
-                    "Reference Number",
-                ]
-            ]
-            transact = Transaction.objects.filter(
-                account__account_number__in=data["acc_ids"],
-                created_at__gte=data["start_date"],
-                created_at__lte=data["end_date"],
-            )
-            for ts in transact:
-                transact_inst = TransactionHistorySerializer(ts)
-                rows_data.append([*transact_inst.data.values()])
-            rows = (x for x in rows_data)
-            pseudo_buffer = CsvWrite()
-            writer = csv.writer(pseudo_buffer)
+            rows = history_rows(data["acc_ids"], data["start_date"], data["end_date"])
+            content_type = negotiate_export(request.META.get("HTTP_ACCEPT"))
+            stream, extension = EXPORT_FORMATS[content_type]
             file = "Transaction_History" + str(datetime.now())
             return StreamingHttpResponse(
-                (writer.writerow(row) for row in rows),
-                content_type="text/csv",
-                headers={"Content-Disposition": "attachment; filename=file"},
+                stream(rows),
+                content_type=content_type,
+                headers={
+                    "Content-Disposition": (
+                        f'attachment; filename="{file}.{extension}"'
+                    ),
+                    "Vary": "Accept",
+                },
+            )
+
+
+class TransactionExportAPI(APIView):
+    """
+    Start a background transaction history export for only BankManager.
+
+    Identical requests reuse the export of the same rows instead of writing
+    a new file, unless it has been pending or running for longer than
+    ``EXPORT_JOB_TIMEOUT`` seconds.
+    """
+
+    http_method_names = ["post"]
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsBankManager]
+
+    def post(self, request, *args, **kwargs):
+        serializer = TransactionCSVSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        cache_key = export_cache_key(
+            data["acc_ids"], data["start_date"], data["end_date"]
+        )
+        jobs = ExportJob.objects.filter(cache_key=cache_key)
+        # A job lost by the worker would otherwise be reused for good.
+        stale_before = timezone.now() - timedelta(seconds=settings.EXPORT_JOB_TIMEOUT)
+        jobs.filter(status__in=(PENDING, RUNNING), created_at__lt=stale_before).update(
+            status=FAILED, error="Timed out"
+        )
+        job = jobs.exclude(status=FAILED).order_by("-created_at").first()
+        if job is None:
+            job = ExportJob.objects.create(
+                requested_by=request.user,
+                cache_key=cache_key,
+                acc_ids=data["acc_ids"],
+                start_date=data["start_date"],
+                end_date=data["end_date"],
             )
+            try:
+                run_export_job.delay(job.id)
+            except Exception as e:
+                job.status = FAILED
+                job.error = str(e)
+                job.save(update_fields=["status", "error"])
+                code = status.HTTP_503_SERVICE_UNAVAILABLE
+                return Response(
+                    {"content": ExportJobSerializer(job).data, "status": code},
+                    status=code,
+                )
+        if job.status == DONE:
+            code = status.HTTP_200_OK
+        else:
+            code = status.HTTP_202_ACCEPTED
+        return Response(
+            {"content": ExportJobSerializer(job).data, "status": code}, status=code
+        )
+
+
+class ExportJobAPI(APIView):
+    """
+    Poll a transaction history export job for only BankManager
+    """
+
+    http_method_names = ["get"]
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsBankManager]
+
+    def get(self, request, job_id, *args, **kwargs):
+        job = get_object_or_404(ExportJob, pk=job_id)
+        return Response(
+            {"content": ExportJobSerializer(job).data, "status": status.HTTP_200_OK}
+        )
+
+
+class ExportJobDownload(APIView):
+    """
+    Download a finished export, resumable with HTTP Range requests
+    """
+
+    http_method_names = ["get"]
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsBankManager]
+
+    def get(self, request, job_id, *args, **kwargs):
+        job = get_object_or_404(ExportJob, pk=job_id, status=DONE)
+        return ranged_file_response(
+            request,
+            job.file_path,
+            "application/gzip",
+            f"Transaction_History_{job.id}.csv.gz",
+            etag=f'"{job.id}-{job.size}"',
+        )
 
 
 class TransferAPI(APIView):
@@ -166,9 +375,10 @@ class TransferAPI(APIView):
     """
 
     http_method_names = ["post"]
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsCustomer]
 
+    @idempotent("transfer")
     def post(self, request, *args, **kwargs):
         serializer = TransferSerializer(context={"request": request}, data=request.data)
         if serializer.is_valid(raise_exception=True):
@@ -179,3 +389,65 @@ class TransferAPI(APIView):
                     "status": status.HTTP_201_CREATED,
                 }
             )
+
+
+class BatchPostingAPI(APIView):
+    """
+    Upload a CSV or JSONL file of Credit/Debit postings for Employee and BankManager
+    """
+
+    http_method_names = ["post"]
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsEmployee]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response(
+                {"file": ["This field is required."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        fmt = request.data.get("format") or format_from_name(upload.name)
+        if fmt not in FORMATS:
+            return Response(
+                {"format": [f"Expected one of {', '.join(FORMATS)}"]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        atomic = str(request.data.get("atomic", "")).lower() in ("1", "true")
+
+        batch = BatchPosting(added_by=request.user.id, atomic=atomic)
+        report = batch.run(read_postings(codecs.iterdecode(upload, "utf-8"), fmt))
+        if not report["failed"]:
+            result = "Success"
+        elif report["posted"]:
+            result = "Partial"
+        else:
+            result = "Failed"
+        return Response(
+            {"status": result, "content": report},
+            status=status.HTTP_400_BAD_REQUEST
+            if result == "Failed"
+            else status.HTTP_200_OK,
+        )
+
+
+def metrics(request):
+    """
+    Request histograms of this process in the Prometheus text format, for
+    scrapers sending ``METRICS_TOKEN`` as a bearer token.
+    """
+    if not settings.METRICS_TOKEN:
+        return HttpResponse("Metrics are disabled", status=status.HTTP_403_FORBIDDEN)
+    scheme, _, token = request.META.get("HTTP_AUTHORIZATION", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(
+        token.strip().encode(), settings.METRICS_TOKEN.encode()
+    ):
+        response = HttpResponse(
+            "Invalid metrics token", status=status.HTTP_401_UNAUTHORIZED
+        )
+        response["WWW-Authenticate"] = 'Bearer realm="metrics"'
+        return response
+    return HttpResponse(
+        render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )